@@ -0,0 +1,95 @@
+import gc
+import os
+import random
+import sys
+import time
+
+COMPILERDIR:str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "compiler")
+OPERATORS:tuple[str, ...] = ("+", "-", "*", "/", "%", "&", "|", "^", ">", "<", "==", "!=", ">=", "<=")
+
+def generate(statements:int, seed:int = 0) -> str:
+  generator:random.Random = random.Random(seed)
+  names:list[str] = [f"v{index}" for index in range(16)]
+  lines:list[str] = [f"res u64, {name};" for name in names] + [f"set {name}, {index};" for index, name in enumerate(names)]
+
+  def expression(depth:int) -> str:
+    if depth == 0 or generator.random() < 0.2:
+      return generator.choice(names) if generator.random() < 0.7 else str(generator.randrange(1, 1000))
+    if generator.random() < 0.1:
+      return "-" + expression(depth - 1)
+    return f"({expression(depth - 1)}{generator.choice(OPERATORS)}{expression(depth - 1)})"
+
+  for index in range(statements):
+    if index % 50 == 0:
+      lines.append(f"label l{index};")
+    lines.append(f"set {generator.choice(names)}, {expression(4)};")
+  lines.append(f"exit {names[0]};")
+  return "\n".join(lines) + "\n"
+
+def count_nodes(node) -> int:
+  total:int = 1
+  for field in ("value", "a", "b"):
+    child = getattr(node, field, None)
+    if child is not None and hasattr(child, "asttype"):
+      total += count_nodes(child)
+  return total
+
+def best(function, repeats:int) -> float:
+  result:float = float("inf")
+  for _ in range(repeats):
+    gc.collect()
+    gc.disable()
+    start:float = time.perf_counter()
+    function()
+    result = min(result, time.perf_counter() - start)
+    gc.enable()
+  return result
+
+def main(argv:list[str]) -> int:
+  compiler:str = COMPILERDIR
+  source:str = None
+  repeats:int = 5
+  index:int = 1
+  while index < len(argv):
+    if argv[index] == "--compiler":
+      compiler = argv[index + 1]
+      index += 1
+    elif argv[index] == "-n":
+      repeats = int(argv[index + 1])
+      index += 1
+    else:
+      source = argv[index]
+    index += 1
+
+  sys.path.insert(0, os.path.abspath(compiler))
+  from lexer import Lexer
+  from parser import Parser
+  from translator import Translator
+  from lowering import Lowering
+  from backend import Backend
+
+  if source is None:
+    text:str = generate(20000)
+  else:
+    with open(source, "r") as file:
+      text:str = file.read()
+
+  tokens:list = Lexer(text).tokenize()
+  nodes:list = Parser(tokens).parse()
+  total:int = sum(count_nodes(node) for node in nodes)
+  program = Lowering(nodes).lower()
+  instructions:int = sum(len(block.instructions) for block in program.blocks)
+
+  results:list[tuple[str,float,int]] = [
+    ("parse", best(lambda: Parser(tokens).parse(), repeats), total),
+    ("translate", best(lambda: Translator(nodes).translate(), repeats), total),
+    ("lower", best(lambda: Lowering(nodes).lower(), repeats), total),
+    ("backend", best(lambda: Backend(program).translate(), repeats), instructions)
+  ]
+  print(f"{total} nodes, {instructions} ir instructions, best of {repeats}")
+  for name, seconds, count in results:
+    print(f"{name}: {seconds * 1000:.1f} ms, {seconds * 1e9 / count:.0f} ns/node")
+  return 0
+
+if __name__ == "__main__":
+  sys.exit(main(sys.argv))
@@ -0,0 +1,51 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dispatch import COMPILERDIR, generate
+
+def compile_time(compiler:str, source:str, flags:list[str]) -> float:
+  start:float = time.perf_counter()
+  subprocess.run([sys.executable, os.path.join(compiler, "main.py"), source, "-o", os.devnull, "-O0"] + flags, check=True)
+  return time.perf_counter() - start
+
+def main(argv:list[str]) -> int:
+  compiler:str = COMPILERDIR
+  statements:int = 80000
+  index:int = 1
+  while index < len(argv):
+    if argv[index] == "--compiler":
+      compiler = argv[index + 1]
+    elif argv[index] == "-n":
+      statements = int(argv[index + 1])
+    index += 2
+
+  directory:str = tempfile.mkdtemp()
+  try:
+    source:str = os.path.join(directory, "program.src")
+    cache:str = os.path.join(directory, "cache")
+    lines:list[str] = generate(statements).splitlines()
+    with open(source, "w") as file:
+      file.write("\n".join(lines) + "\n")
+
+    results:list[tuple[str,float]] = [
+      ("full", compile_time(compiler, source, [])),
+      ("cold cache", compile_time(compiler, source, ["--cache", cache])),
+      ("warm cache", compile_time(compiler, source, ["--cache", cache]))
+    ]
+    middle:int = next(index for index in range(len(lines) // 2, len(lines)) if lines[index].startswith("set"))
+    lines[middle] = lines[middle].rstrip(";") + " + 1;"
+    with open(source, "w") as file:
+      file.write("\n".join(lines) + "\n")
+    results.append(("one statement changed", compile_time(compiler, source, ["--cache", cache])))
+  finally:
+    shutil.rmtree(directory)
+
+  for name, seconds in results:
+    print(f"{name}: {seconds:.2f} s")
+  return 0
+
+if __name__ == "__main__":
+  sys.exit(main(sys.argv))
@@ -0,0 +1,167 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from dispatch import COMPILERDIR
+from suite import revision
+
+PROGRAMS:dict[str,str] = {
+  "nested": """res u32, i;
+res u16, j;
+res u8, k;
+res u64, acc;
+label outer;
+set j, 0;
+label inner;
+set k, k + j * 3 + 7;
+set acc, acc + (k & 15) + j;
+set j, j + 1;
+jump inner, j < 1000;
+set i, i + 1;
+jump outer, i < 200000;
+exit acc;
+""",
+  "sum": """res u64, i;
+res u64, acc;
+label loop;
+set acc, acc + ((i * i) ^ (acc & 255));
+set i, i + 1;
+jump loop, i < 200000000;
+exit acc;
+""",
+  "invariant": """res u64, a;
+res u64, b;
+res u64, i;
+res u64, acc;
+set a, 12345;
+set b, 678;
+label loop;
+set acc, acc + ((a * b + a / b) ^ i);
+set i, i + 1;
+jump loop, i < 200000000;
+exit acc;
+""",
+  "countdown": """res u32, r;
+res u16, c;
+res u64, h;
+label outer;
+set c, 60000;
+label inner;
+set h, h * 31 + c;
+set c, c - 1;
+jump inner, c != 0;
+set r, r + 1;
+jump outer, r < 3000;
+exit h;
+""",
+  "gcd": """res u64, a;
+res u64, b;
+res u64, t;
+res u64, i;
+res u64, total;
+set i, 1;
+label outer;
+set a, i * 7919 + 13;
+set b, i;
+label inner;
+set t, a % b;
+set a, b;
+set b, t;
+jump inner, b != 0;
+set total, total + a;
+set i, i + 1;
+jump outer, i < 3000000;
+exit total;
+""",
+  "collatz": """res u64, n;
+res u64, x;
+res u64, steps;
+set n, 1;
+label outer;
+set x, n;
+label inner;
+jump odd, x % 2;
+set x, x / 2;
+jump next, 1;
+label odd;
+set x, 3 * x + 1;
+label next;
+set steps, steps + 1;
+jump inner, x != 1;
+set n, n + 1;
+jump outer, n < 1000000;
+exit steps;
+"""
+}
+
+def build(compiler:str, name:str, directory:str, flags:list[str]) -> str:
+  source:str = os.path.join(directory, f"{name}.src")
+  executable:str = os.path.join(directory, name)
+  with open(source, "w") as file:
+    file.write(PROGRAMS[name])
+  subprocess.run([sys.executable, os.path.join(compiler, "main.py"), source, "-o", executable, "--elf", "-O2", "--eval-steps", "0"] + flags, check=True)
+  return executable
+
+def run(executable:str, repeats:int) -> tuple[float,int]:
+  best:float = float("inf")
+  code:int = 0
+  for _ in range(repeats):
+    start:float = time.perf_counter()
+    code = subprocess.run([executable]).returncode
+    best = min(best, time.perf_counter() - start)
+  return best, code
+
+def main(argv:list[str]) -> int:
+  compiler:str = COMPILERDIR
+  baseline:str|None = None
+  names:list[str] = list(PROGRAMS)
+  repeats:int = 3
+  flags:list[str] = []
+  outputfile:str|None = None
+  index:int = 1
+  while index < len(argv):
+    if argv[index] == "--compiler":
+      compiler = argv[index + 1]
+    elif argv[index] == "--baseline":
+      baseline = argv[index + 1]
+    elif argv[index] == "--program":
+      names = argv[index + 1].split(",")
+    elif argv[index] == "--repeat":
+      repeats = int(argv[index + 1])
+    elif argv[index] == "--unroll":
+      flags = ["--unroll", argv[index + 1]]
+    elif argv[index] == "-o":
+      outputfile = argv[index + 1]
+    index += 2
+
+  results:list[dict] = []
+  with tempfile.TemporaryDirectory() as directory:
+    for name in names:
+      seconds, code = run(build(compiler, name, directory, flags), repeats)
+      case:dict = {"program":name, "seconds":seconds, "exit":code}
+      line:str = f"{name}: {1000 * seconds:.1f} ms"
+      if baseline is not None:
+        oldseconds, oldcode = run(build(baseline, name, directory, []), repeats)
+        if oldcode != code:
+          print(f"ERROR: {name} exits with {code}, the baseline exits with {oldcode}.")
+          return 1
+        case["baseline_seconds"] = oldseconds
+        line += f", baseline {1000 * oldseconds:.1f} ms, speedup {oldseconds / seconds:.2f}x"
+      results.append(case)
+      print(line, flush=True)
+
+  if outputfile is not None:
+    with open(outputfile, "w") as file:
+      json.dump({
+        "revision":revision(os.path.abspath(compiler)),
+        "python":platform.python_version(),
+        "machine":platform.machine(),
+        "results":results
+      }, file, indent=2)
+  return 0
+
+if __name__ == "__main__":
+  sys.exit(main(sys.argv))
@@ -0,0 +1,56 @@
+import os
+import sys
+import tracemalloc
+from dispatch import COMPILERDIR, count_nodes, generate
+
+def measure(build) -> tuple[int,object]:
+  tracemalloc.start()
+  before:int = tracemalloc.get_traced_memory()[0]
+  result = build()
+  after:int = tracemalloc.get_traced_memory()[0]
+  tracemalloc.stop()
+  return after - before, result
+
+def main(argv:list[str]) -> int:
+  compiler:str = COMPILERDIR
+  source:str = None
+  index:int = 1
+  while index < len(argv):
+    if argv[index] == "--compiler":
+      compiler = argv[index + 1]
+      index += 1
+    else:
+      source = argv[index]
+    index += 1
+
+  sys.path.insert(0, os.path.abspath(compiler))
+  from lexer import Lexer
+  from parser import Parser
+
+  if source is None:
+    text:str = generate(20000)
+  else:
+    with open(source, "r") as file:
+      text:str = file.read()
+  tokens:list = Lexer(text).tokenize()
+
+  size, nodes = measure(lambda: Parser(tokens).parse())
+  modes:list[tuple[str,int,int]] = [("objects", size, sum(count_nodes(node) for node in nodes))]
+  try:
+    from nodestore import NodeStore
+  except ImportError:
+    NodeStore = None
+  if NodeStore is not None:
+    def build() -> NodeStore:
+      store:NodeStore = NodeStore()
+      Parser(tokens, store).parse()
+      return store
+    size, store = measure(build)
+    modes.append(("compact", size, len(store.opcodes)))
+
+  for name, size, count in modes:
+    print(f"{name}: {count} nodes, {size / 1e6:.1f} MB, {size / count:.1f} bytes/node")
+  return 0
+
+if __name__ == "__main__":
+  sys.exit(main(sys.argv))
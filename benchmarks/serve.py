@@ -0,0 +1,78 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dispatch import COMPILERDIR, generate
+
+def percentile(samples:list[float], fraction:float) -> float:
+  ordered:list[float] = sorted(samples)
+  return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def timed(command:list[str], environment:dict[str,str]) -> float:
+  start:float = time.perf_counter()
+  subprocess.run(command, check=True, env=environment, stdout=subprocess.DEVNULL)
+  return time.perf_counter() - start
+
+def main(argv:list[str]) -> int:
+  compiler:str = COMPILERDIR
+  requests:int = 50
+  statements:int = 200
+  index:int = 1
+  while index < len(argv):
+    if argv[index] == "--compiler":
+      compiler = argv[index + 1]
+    elif argv[index] == "-n":
+      requests = int(argv[index + 1])
+    elif argv[index] == "--statements":
+      statements = int(argv[index + 1])
+    index += 2
+
+  sys.path.insert(0, compiler)
+  from protocol import listening, request
+
+  directory:str = tempfile.mkdtemp()
+  path:str = os.path.join(directory, "compiler.sock")
+  environment:dict[str,str] = dict(os.environ, PCOMPILER_SOCKET=path)
+  server:subprocess.Popen = subprocess.Popen([sys.executable, os.path.join(compiler, "main.py"), "--serve", "--socket", path], stdout=subprocess.DEVNULL)
+  try:
+    source:str = os.path.join(directory, "program.src")
+    output:str = os.path.join(directory, "program.asm")
+    with open(source, "w") as file:
+      file.write(generate(statements))
+    while not listening(path):
+      time.sleep(0.05)
+    request({"args":[source, "-o", output]}, path)
+
+    results:dict[str,list[float]] = {
+      "cold main.py":[timed([sys.executable, os.path.join(compiler, "main.py"), source, "-o", output], environment) for _ in range(requests)],
+      "client.py":[timed([sys.executable, os.path.join(compiler, "client.py"), source, "-o", output], environment) for _ in range(requests)]
+    }
+    samples:list[float] = []
+    for _ in range(requests):
+      start:float = time.perf_counter()
+      request({"args":[source, "-o", output]}, path)
+      samples.append(time.perf_counter() - start)
+    results["socket request"] = samples
+
+    start:float = time.perf_counter()
+    with ThreadPoolExecutor(8) as executor:
+      responses:list[dict] = list(executor.map(lambda _: request({"args":[source, "-o", output]}, path), range(requests)))
+    concurrent:float = time.perf_counter() - start
+    if any(response["status"] != 0 for response in responses):
+      raise ValueError
+  finally:
+    server.terminate()
+    server.wait()
+    shutil.rmtree(directory)
+
+  print(f"{statements} statements, {requests} requests each")
+  for name, samples in results.items():
+    print(f"{name}: p50 {percentile(samples, 0.5) * 1000:.1f} ms, p99 {percentile(samples, 0.99) * 1000:.1f} ms")
+  print(f"8 concurrent clients: {requests / concurrent:.1f} requests/s")
+  return 0
+
+if __name__ == "__main__":
+  sys.exit(main(sys.argv))
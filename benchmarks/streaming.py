@@ -0,0 +1,100 @@
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from dispatch import COMPILERDIR, OPERATORS
+from suite import revision
+
+NAMES:list[str] = [f"v{index}" for index in range(16)]
+POOLSIZE:int = 1000
+MEGABYTE:int = 1 << 20
+
+def statement_pool(seed:int) -> str:
+  generator:random.Random = random.Random(seed)
+
+  def expression(depth:int) -> str:
+    if depth == 0 or generator.random() < 0.2:
+      return generator.choice(NAMES) if generator.random() < 0.7 else str(generator.randrange(1, 1000))
+    return f"({expression(depth - 1)}{generator.choice(OPERATORS)}{expression(depth - 1)})"
+
+  lines:list[str] = []
+  for index in range(POOLSIZE):
+    if index % 100 == 0:
+      lines.append(f"jump done, {generator.choice(NAMES)} == {generator.randrange(1000)};")
+    lines.append(f"set {generator.choice(NAMES)}, {expression(4)};")
+  return "\n".join(lines) + "\n"
+
+def write_source(path:str, megabytes:int, seed:int) -> int:
+  pool:str = statement_pool(seed)
+  with open(path, "w") as file:
+    file.write("".join(f"res u64, {name};\n" for name in NAMES))
+    written:int = file.tell()
+    while written < megabytes * MEGABYTE:
+      file.write(pool)
+      written += len(pool)
+    file.write("label done;\nexit v0;\n")
+  return os.path.getsize(path)
+
+def measure(compiler:str, source:str, flags:list[str]) -> tuple[float,int,int]:
+  start:float = time.perf_counter()
+  process:subprocess.Popen = subprocess.Popen([sys.executable, os.path.join(compiler, "main.py"), source, "-o", os.devnull, "-O0"] + flags, stdout=subprocess.DEVNULL)
+  pid, status, usage = os.wait4(process.pid, 0)
+  process.returncode = os.waitstatus_to_exitcode(status)
+  return time.perf_counter() - start, usage.ru_maxrss * 1024, process.returncode
+
+def main(argv:list[str]) -> int:
+  compiler:str = COMPILERDIR
+  sizes:list[int] = [16, 64, 256]
+  fullLimit:int = 16
+  seed:int = 0
+  outputfile:str|None = None
+  index:int = 1
+  while index < len(argv):
+    if argv[index] == "--compiler":
+      compiler = argv[index + 1]
+    elif argv[index] == "--size":
+      sizes = [int(size) for size in argv[index + 1].split(",")]
+    elif argv[index] == "--full-limit":
+      fullLimit = int(argv[index + 1])
+    elif argv[index] == "--seed":
+      seed = int(argv[index + 1])
+    elif argv[index] == "-o":
+      outputfile = argv[index + 1]
+    index += 2
+
+  results:list[dict] = []
+  with tempfile.TemporaryDirectory() as directory:
+    source:str = os.path.join(directory, "source.src")
+    for megabytes in sizes:
+      size:int = write_source(source, megabytes, seed)
+      case:dict = {"bytes":size}
+      modes:list[tuple[str,list[str]]] = [("stream", ["--stream"])]
+      if megabytes <= fullLimit:
+        modes.append(("full", []))
+      parts:list[str] = []
+      for name, flags in modes:
+        seconds, peak, code = measure(compiler, source, flags)
+        if code != 0:
+          print(f"ERROR: {name} compilation of {megabytes} MB exits with {code}.")
+          return 1
+        case[name] = {"seconds":seconds, "peak_bytes":peak}
+        parts.append(f"{name} {peak / MEGABYTE:.1f} MB peak, {size / MEGABYTE / seconds:.2f} MB/s")
+      results.append(case)
+      print(f"{size / MEGABYTE:.0f} MB: " + ", ".join(parts), flush=True)
+
+  if outputfile is not None:
+    with open(outputfile, "w") as file:
+      json.dump({
+        "revision":revision(os.path.abspath(compiler)),
+        "python":platform.python_version(),
+        "machine":platform.machine(),
+        "results":results
+      }, file, indent=2)
+  return 0
+
+if __name__ == "__main__":
+  sys.exit(main(sys.argv))
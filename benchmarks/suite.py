@@ -0,0 +1,204 @@
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from dispatch import COMPILERDIR, OPERATORS, count_nodes
+
+SHAPES:tuple[str, ...] = ("declarations", "statements", "deep", "jumps")
+SIZES:tuple[int, ...] = (1000, 10000, 100000, 1000000, 10000000, 100000000)
+TYPES:tuple[str, ...] = ("u64", "u32", "u16", "u8")
+NAMES:int = 16
+DEPTH:int = 4
+DEEPDEPTH:int = 64
+LABELINTERVAL:int = 8
+
+class ProgramGenerator:
+  def __init__(self, shape:str, seed:int = 0) -> None:
+    if shape not in SHAPES:
+      raise ValueError
+    self.shape:str = shape
+    self.random:random.Random = random.Random(seed)
+    self.names:list[str] = [f"v{index}" for index in range(NAMES)]
+    self.count:int = 0
+
+  def operand(self) -> str:
+    if self.random.random() < 0.7:
+      return self.random.choice(self.names)
+    return str(self.random.randrange(1, 1000))
+
+  def expression(self, depth:int) -> str:
+    if depth == 0 or self.random.random() < 0.2:
+      return self.operand()
+    if self.random.random() < 0.1:
+      return "-" + self.expression(depth - 1)
+    return f"({self.expression(depth - 1)}{self.random.choice(OPERATORS)}{self.expression(depth - 1)})"
+
+  def chain(self, depth:int) -> str:
+    text:str = self.operand()
+    for _ in range(depth):
+      if self.random.random() < 0.5:
+        text = f"({text}{self.random.choice(OPERATORS)}{self.operand()})"
+      else:
+        text = f"({self.operand()}{self.random.choice(OPERATORS)}{text})"
+    return text
+
+  def statement(self) -> str:
+    self.count += 1
+    if self.shape == "declarations":
+      if self.random.random() < 0.5:
+        return f"res {self.random.choice(TYPES)}, d{self.count};"
+      return f"const {self.random.choice(TYPES)}, d{self.count}, {self.random.randrange(256)};"
+    if self.shape == "statements":
+      return f"set {self.random.choice(self.names)}, {self.expression(DEPTH)};"
+    if self.shape == "deep":
+      return f"set {self.random.choice(self.names)}, {self.chain(DEEPDEPTH)};"
+    if self.count % LABELINTERVAL == 0:
+      return f"label l{self.count};"
+    target:int = self.count + self.random.randrange(-4 * LABELINTERVAL, 4 * LABELINTERVAL)
+    if target < LABELINTERVAL:
+      return f"set {self.random.choice(self.names)}, {self.expression(2)};"
+    return f"jump l{target - target % LABELINTERVAL}, {self.expression(2)};"
+
+  def generate(self, size:int) -> str:
+    lines:list[str] = [f"res u64, {name};" for name in self.names] + [f"set {name}, {index};" for index, name in enumerate(self.names)]
+    total:int = sum(len(line) + 1 for line in lines)
+    last:int = len(lines)
+    while total < size:
+      line:str = self.statement()
+      lines.append(line)
+      total += len(line) + 1
+    if self.shape == "jumps":
+      for index in range(last, len(lines)):
+        if lines[index].startswith("jump"):
+          name:str = lines[index][5:lines[index].index(",")]
+          if int(name[1:]) > self.count:
+            lines[index] = f"set {self.names[0]}, {self.expression(2)};"
+    lines.append(f"exit {self.names[0]};")
+    return "\n".join(lines) + "\n"
+
+def timed(function) -> tuple[float,object]:
+  gc.collect()
+  gc.disable()
+  start:float = time.perf_counter()
+  result = function()
+  seconds:float = time.perf_counter() - start
+  gc.enable()
+  return seconds, result
+
+def peak(function) -> int:
+  gc.collect()
+  tracemalloc.start()
+  function()
+  result:int = tracemalloc.get_traced_memory()[1]
+  tracemalloc.stop()
+  return result
+
+def revision(compiler:str) -> str|None:
+  try:
+    return subprocess.run(["git", "rev-parse", "HEAD"], cwd=compiler, capture_output=True, text=True, check=True).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+def run_case(shape:str, size:int, seed:int, memory:bool) -> dict:
+  from lexer import Lexer
+  from parser import Parser
+  from translator import Translator
+
+  text:str = ProgramGenerator(shape, seed).generate(size)
+  lexseconds, tokens = timed(lambda: Lexer(text).tokenize())
+  parseseconds, nodes = timed(lambda: Parser(tokens).parse())
+  translateseconds, assembly = timed(lambda: Translator(nodes).translate())
+  nodecount:int = sum(count_nodes(node) for node in nodes)
+
+  stages:dict[str,dict] = {
+    "tokenize":{"seconds":lexseconds, "tokens_per_second":len(tokens) / lexseconds},
+    "parse":{"seconds":parseseconds, "tokens_per_second":len(tokens) / parseseconds, "nodes_per_second":nodecount / parseseconds},
+    "translate":{"seconds":translateseconds, "nodes_per_second":nodecount / translateseconds}
+  }
+  del assembly
+  if memory:
+    stages["tokenize"]["peak_bytes"] = peak(lambda: Lexer(text).tokenize())
+    stages["parse"]["peak_bytes"] = peak(lambda: Parser(tokens).parse())
+    stages["translate"]["peak_bytes"] = peak(lambda: Translator(nodes).translate())
+  return {"shape":shape, "size":size, "bytes":len(text), "tokens":len(tokens), "nodes":nodecount, "stages":stages}
+
+def compare(results:list[dict], filename:str) -> None:
+  with open(filename, "r") as file:
+    baseline:dict = json.load(file)
+  previous:dict[tuple[str,int],dict] = {(case["shape"], case["size"]):case for case in baseline["results"]}
+  for case in results:
+    old:dict|None = previous.get((case["shape"], case["size"]))
+    if old is None:
+      continue
+    ratios:list[str] = [f"{stage} {case['stages'][stage]['seconds'] / old['stages'][stage]['seconds']:.2f}x" for stage in case["stages"] if stage in old["stages"]]
+    print(f"{case['shape']} {case['size']}: " + ", ".join(ratios))
+
+def main(argv:list[str]) -> int:
+  compiler:str = COMPILERDIR
+  shapes:list[str] = list(SHAPES)
+  sizes:list[int] = list(SIZES)
+  maxsize:int = SIZES[-1]
+  seed:int = 0
+  memory:bool = True
+  outputfile:str|None = None
+  baselinefile:str|None = None
+  index:int = 1
+  while index < len(argv):
+    if argv[index] == "--compiler":
+      compiler = argv[index + 1]
+    elif argv[index] == "--shape":
+      shapes = argv[index + 1].split(",")
+    elif argv[index] == "--size":
+      sizes = [int(float(size)) for size in argv[index + 1].split(",")]
+    elif argv[index] == "--max-size":
+      maxsize = int(float(argv[index + 1]))
+    elif argv[index] == "--seed":
+      seed = int(argv[index + 1])
+    elif argv[index] == "-o":
+      outputfile = argv[index + 1]
+    elif argv[index] == "--compare":
+      baselinefile = argv[index + 1]
+    elif argv[index] == "--no-memory":
+      memory = False
+      index -= 1
+    index += 2
+
+  compiler = os.path.abspath(compiler)
+  sys.path.insert(0, compiler)
+  sys.setrecursionlimit(max(sys.getrecursionlimit(), 4 * DEEPDEPTH + 1000))
+
+  results:list[dict] = []
+  for shape in shapes:
+    for size in sizes:
+      if size > maxsize:
+        continue
+      case:dict = run_case(shape, size, seed, memory)
+      results.append(case)
+      stages:dict[str,dict] = case["stages"]
+      line:str = f"{shape} {case['bytes']} B: {case['tokens']} tokens, {case['nodes']} nodes | "
+      line += f"tokenize {stages['tokenize']['tokens_per_second'] / 1e6:.2f} Mtok/s, "
+      line += f"parse {stages['parse']['nodes_per_second'] / 1e6:.2f} Mnodes/s, "
+      line += f"translate {stages['translate']['nodes_per_second'] / 1e6:.2f} Mnodes/s"
+      if memory:
+        line += f" | peak {max(stage['peak_bytes'] for stage in stages.values()) / 1e6:.1f} MB"
+      print(line, flush=True)
+
+  if baselinefile is not None:
+    compare(results, baselinefile)
+  if outputfile is not None:
+    with open(outputfile, "w") as file:
+      json.dump({
+        "revision":revision(compiler),
+        "python":platform.python_version(),
+        "seed":seed,
+        "results":results
+      }, file, indent=2)
+  return 0
+
+if __name__ == "__main__":
+  sys.exit(main(sys.argv))
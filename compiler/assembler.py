@@ -0,0 +1,521 @@
+import struct
+from x86 import *
+
+REGISTERCODES:dict[str,int] = {base:code for code, base in enumerate(("rax", "rcx", "rdx", "rbx", "rsp", "rbp", "rsi", "rdi", "r8", "r9", "r10", "r11", "r12", "r13", "r14", "r15"))}
+
+CONDITIONCODES:dict[str,int] = {
+  "o":0, "no":1, "b":2, "c":2, "nae":2, "ae":3, "nb":3, "nc":3, "e":4, "z":4, "ne":5, "nz":5, "be":6, "na":6, "a":7, "nbe":7,
+  "s":8, "ns":9, "p":10, "pe":10, "np":11, "po":11, "l":12, "nge":12, "ge":13, "nl":13, "le":14, "ng":14, "g":15, "nle":15
+}
+
+ALUCODES:dict[str,int] = {"add":0, "or":1, "adc":2, "sbb":3, "and":4, "sub":5, "xor":6, "cmp":7}
+GROUPCODES:dict[str,int] = {"not":2, "neg":3, "mul":4, "imul":5, "div":6, "idiv":7}
+SHIFTCODES:dict[str,int] = {"rol":0, "ror":1, "shl":4, "sal":4, "shr":5, "sar":7}
+FIXEDCODES:dict[str,bytes] = {"syscall":b"\x0f\x05", "ret":b"\xc3", "nop":b"\x90", "cqo":b"\x48\x99"}
+
+IMMEDIATEFORMATS:dict[int,str] = {1:"<B", 2:"<H", 4:"<I", 8:"<Q"}
+SHORTJUMPLENGTH:int = 2
+DATASIZES:dict[str,int] = {"db":1, "dw":2, "dd":4, "dq":8}
+
+class Register:
+  __slots__ = ("code", "size")
+  def __init__(self, name:str) -> None:
+    base, self.size = REGISTERS[name]
+    self.code:int = REGISTERCODES[base]
+
+class Memory:
+  __slots__ = ("size", "base", "index", "scale", "displacement", "symbol")
+  def __init__(self, text:str) -> None:
+    self.size:int = memory_size(text)
+    self.base:int|None = None
+    self.index:int|None = None
+    self.scale:int = 1
+    self.displacement:int = 0
+    self.symbol:str|None = None
+    for sign, term in address_terms(text[text.index("[") + 1:-1]):
+      if "*" in term:
+        register, scale = term.split("*")
+        self.index, self.scale = REGISTERCODES[REGISTERS[register][0]], int(scale)
+      elif is_register(term) and self.base is None and sign == 1:
+        self.base = REGISTERCODES[REGISTERS[term][0]]
+      elif is_register(term) and self.index is None and sign == 1:
+        self.index = REGISTERCODES[REGISTERS[term][0]]
+      elif term.isdigit():
+        self.displacement += sign * int(term)
+      elif self.symbol is None and sign == 1:
+        self.symbol = term
+      else:
+        raise ValueError
+    if self.index == 4 or self.scale not in (1, 2, 4, 8):
+      raise ValueError
+
+class Image:
+  def __init__(self, text:bytearray, data:bytearray, bss:int, symbols:dict[str,tuple[str,int]], fixups:list[tuple[int,str,int]]) -> None:
+    self.text:bytearray = text
+    self.data:bytearray = data
+    self.bss:int = bss
+    self.symbols:dict[str,tuple[str,int]] = symbols
+    self.fixups:list[tuple[int,str,int]] = fixups
+
+def address_terms(text:str) -> list[tuple[int,str]]:
+  terms:list[tuple[int,str]] = []
+  sign:int = 1
+  start:int = 0
+  for index, character in enumerate(text + "+"):
+    if character in "+-":
+      term:str = text[start:index].strip()
+      if term:
+        terms.append((sign, term))
+      elif index != 0:
+        raise ValueError
+      sign = 1 if character == "+" else -1
+      start = index + 1
+  return terms
+
+def fits_signed8(value:int, size:int) -> bool:
+  value &= (1 << 8 * size) - 1
+  return value < 0x80 or value >= (1 << 8 * size) - 0x80
+
+class Assembler:
+  def __init__(self, lines) -> None:
+    self.lines = lines
+    self.data:bytearray = bytearray()
+    self.bss:int = 0
+    self.symbols:dict[str,tuple[str,int]] = {}
+    self.items:list = []
+    self.code:bytearray = bytearray()
+    self.fixups:list[tuple[int,int,str,int]] = []
+    self.encodings:dict[str,tuple[bytes,list[tuple[int,str,int]]]] = {}
+
+    self.sections:dict[str,callable] = {
+      ".text":self.add_text,
+      ".data":self.add_data,
+      ".bss":self.add_bss
+    }
+    self.instructions:dict[str,callable] = {
+      "mov":self.encode_mov,
+      "movzx":self.encode_extend,
+      "movsx":self.encode_extend,
+      "lea":self.encode_lea,
+      "test":self.encode_test,
+      "imul":self.encode_imul,
+      "inc":self.encode_step,
+      "dec":self.encode_step,
+      "push":self.encode_push,
+      "pop":self.encode_pop,
+      "xchg":self.encode_xchg
+    }
+    for mnemonic in ALUCODES:
+      self.instructions[mnemonic] = self.encode_alu
+    for mnemonic in GROUPCODES.keys() - {"imul"}:
+      self.instructions[mnemonic] = self.encode_group
+    for mnemonic in SHIFTCODES:
+      self.instructions[mnemonic] = self.encode_shift
+    for mnemonic in FIXEDCODES:
+      self.instructions[mnemonic] = self.encode_fixed
+    for condition in CONDITIONCODES:
+      self.instructions[f"set{condition}"] = self.encode_set
+
+  def assemble(self) -> Image:
+    handler:callable = None
+    for line in self.lines:
+      line = line.strip()
+      if not line or line.startswith("global "):
+        continue
+      if line.startswith("section "):
+        handler = self.sections.get(line[8:].strip())
+        if handler is None:
+          raise ValueError
+        continue
+      if handler is None:
+        raise ValueError
+      handler(line)
+    self.items.append(self.code)
+    return self.layout()
+
+  def define(self, name:str, section:str, offset:int) -> None:
+    if name in self.symbols:
+      raise ValueError
+    self.symbols[name] = (section, offset)
+
+  def add_data(self, line:str) -> None:
+    name, directive, value = line.replace(":", " ", 1).split()
+    size:int = DATASIZES.get(directive)
+    if size is None:
+      raise ValueError
+    self.define(name, ".data", len(self.data))
+    self.data += struct.pack(IMMEDIATEFORMATS[size], int(value) & ((1 << 8 * size) - 1))
+
+  def add_bss(self, line:str) -> None:
+    name, directive, size = line.replace(":", " ", 1).split()
+    if directive != "resb":
+      raise ValueError
+    self.define(name, ".bss", self.bss)
+    self.bss += int(size)
+
+  def add_text(self, line:str) -> None:
+    encoding:tuple[bytes,list[tuple[int,str,int]]]|None = self.encodings.get(line)
+    if encoding is not None:
+      code, fixups = encoding
+      for offset, symbol, addend in fixups:
+        self.fixups.append((len(self.items), len(self.code) + offset, symbol, addend))
+      self.code += code
+      return
+    instruction:Instruction = Instruction(line)
+    if instruction.label is not None:
+      self.items.append(self.code)
+      self.items.append(instruction.label)
+      self.code = bytearray()
+      return
+    mnemonic:str = instruction.mnemonic
+    if mnemonic[0] == "j":
+      condition:int|None = None if mnemonic == "jmp" else CONDITIONCODES.get(mnemonic[1:])
+      if (condition is None and mnemonic != "jmp") or len(instruction.operands) != 1 or not instruction.operands[0].isidentifier():
+        raise ValueError
+      self.items.append(self.code)
+      self.items.append((condition, instruction.operands[0]))
+      self.code = bytearray()
+      return
+    handler:callable = self.instructions.get(mnemonic)
+    if handler is None:
+      raise ValueError
+    start:int = len(self.code)
+    count:int = len(self.fixups)
+    handler(mnemonic, [self.operand(operand) for operand in instruction.operands])
+    self.encodings[line] = (bytes(self.code[start:]), [(offset - start, symbol, addend) for _, offset, symbol, addend in self.fixups[count:]])
+
+  def operand(self, text:str) -> Register|Memory|int|str:
+    if is_register(text):
+      return Register(text)
+    if is_memory(text):
+      return Memory(text)
+    if is_immediate(text):
+      return int(text)
+    if text.isidentifier():
+      return text
+    raise ValueError
+
+  def fixup(self, symbol:str, addend:int = 0) -> None:
+    self.fixups.append((len(self.items), len(self.code), symbol, addend))
+
+  def encode(self, opcode:bytes, reg:int, rm:Register|Memory, size:int, immediate:int|str|None = None, immediatesize:int = 0, byteregister:bool = False) -> None:
+    code:bytearray = self.code
+    if size == 2:
+      code.append(0x66)
+    rex:int = 0x40 | (size == 8) << 3 | (reg >> 3) << 2
+    if isinstance(rm, Register):
+      rex |= rm.code >> 3
+      byteregister = byteregister or (rm.size == 1 and 4 <= rm.code < 8)
+    else:
+      rex |= ((rm.index or 0) >> 3) << 1 | ((rm.base or 0) >> 3)
+    if rex != 0x40 or byteregister:
+      code.append(rex)
+    code += opcode
+
+    if isinstance(rm, Register):
+      code.append(0xc0 | (reg & 7) << 3 | rm.code & 7)
+    elif rm.base is None and rm.index is None:
+      code += bytes((0x04 | (reg & 7) << 3, 0x25))
+      self.address(rm)
+    else:
+      base:int = 5 if rm.base is None else rm.base & 7
+      if rm.base is None:
+        mode:int = 0
+      elif rm.symbol is not None or not fits_signed8(rm.displacement, 8):
+        mode = 2
+      elif rm.displacement or base == 5:
+        mode = 1
+      else:
+        mode = 0
+      if rm.index is None and base != 4:
+        code.append(mode << 6 | (reg & 7) << 3 | base)
+      else:
+        code.append(mode << 6 | (reg & 7) << 3 | 4)
+        code.append((rm.scale.bit_length() - 1) << 6 | (4 if rm.index is None else rm.index & 7) << 3 | base)
+      if mode == 1:
+        code.append(rm.displacement & 0xff)
+      elif mode == 2 or rm.base is None:
+        self.address(rm)
+
+    if immediatesize:
+      self.immediate(immediate, immediatesize, size)
+
+  def address(self, memory:Memory) -> None:
+    if memory.symbol is not None:
+      self.fixup(memory.symbol, memory.displacement)
+      self.code += bytes(4)
+    else:
+      self.code += struct.pack("<I", memory.displacement & 0xffffffff)
+
+  def immediate(self, value:int|str, size:int, operandsize:int) -> None:
+    if isinstance(value, str):
+      if size != 4:
+        raise ValueError
+      self.fixup(value)
+      self.code += bytes(4)
+      return
+    mask:int = (1 << 8 * operandsize) - 1
+    value &= mask
+    if size < operandsize and not (value < 1 << (8 * size - 1) or value > mask - (1 << (8 * size - 1))):
+      raise ValueError
+    self.code += struct.pack(IMMEDIATEFORMATS[size], value & ((1 << 8 * size) - 1))
+
+  def sized(self, operands:list, count:int) -> int:
+    if len(operands) != count:
+      raise ValueError
+    sizes:set[int] = {operand.size for operand in operands if isinstance(operand, (Register, Memory)) and operand.size}
+    if len(sizes) != 1:
+      raise ValueError
+    return sizes.pop()
+
+  def byte_registers(self, *operands) -> bool:
+    return any(isinstance(operand, Register) and operand.size == 1 and 4 <= operand.code < 8 for operand in operands)
+
+  def encode_mov(self, mnemonic:str, operands:list) -> None:
+    target, source = operands
+    size:int = self.sized(operands, 2)
+    wide:int = size != 1
+    if isinstance(source, Register):
+      self.encode(bytes((0x88 | wide,)), source.code, target, size, byteregister=self.byte_registers(source))
+    elif isinstance(source, Memory):
+      if not isinstance(target, Register):
+        raise ValueError
+      self.encode(bytes((0x8a | wide,)), target.code, source, size, byteregister=self.byte_registers(target))
+    elif isinstance(target, Register):
+      value:int|str = source if isinstance(source, str) else source & ((1 << 8 * size) - 1)
+      if size == 8 and isinstance(value, int) and value >> 32:
+        if fits_imm32(value):
+          self.encode(b"\xc7", 0, target, 8, value, 4)
+          return
+        self.code.append(0x48 | target.code >> 3)
+        self.code.append(0xb8 | target.code & 7)
+        self.immediate(value, 8, 8)
+        return
+      if size == 2:
+        self.code.append(0x66)
+      if target.code >> 3 or self.byte_registers(target):
+        self.code.append(0x40 | target.code >> 3)
+      self.code.append((0xb0 if size == 1 else 0xb8) | target.code & 7)
+      self.immediate(value, min(size, 4), min(size, 4))
+    else:
+      self.encode(bytes((0xc6 | wide,)), 0, target, size, source, min(size, 4))
+
+  def encode_extend(self, mnemonic:str, operands:list) -> None:
+    if len(operands) != 2 or not isinstance(operands[0], Register) or isinstance(operands[1], (int, str)):
+      raise ValueError
+    target, source = operands
+    if source.size not in (1, 2) or target.size <= source.size:
+      raise ValueError
+    opcode:int = (0xb6 if mnemonic == "movzx" else 0xbe) | (source.size == 2)
+    self.encode(bytes((0x0f, opcode)), target.code, source, target.size, byteregister=self.byte_registers(source))
+
+  def encode_lea(self, mnemonic:str, operands:list) -> None:
+    if len(operands) != 2 or not isinstance(operands[0], Register) or not isinstance(operands[1], Memory) or operands[0].size == 1:
+      raise ValueError
+    self.encode(b"\x8d", operands[0].code, operands[1], operands[0].size)
+
+  def encode_alu(self, mnemonic:str, operands:list) -> None:
+    code:int = ALUCODES[mnemonic]
+    target, source = operands if len(operands) == 2 else (None, None)
+    size:int = self.sized(operands, 2)
+    wide:int = size != 1
+    if isinstance(source, Register):
+      self.encode(bytes((code << 3 | wide,)), source.code, target, size, byteregister=self.byte_registers(source))
+    elif isinstance(source, Memory):
+      if not isinstance(target, Register):
+        raise ValueError
+      self.encode(bytes((code << 3 | 2 | wide,)), target.code, source, size, byteregister=self.byte_registers(target))
+    elif size != 1 and isinstance(source, int) and fits_signed8(source, size):
+      self.encode(b"\x83", code, target, size, source, 1)
+    elif isinstance(target, Register) and target.code == 0:
+      self.encode_accumulator(code << 3 | 4, size, source)
+    else:
+      self.encode(bytes((0x80 | wide,)), code, target, size, source, min(size, 4))
+
+  def encode_accumulator(self, opcode:int, size:int, value:int|str) -> None:
+    if size == 2:
+      self.code.append(0x66)
+    elif size == 8:
+      self.code.append(0x48)
+    self.code.append(opcode | (size != 1))
+    self.immediate(value, min(size, 4), size)
+
+  def encode_test(self, mnemonic:str, operands:list) -> None:
+    target, source = operands if len(operands) == 2 else (None, None)
+    size:int = self.sized(operands, 2)
+    wide:int = size != 1
+    if isinstance(source, Register):
+      self.encode(bytes((0x84 | wide,)), source.code, target, size, byteregister=self.byte_registers(source))
+    elif isinstance(source, Memory):
+      raise ValueError
+    elif isinstance(target, Register) and target.code == 0:
+      self.encode_accumulator(0xa8, size, source)
+    else:
+      self.encode(bytes((0xf6 | wide,)), 0, target, size, source, min(size, 4))
+
+  def encode_imul(self, mnemonic:str, operands:list) -> None:
+    if len(operands) == 1:
+      self.encode_group(mnemonic, operands)
+      return
+    if len(operands) == 2 and isinstance(operands[1], (int, str)):
+      operands = [operands[0], operands[0], operands[1]]
+    target:Register = operands[0]
+    if not isinstance(target, Register) or target.size == 1 or isinstance(operands[1], (int, str)):
+      raise ValueError
+    size:int = self.sized(operands[:2], 2)
+    if len(operands) == 2:
+      self.encode(b"\x0f\xaf", target.code, operands[1], size)
+    elif len(operands) == 3 and isinstance(operands[2], int) and fits_signed8(operands[2], size):
+      self.encode(b"\x6b", target.code, operands[1], size, operands[2], 1)
+    elif len(operands) == 3:
+      self.encode(b"\x69", target.code, operands[1], size, operands[2], min(size, 4))
+    else:
+      raise ValueError
+
+  def encode_group(self, mnemonic:str, operands:list) -> None:
+    size:int = self.sized(operands, 1)
+    self.encode(bytes((0xf6 | (size != 1),)), GROUPCODES[mnemonic], operands[0], size)
+
+  def encode_step(self, mnemonic:str, operands:list) -> None:
+    size:int = self.sized(operands, 1)
+    self.encode(bytes((0xfe | (size != 1),)), mnemonic == "dec", operands[0], size)
+
+  def encode_shift(self, mnemonic:str, operands:list) -> None:
+    if len(operands) != 2:
+      raise ValueError
+    target, count = operands
+    size:int = self.sized(operands[:1], 1)
+    wide:int = size != 1
+    if isinstance(count, Register) and count.code == 1 and count.size == 1:
+      self.encode(bytes((0xd2 | wide,)), SHIFTCODES[mnemonic], target, size)
+    elif isinstance(count, int) and count & 0xff == 1:
+      self.encode(bytes((0xd0 | wide,)), SHIFTCODES[mnemonic], target, size)
+    elif isinstance(count, int):
+      self.encode(bytes((0xc0 | wide,)), SHIFTCODES[mnemonic], target, size, count & 0xff, 1)
+    else:
+      raise ValueError
+
+  def encode_push(self, mnemonic:str, operands:list) -> None:
+    if len(operands) != 1:
+      raise ValueError
+    operand = operands[0]
+    if isinstance(operand, Register) and operand.size == 8:
+      if operand.code >> 3:
+        self.code.append(0x41)
+      self.code.append(0x50 | operand.code & 7)
+    elif isinstance(operand, Memory) and operand.size in (0, 8):
+      self.encode(b"\xff", 6, operand, 4)
+    elif isinstance(operand, int) and fits_signed8(operand, 8):
+      self.code.append(0x6a)
+      self.immediate(operand, 1, 8)
+    elif isinstance(operand, (int, str)):
+      self.code.append(0x68)
+      self.immediate(operand, 4, 8)
+    else:
+      raise ValueError
+
+  def encode_pop(self, mnemonic:str, operands:list) -> None:
+    if len(operands) != 1:
+      raise ValueError
+    operand = operands[0]
+    if isinstance(operand, Register) and operand.size == 8:
+      if operand.code >> 3:
+        self.code.append(0x41)
+      self.code.append(0x58 | operand.code & 7)
+    elif isinstance(operand, Memory) and operand.size in (0, 8):
+      self.encode(b"\x8f", 0, operand, 4)
+    else:
+      raise ValueError
+
+  def encode_xchg(self, mnemonic:str, operands:list) -> None:
+    size:int = self.sized(operands, 2)
+    first, second = operands
+    if isinstance(second, Register) and isinstance(first, Register) and size != 1 and (first.code == 0 or second.code == 0) and (size != 4 or first.code != second.code):
+      other:Register = second if first.code == 0 else first
+      if size == 2:
+        self.code.append(0x66)
+      if size == 8 or other.code >> 3:
+        self.code.append(0x40 | (size == 8) << 3 | other.code >> 3)
+      self.code.append(0x90 | other.code & 7)
+    elif isinstance(second, Register):
+      self.encode(bytes((0x86 | (size != 1),)), second.code, first, size, byteregister=self.byte_registers(second))
+    elif isinstance(first, Register):
+      self.encode(bytes((0x86 | (size != 1),)), first.code, second, size, byteregister=self.byte_registers(first))
+    else:
+      raise ValueError
+
+  def encode_set(self, mnemonic:str, operands:list) -> None:
+    if self.sized(operands, 1) != 1:
+      raise ValueError
+    self.encode(bytes((0x0f, 0x90 | CONDITIONCODES[mnemonic[3:]])), 0, operands[0], 1)
+
+  def encode_fixed(self, mnemonic:str, operands:list) -> None:
+    if operands:
+      raise ValueError
+    self.code += FIXEDCODES[mnemonic]
+
+  def layout(self) -> Image:
+    items:list = self.items
+    long:list[bool] = [False] * len(items)
+    changed:bool = True
+    while changed:
+      changed = False
+      labels:dict[str,int] = {}
+      positions:list[int] = []
+      position:int = 0
+      for index, item in enumerate(items):
+        positions.append(position)
+        if isinstance(item, bytearray):
+          position += len(item)
+        elif isinstance(item, str):
+          if item in labels or item in self.symbols:
+            raise ValueError
+          labels[item] = position
+        else:
+          position += (5 + (item[0] is not None)) if long[index] else SHORTJUMPLENGTH
+      for index, item in enumerate(items):
+        if isinstance(item, tuple) and not long[index]:
+          target:int|None = labels.get(item[1])
+          if target is None:
+            raise ValueError
+          if not -128 <= target - positions[index] - SHORTJUMPLENGTH < 128:
+            long[index] = True
+            changed = True
+
+    text:bytearray = bytearray()
+    for index, item in enumerate(items):
+      if isinstance(item, bytearray):
+        text += item
+      elif isinstance(item, tuple):
+        condition, target = item
+        end:int = positions[index] + ((5 + (condition is not None)) if long[index] else SHORTJUMPLENGTH)
+        offset:int = labels[target] - end
+        if not long[index]:
+          text += bytes((0xeb if condition is None else 0x70 | condition, offset & 0xff))
+        elif condition is None:
+          text += b"\xe9" + struct.pack("<i", offset)
+        else:
+          text += bytes((0x0f, 0x80 | condition)) + struct.pack("<i", offset)
+
+    symbols:dict[str,tuple[str,int]] = dict(self.symbols)
+    for name, position in labels.items():
+      symbols[name] = (".text", position)
+    fixups:list[tuple[int,str,int]] = [(positions[index] + offset, symbol, addend) for index, offset, symbol, addend in self.fixups]
+    return Image(text, self.data, self.bss, symbols, fixups)
+
+def section_statistics(lines) -> dict[str,tuple[int,int]]:
+  lines = [line.strip() for line in lines]
+  image:Image = Assembler(lines).assemble()
+  sizes:dict[str,int] = {".text":len(image.text), ".data":len(image.data), ".bss":image.bss}
+  counts:dict[str,int] = {}
+  section:str = None
+  for line in lines:
+    if line.startswith("section "):
+      section = line[8:]
+      counts.setdefault(section, 0)
+    elif section == ".text" and line and not line.startswith("global "):
+      counts[section] += Instruction(line).mnemonic is not None
+  return {section:(instructions, sizes[section]) for section, instructions in counts.items()}
+
+def section_sizes(lines) -> dict[str,int]:
+  return {section:size for section, (instructions, size) in section_statistics(lines).items()}
@@ -1,3 +1,5 @@
+from types import GeneratorType
+
 ASTT_RESERVE = "reserve"
 ASTT_SET = "set"
 ASTT_EXIT = "exit"
@@ -26,234 +28,324 @@ ASTT_GREATER_EQUAL = "greater_equal"
 ASTT_LOWER_EQUAL = "lower_equal"
 ASTT_NOT_EQUAL = "not_equal"
 
+LEAFTYPES:set[str] = {ASTT_NUM, ASTT_VARCALL, ASTT_POINTER}
+UNARYTYPES:set[str] = {ASTT_PLUSSIGN, ASTT_MINUSSIGN, ASTT_NOT}
+COMPARISONTYPES:set[str] = {ASTT_EQUAL, ASTT_NOT_EQUAL, ASTT_GREATER, ASTT_LOWER, ASTT_GREATER_EQUAL, ASTT_LOWER_EQUAL}
+BINARYTYPES:set[str] = {ASTT_ADD, ASTT_SUBTRACT, ASTT_MULTIPLY, ASTT_DIVIDE, ASTT_MODULUS, ASTT_AND, ASTT_OR, ASTT_XOR} | COMPARISONTYPES
+EXPRESSIONTYPES:set[str] = LEAFTYPES | UNARYTYPES | BINARYTYPES
+WRAPPINGTYPES:set[str] = {ASTT_ADD, ASTT_SUBTRACT, ASTT_MULTIPLY, ASTT_AND, ASTT_OR, ASTT_XOR} | UNARYTYPES
+
 class ASTNode:
+  __slots__ = ()
   asttype:str
 
+  def __repr__(self) -> str:
+    return format_node(self)
+
 class ASTNum(ASTNode):
+  __slots__ = ("value",)
   asttype:str = ASTT_NUM
-  def __init__(self, value:str) -> None:
-    self.value:str = value
-
-  def __repr__(self) -> str:
-    return f"({self.asttype}, {self.value})"
+  def __init__(self, value:int) -> None:
+    self.value:int = value
 
 class ASTVarcall(ASTNode):
+  __slots__ = ("name",)
   asttype:str = ASTT_VARCALL
   def __init__(self, name:str) -> None:
     self.name:str = name
 
-  def __repr__(self) -> str:
-    return f"({self.asttype}, {self.name})"
-
 class ASTReserve(ASTNode):
+  __slots__ = ("name", "size")
   asttype:str = ASTT_RESERVE
   def __init__(self, name:str, size:int) -> None:
     self.name:str = name
     self.size:int = size
 
-  def __repr__(self) -> str:
-    return f"({self.asttype}, {self.name}, {self.size})"
-
 class ASTSet(ASTNode):
+  __slots__ = ("name", "value")
   asttype:str = ASTT_SET
   def __init__(self, name:str, value) -> None:
     self.name:str = name
     self.value = value
 
-  def __repr__(self) -> str:
-    return f"({self.asttype}, {self.name}, {self.value})"
-
 class ASTExit(ASTNode):
+  __slots__ = ("value",)
   asttype:str = ASTT_EXIT
   def __init__(self, value) -> None:
     self.value = value
-  
-  def __repr__(self) -> str:
-    return f"({self.asttype}, {self.value})"
 
 class ASTConst(ASTNode):
+  __slots__ = ("name", "size", "value")
   asttype:str = ASTT_CONST
-  def __init__(self, name:str, size:int, value:str) -> None:
+  def __init__(self, name:str, size:int, value:int) -> None:
     self.name = name
     self.size = size
     self.value = value
-  
-  def __repr__(self) -> str:
-    return f"({self.asttype}, {self.name}, {self.size}, {self.value})"
 
 class ASTPointer(ASTNode):
+  __slots__ = ("name",)
   asttype:str = ASTT_POINTER
   def __init__(self, name:str) -> None:
     self.name = name
-  
-  def __repr__(self) -> str:
-    return f"({self.asttype}, {self.name})"
 
 class ASTLabel(ASTNode):
+  __slots__ = ("name",)
   asttype:str = ASTT_LABEL
   def __init__(self, name:str) -> None:
     self.name = name
-  
-  def __repr__(self) -> str:
-    return f"({self.asttype}, {self.name})"
 
 class ASTJump(ASTNode):
+  __slots__ = ("name", "value")
   asttype:str = ASTT_JUMP
   def __init__(self, name:str, value) -> None:
     self.name = name
     self.value = value
-  
-  def __repr__(self) -> str:
-    return f"({self.asttype}, {self.name}, {self.value})"
 
 ###
 
 class ASTAdd(ASTNode):
+  __slots__ = ("a", "b")
   asttype:str = ASTT_ADD
   def __init__(self, a, b) -> None:
     self.a = a
     self.b = b
 
-  def __repr__(self) -> str:
-    return f"({self.asttype}, {self.a}, {self.b})"
-
 class ASTSubtract(ASTNode):
+  __slots__ = ("a", "b")
   asttype:str = ASTT_SUBTRACT
   def __init__(self, a, b) -> None:
     self.a = a
     self.b = b
 
-  def __repr__(self) -> str:
-    return f"({self.asttype}, {self.a}, {self.b})"
-
 class ASTMultiply(ASTNode):
+  __slots__ = ("a", "b")
   asttype:str = ASTT_MULTIPLY
   def __init__(self, a, b) -> None:
     self.a = a
     self.b = b
 
-  def __repr__(self) -> str:
-    return f"({self.asttype}, {self.a}, {self.b})"
-
 class ASTDivide(ASTNode):
+  __slots__ = ("a", "b")
   asttype:str = ASTT_DIVIDE
   def __init__(self, a, b) -> None:
     self.a = a
     self.b = b
 
-  def __repr__(self) -> str:
-    return f"({self.asttype}, {self.a}, {self.b})"
-
 class ASTPlussign(ASTNode):
+  __slots__ = ("a",)
   asttype:str = ASTT_PLUSSIGN
   def __init__(self, a) -> None:
     self.a = a
 
-  def __repr__(self) -> str:
-    return f"({self.asttype}, {self.a})"
-
 class ASTMinussign(ASTNode):
+  __slots__ = ("a",)
   asttype:str = ASTT_MINUSSIGN
   def __init__(self, a) -> None:
     self.a = a
 
-  def __repr__(self) -> str:
-    return f"({self.asttype}, {self.a})"
-
 class ASTAnd(ASTNode):
+  __slots__ = ("a", "b")
   asttype:str = ASTT_AND
   def __init__(self, a, b) -> None:
     self.a = a
     self.b = b
   
-  def __repr__(self) -> str:
-    return f"({self.asttype}, {self.a}, {self.b})"
-  
 class ASTOr(ASTNode):
+  __slots__ = ("a", "b")
   asttype:str = ASTT_OR
   def __init__(self, a, b) -> None:
     self.a = a
     self.b = b
-  
-  def __repr__(self) -> str:
-    return f"({self.asttype}, {self.a}, {self.b})"
 
 class ASTNot(ASTNode):
+  __slots__ = ("a",)
   asttype:str = ASTT_NOT
   def __init__(self, a) -> None:
     self.a = a
-  
-  def __repr__(self) -> str:
-    return f"({self.asttype}, {self.a})"
 
 class ASTXor(ASTNode):
+  __slots__ = ("a", "b")
   asttype:str = ASTT_XOR
   def __init__(self, a, b) -> None:
     self.a = a
     self.b = b
-  
-  def __repr__(self) -> str:
-    return f"({self.asttype}, {self.a}, {self.b})"
 
 class ASTModulus(ASTNode):
+  __slots__ = ("a", "b")
   asttype:str = ASTT_MODULUS
   def __init__(self, a, b) -> None:
     self.a = a
     self.b = b
-  
-  def __repr__(self) -> str:
-    return f"({self.asttype}, {self.a}, {self.b})"
 
 class ASTEqual(ASTNode):
+  __slots__ = ("a", "b")
   asttype:str = ASTT_EQUAL
   def __init__(self, a, b) -> None:
     self.a = a
     self.b = b
 
-  def __repr__(self) -> str:
-    return f"({self.asttype}, {self.a}, {self.b})"
-
 class ASTGreater(ASTNode):
+  __slots__ = ("a", "b")
   asttype:str = ASTT_GREATER
   def __init__(self, a, b) -> None:
     self.a = a
     self.b = b
 
-  def __repr__(self) -> str:
-    return f"({self.asttype}, {self.a}, {self.b})"
-
 class ASTLower(ASTNode):
+  __slots__ = ("a", "b")
   asttype:str = ASTT_LOWER
   def __init__(self, a, b) -> None:
     self.a = a
     self.b = b
 
-  def __repr__(self) -> str:
-    return f"({self.asttype}, {self.a}, {self.b})"
-
 class ASTGreaterequal(ASTNode):
+  __slots__ = ("a", "b")
   asttype:str = ASTT_GREATER_EQUAL
   def __init__(self, a, b) -> None:
     self.a = a
     self.b = b
 
-  def __repr__(self) -> str:
-    return f"({self.asttype}, {self.a}, {self.b})"
-
 class ASTLowerequal(ASTNode):
+  __slots__ = ("a", "b")
   asttype:str = ASTT_LOWER_EQUAL
   def __init__(self, a, b) -> None:
     self.a = a
     self.b = b
 
-  def __repr__(self) -> str:
-    return f"({self.asttype}, {self.a}, {self.b})"
-
 class ASTNotequal(ASTNode):
+  __slots__ = ("a", "b")
   asttype:str = ASTT_NOT_EQUAL
   def __init__(self, a, b) -> None:
     self.a = a
     self.b = b
 
-  def __repr__(self) -> str:
-    return f"({self.asttype}, {self.a}, {self.b})"
\ No newline at end of file
+###
+
+NODECLASSES:dict[str,type] = {nodeclass.asttype:nodeclass for nodeclass in ASTNode.__subclasses__()}
+
+def is_condition(node:ASTNode) -> bool:
+  stack:list[ASTNode] = [node]
+  while stack:
+    node = stack.pop()
+    if node.asttype == ASTT_AND or node.asttype == ASTT_OR:
+      stack.append(node.b)
+      stack.append(node.a)
+    elif node.asttype not in COMPARISONTYPES:
+      return False
+  return True
+
+def format_node(node:ASTNode) -> str:
+  parts:list[str] = []
+  stack:list[ASTNode|str] = [node]
+  while stack:
+    item:ASTNode|str = stack.pop()
+    if isinstance(item, str):
+      parts.append(item)
+      continue
+    stack.append(")")
+    for field in reversed(NODECLASSES[item.asttype].__slots__):
+      value = getattr(item, field)
+      stack.append(value if hasattr(value, "asttype") else str(value))
+      stack.append(", ")
+    stack.append(f"({item.asttype}")
+  return "".join(parts)
+
+def register_needs(node:ASTNode, needs:dict[ASTNode,int]) -> int:
+  stack:list[ASTNode] = [node]
+  while stack:
+    top:ASTNode = stack[-1]
+    if top in needs:
+      stack.pop()
+    elif top.asttype in LEAFTYPES:
+      needs[top] = 1
+      stack.pop()
+    elif top.asttype in UNARYTYPES:
+      a:ASTNode = top.a
+      if a in needs:
+        needs[top] = needs[a]
+        stack.pop()
+      else:
+        stack.append(a)
+    else:
+      a:ASTNode = top.a
+      b:ASTNode = top.b
+      if a in needs and b in needs:
+        needs[top] = needs[a] + 1 if needs[a] == needs[b] else max(needs[a], needs[b])
+        stack.pop()
+      else:
+        if b not in needs:
+          stack.append(b)
+        if a not in needs:
+          stack.append(a)
+  return needs[node]
+
+def value_bits(node:ASTNode, sizes:callable, bits:dict[ASTNode,int]) -> int:
+  stack:list[ASTNode] = [node]
+  while stack:
+    top:ASTNode = stack[-1]
+    type:str = top.asttype
+    if top in bits:
+      stack.pop()
+    elif type == ASTT_NUM:
+      bits[top] = (top.value & ((1 << 64) - 1)).bit_length()
+      stack.pop()
+    elif type == ASTT_VARCALL:
+      bits[top] = 8 * sizes(top.name)
+      stack.pop()
+    elif type == ASTT_POINTER:
+      bits[top] = 64
+      stack.pop()
+    elif type in UNARYTYPES:
+      a:ASTNode = top.a
+      if a in bits:
+        bits[top] = bits[a] if type == ASTT_PLUSSIGN else 64
+        stack.pop()
+      else:
+        stack.append(a)
+    else:
+      a:ASTNode = top.a
+      b:ASTNode = top.b
+      if a in bits and b in bits:
+        bits[top] = min(64, combined_bits(type, bits[a], bits[b]))
+        stack.pop()
+      else:
+        if b not in bits:
+          stack.append(b)
+        if a not in bits:
+          stack.append(a)
+  return bits[node]
+
+def combined_bits(type:str, a:int, b:int) -> int:
+  if type in COMPARISONTYPES:
+    return 1
+  elif type == ASTT_ADD:
+    return max(a, b) + 1
+  elif type == ASTT_MULTIPLY:
+    return a + b
+  elif type == ASTT_DIVIDE:
+    return a
+  elif type == ASTT_MODULUS or type == ASTT_AND:
+    return min(a, b)
+  elif type == ASTT_OR or type == ASTT_XOR:
+    return max(a, b)
+  return 64
+
+def trampoline(generator:GeneratorType):
+  if not isinstance(generator, GeneratorType):
+    return generator
+  stack:list[GeneratorType] = [generator]
+  value = None
+  while True:
+    try:
+      request = stack[-1].send(value)
+    except StopIteration as stop:
+      stack.pop()
+      if not stack:
+        return stop.value
+      value = stop.value
+      continue
+    if isinstance(request, GeneratorType):
+      stack.append(request)
+      value = None
+    else:
+      value = request
\ No newline at end of file
@@ -0,0 +1,459 @@
+from ir import *
+from emitter import *
+from regalloc import *
+from peephole import *
+from strength import *
+from varalloc import *
+from folding import size_mask
+
+STORAGESIZES:dict[int,tuple[str,str]] = {
+  1:("db", "byte"),
+  2:("dw", "word"),
+  4:("dd", "dword"),
+  8:("dq", "qword")
+}
+
+ALUMNEMONICS:dict[str,str] = {IR_ADD:"add", IR_SUB:"sub", IR_MUL:"imul", IR_AND:"and", IR_OR:"or", IR_XOR:"xor"}
+
+SWAPPEDCONDITIONS:dict[str,str] = {"e":"e", "ne":"ne", "g":"l", "l":"g", "ge":"le", "le":"ge"}
+
+UNSIGNEDCONDITIONS:dict[str,str] = {"e":"e", "ne":"ne", "g":"a", "l":"b", "ge":"ae", "le":"be"}
+
+MEMORYNAMES:dict[int,str] = {size:name for name, size in MEMORYSIZES.items()}
+
+WRAPPINGOPS:set[str] = {IR_COPY, IR_ADD, IR_SUB, IR_MUL, IR_OR, IR_XOR, IR_NEG, IR_NOT}
+
+MASK32:int = (1 << 32) - 1
+WIDENING:int = 3
+
+def result_bits(instruction:IRInstruction, bits:dict[VReg,int]) -> int:
+  opcode:str = instruction.opcode
+  if opcode == IR_LOAD:
+    return 8 * instruction.size
+  if opcode in COMPARISONOPS:
+    return 1
+  args:list[int] = [(arg & MASK64).bit_length() if isinstance(arg, int) else bits.get(arg, 0) for arg in instruction.args]
+  if opcode == IR_COPY:
+    return args[0]
+  if opcode == IR_ADD:
+    return min(64, max(args) + 1)
+  if opcode == IR_MUL:
+    return min(64, args[0] + args[1])
+  if opcode == IR_DIV:
+    return args[0]
+  if opcode == IR_MOD or opcode == IR_AND:
+    return min(args)
+  if opcode == IR_OR or opcode == IR_XOR:
+    return max(args)
+  return 64
+
+def argument_demand(instruction:IRInstruction, index:int, demand:dict[VReg,int]) -> int:
+  opcode:str = instruction.opcode
+  if opcode == IR_STORE:
+    return 8 * instruction.size
+  if opcode == IR_EXIT:
+    return 8
+  if opcode in WRAPPINGOPS:
+    return demand.get(instruction.dest, 0)
+  if opcode == IR_AND:
+    other:Operand = instruction.args[1 - index]
+    if isinstance(other, int):
+      return min(demand.get(instruction.dest, 0), (other & MASK64).bit_length())
+    return demand.get(instruction.dest, 0)
+  return 64
+
+class Backend:
+  def __init__(self, program:IRProgram, peephole:Peephole = None, allocator:VariableAllocator = None) -> None:
+    self.program:IRProgram = program
+    self.peephole:Peephole = peephole
+    self.allocator:VariableAllocator = allocator
+    self.homes:dict[str,str] = {}
+    self.locations:dict[VReg,str] = {}
+    self.definitions:dict[VReg,IRInstruction] = {}
+    self.uses:dict[VReg,int] = {}
+    self.bits:dict[VReg,int] = {}
+    self.demand:dict[VReg,int] = {}
+    self.folded:dict[VReg,IRInstruction] = {}
+    self.following:str = None
+
+    self.instructions:dict[str,callable] = {
+      IR_LOAD:self.translate_load,
+      IR_STORE:self.translate_store,
+      IR_ADDR:self.translate_addr,
+      IR_COPY:self.translate_copy,
+      IR_DIV:self.translate_divide,
+      IR_MOD:self.translate_divide,
+      IR_NEG:self.translate_unary,
+      IR_NOT:self.translate_unary,
+      IR_JUMP:self.translate_jump,
+      IR_BRANCH:self.translate_branch,
+      IR_EXIT:self.translate_exit
+    }
+    for opcode in ALUMNEMONICS:
+      self.instructions[opcode] = self.translate_alu
+    for opcode in COMPARISONOPS:
+      self.instructions[opcode] = self.translate_compare
+
+    self.emitter:Emitter = Emitter()
+    self.sectionData:Section = self.emitter.section("section .data\n")
+    self.sectionBss:Section = self.emitter.section("section .bss\n")
+    self.sectionText:Section = self.emitter.section("section .text\nglobal _start\n")
+    self.start:Section = self.emitter.section("_start:\n")
+    if peephole is not None:
+      self.start.passes.append(peephole.optimize)
+
+  def compile(self) -> str:
+    return self.emitter.getvalue()
+
+  def translate(self) -> str:
+    self.translate_program()
+    return self.compile()
+
+  def translate_to(self, file) -> None:
+    self.translate_program()
+    self.emitter.write(file)
+    self.emitter.close()
+
+  def translate_program(self) -> None:
+    if self.allocator is not None:
+      self.allocate_homes()
+    allocator:LinearScan = LinearScan(self.program, homes=self.homes)
+    self.locations = allocator.allocate()
+
+    for variable in self.program.variables.values():
+      if variable.value is None:
+        self.sectionBss.emit(f"{variable.name}: resb {variable.size}\n")
+      else:
+        self.sectionData.emit(f"{variable.name}: {STORAGESIZES[variable.size][0]} {variable.value}\n")
+    for index in range(allocator.spills):
+      self.sectionBss.emit(f"_spill{index}: resb 8\n")
+
+    for instruction in self.program.instructions():
+      if instruction.dest is not None:
+        self.definitions[instruction.dest] = None if instruction.dest in self.definitions else instruction
+      for arg in instruction.uses():
+        self.uses[arg] = self.uses.get(arg, 0) + 1
+    self.infer_widths()
+
+    targets:set[str] = self.jump_targets()
+    blocks:list[Block] = self.program.blocks
+    instructions:dict[str,callable] = self.instructions
+    for index, block in enumerate(blocks):
+      self.following = blocks[index + 1].name if index + 1 < len(blocks) else None
+      if block.name in targets:
+        self.start.emit(f"{block.name}:\n")
+      for position, instruction in enumerate(block.instructions):
+        if instruction.opcode == IR_LOAD and position + 1 < len(block.instructions) and self.foldable(instruction, block.instructions[position + 1]):
+          self.folded[instruction.dest] = instruction
+          continue
+        handler:callable = instructions.get(instruction.opcode)
+        if handler is None:
+          raise ValueError
+        handler(instruction)
+
+  def allocate_homes(self) -> None:
+    entry, interference = variable_interference(self.program)
+    for name, register in self.allocator.homes.items():
+      if all(self.homes.get(other) != register for other in interference.get(name, ())):
+        self.homes[name] = register
+    for register in self.allocator.registers:
+      if any(self.homes.get(name) == register for name in entry):
+        self.start.emit(f"xor {REGISTERNAMES[register][4]}, {REGISTERNAMES[register][4]}\n")
+
+  def infer_widths(self) -> None:
+    instructions:list[IRInstruction] = list(self.program.instructions())
+    bits:dict[VReg,int] = self.bits
+    widened:dict[VReg,int] = {}
+    changed:bool = True
+    while changed:
+      changed = False
+      for instruction in instructions:
+        if instruction.dest is None:
+          continue
+        value:int = result_bits(instruction, bits)
+        if value > bits.get(instruction.dest, 0):
+          widened[instruction.dest] = widened.get(instruction.dest, 0) + 1
+          bits[instruction.dest] = value if widened[instruction.dest] < WIDENING else 64
+          changed = True
+
+    demand:dict[VReg,int] = self.demand
+    changed = True
+    while changed:
+      changed = False
+      for instruction in reversed(instructions):
+        for index, arg in enumerate(instruction.args):
+          if isinstance(arg, VReg):
+            value:int = argument_demand(instruction, index, demand)
+            if value > demand.get(arg, 0):
+              demand[arg] = value
+              changed = True
+
+  def operand_bits(self, arg:Operand) -> int:
+    if isinstance(arg, int):
+      return (arg & MASK64).bit_length()
+    return self.bits.get(arg, 64)
+
+  def width(self, vreg:VReg) -> int:
+    return 4 if self.bits.get(vreg, 64) <= 32 or self.demand.get(vreg, 64) <= 32 else 8
+
+  def compare_width(self, a:Operand, b:Operand) -> int:
+    return 4 if self.operand_bits(a) <= 32 and self.operand_bits(b) <= 32 else 8
+
+  def foldable(self, load:IRInstruction, user:IRInstruction) -> bool:
+    dest:VReg = load.dest
+    if self.uses.get(dest, 0) != 1 or self.definitions.get(dest) is not load or load.name in self.homes or self.locations[dest] == load.name or user.args.count(dest) != 1:
+      return False
+    other:Operand = user.args[1 - user.args.index(dest)] if len(user.args) == 2 else None
+    if user.opcode in ALUMNEMONICS:
+      if isinstance(other, int) or (user.opcode == IR_SUB and user.args[1] is not dest):
+        return False
+      return load.size == 8 or (load.size == 4 and self.width(user.dest) == 4)
+    if user.opcode in COMPARISONOPS or user.opcode == IR_BRANCH:
+      if isinstance(other, int):
+        return other >> (8 * load.size) == 0 if load.size < 8 else fits_imm32(other)
+      return load.size == 8 or (load.size == 4 and self.compare_width(*user.args) == 4)
+    return False
+
+  def jump_targets(self) -> set[str]:
+    targets:set[str] = set()
+    blocks:list[Block] = self.program.blocks
+    for index, block in enumerate(blocks):
+      following:str = blocks[index + 1].name if index + 1 < len(blocks) else None
+      for target in block.successors():
+        if target != following:
+          targets.add(target)
+      terminator:IRInstruction|None = block.terminator()
+      if terminator is not None and terminator.opcode == IR_BRANCH and terminator.targets[1] == following:
+        targets.add(terminator.targets[0])
+    return targets
+
+  def operand(self, arg:Operand, width:int = 8) -> str:
+    if isinstance(arg, int):
+      return str(arg & MASK32) if width == 4 else str(arg)
+    load:IRInstruction|None = self.folded.get(arg)
+    if load is not None:
+      return f"{MEMORYNAMES[width if load.size == 8 else load.size]} [{load.name}]"
+    location:str = self.locations[arg]
+    if is_register(location):
+      return REGISTERNAMES[location][width]
+    return f"{MEMORYNAMES[width]} [{location}]"
+
+  def register(self, vreg:VReg) -> str:
+    location:str = self.locations[vreg]
+    return location if is_register(location) else "rax"
+
+  def finish(self, dest:VReg, register:str) -> None:
+    location:str = self.operand(dest)
+    if location != register:
+      self.start.emit(f"mov {location}, {register}\n")
+
+  def move(self, register:str, arg:Operand, width:int = 8) -> None:
+    source:str = self.operand(arg, width)
+    target:str = REGISTERNAMES[register][width]
+    if source != target:
+      self.start.emit(f"mov {target}, {source}\n")
+
+  def source(self, arg:Operand, scratch:str, width:int = 8) -> str:
+    if isinstance(arg, int) and width == 4:
+      return str(arg & MASK32)
+    if isinstance(arg, int) and not fits_imm32(arg):
+      self.start.emit(f"mov {scratch}, {arg}\n")
+      return scratch
+    if isinstance(arg, int):
+      return imm32(arg)
+    return self.operand(arg, width)
+
+  def dividend_bits(self, arg:Operand) -> int:
+    if isinstance(arg, int):
+      return max(arg.bit_length(), 1)
+    definition:IRInstruction = self.definitions.get(arg)
+    if definition is not None and definition.opcode == IR_LOAD:
+      return 8 * definition.size
+    return 64
+
+  def translate_unary(self, instruction:IRInstruction) -> None:
+    register:str = self.register(instruction.dest)
+    width:int = self.width(instruction.dest)
+    self.move(register, instruction.args[0], width)
+    self.start.emit(f"{instruction.opcode} {REGISTERNAMES[register][width]}\n")
+    self.finish(instruction.dest, register)
+
+  def translate_copy(self, instruction:IRInstruction) -> None:
+    register:str = self.register(instruction.dest)
+    self.move(register, instruction.args[0], self.width(instruction.dest))
+    self.finish(instruction.dest, register)
+
+  def translate_addr(self, instruction:IRInstruction) -> None:
+    register:str = self.register(instruction.dest)
+    self.start.emit(f"mov {register}, {instruction.name}\n")
+    self.finish(instruction.dest, register)
+
+  def translate_jump(self, instruction:IRInstruction) -> None:
+    if instruction.targets[0] != self.following:
+      self.start.emit(f"jmp {instruction.targets[0]}\n")
+
+  def translate_exit(self, instruction:IRInstruction) -> None:
+    value:Operand = instruction.args[0]
+    self.move("rdi", value, 8 if isinstance(value, int) else self.width(value))
+    self.start.emit("mov rax, 60\nsyscall\n")
+
+  def translate_alu(self, instruction:IRInstruction) -> None:
+    opcode:str = instruction.opcode
+    a, b = instruction.args
+    register:str = self.register(instruction.dest)
+    if opcode in COMMUTATIVEOPS and (self.operand(b) == register or (isinstance(a, int) and not isinstance(b, int))):
+      a, b = b, a
+    if opcode in COMMUTATIVEOPS and a in self.folded:
+      a, b = b, a
+    if self.operand(b) == register and self.operand(a) != register:
+      register = "rax"
+    width:int = self.width(instruction.dest)
+    sized:str = REGISTERNAMES[register][width]
+
+    if opcode == IR_MUL and isinstance(b, int):
+      plan:list[tuple[str,int]]|None = multiply_plan(b)
+      if plan is not None:
+        self.move(register, a, width)
+        for line in multiply_lines(register, plan):
+          self.start.emit(line + "\n")
+      elif (width == 4 or fits_imm32(b)) and not isinstance(a, int):
+        self.start.emit(f"imul {sized}, {self.operand(a, width)}, {self.source(b, 'rdx', width)}\n")
+      else:
+        self.move(register, a, width)
+        self.start.emit(f"imul {sized}, {self.source(b, 'rdx', width)}\n")
+    else:
+      self.move(register, a, width)
+      self.start.emit(f"{ALUMNEMONICS[opcode]} {sized}, {self.source(b, 'rdx', width)}\n")
+    self.finish(instruction.dest, register)
+
+  def translate_divide(self, instruction:IRInstruction) -> None:
+    a, b = instruction.args
+    modulus:bool = instruction.opcode == IR_MOD
+    if isinstance(b, int) and b != 0:
+      register:str = self.register(instruction.dest)
+      if is_power_of_two(b):
+        shift:int = b.bit_length() - 1
+        self.move(register, a)
+        if modulus:
+          lines:list[str] = mask_lines(register, shift)
+        else:
+          lines:list[str] = [f"shr {register}, {shift}"] if shift else []
+        for line in lines:
+          self.start.emit(line + "\n")
+        self.finish(instruction.dest, register)
+        return
+
+      preshift, multiplier, shift, add = division_magic(b, self.dividend_bits(a))
+      self.move("rax", a)
+      if preshift:
+        self.start.emit(f"shr rax, {preshift}\n")
+      self.start.emit(f"mov rdx, {multiplier}\nmul rdx\n")
+      if add:
+        self.move("rax", a)
+        self.start.emit("sub rax, rdx\nshr rax, 1\nadd rdx, rax\n")
+        shift -= 1
+      if shift:
+        self.start.emit(f"shr rdx, {shift}\n")
+      if modulus:
+        self.start.emit(f"imul rdx, rdx, {imm32(b)}\n" if fits_imm32(b) else f"mov rax, {b}\nimul rdx, rax\n")
+        self.move("rax", a)
+        self.start.emit("sub rax, rdx\n")
+        self.finish(instruction.dest, "rax")
+      else:
+        self.finish(instruction.dest, "rdx")
+      return
+
+    width:int = 8 if isinstance(b, int) else self.compare_width(a, b)
+    self.move("rax", a, width)
+    self.start.emit("xor edx, edx\n")
+    self.start.emit(f"div {'rdx' if isinstance(b, int) else self.operand(b, width)}\n")
+    self.finish(instruction.dest, "rdx" if modulus else "rax")
+
+  def compare(self, a:Operand, b:Operand, condition:str) -> str:
+    if isinstance(a, int) and not isinstance(b, int):
+      a, b = b, a
+      condition = SWAPPEDCONDITIONS[condition]
+    width:int = self.compare_width(a, b)
+    if width == 4:
+      condition = UNSIGNEDCONDITIONS[condition]
+    left:str = self.operand(a, width)
+    if isinstance(a, int) or (is_memory(left) and not isinstance(b, int) and is_memory(self.operand(b, width))):
+      self.move("rax", a, width)
+      left = REGISTERNAMES["rax"][width]
+    self.start.emit(f"cmp {left}, {self.source(b, 'rdx', width)}\n")
+    return condition
+
+  def translate_compare(self, instruction:IRInstruction) -> None:
+    condition:str = self.compare(instruction.args[0], instruction.args[1], COMPARISONOPS[instruction.opcode])
+    location:str = self.operand(instruction.dest)
+    if is_register(location):
+      self.start.emit(f"set{condition} al\nmovzx {REGISTERNAMES[location][4]}, al\n")
+    else:
+      self.start.emit(f"set{condition} al\nmovzx eax, al\nmov {location}, rax\n")
+
+  def translate_branch(self, instruction:IRInstruction) -> None:
+    following:str = self.following
+    condition:str = self.compare(instruction.args[0], instruction.args[1], COMPARISONOPS[instruction.condition])
+    iftrue, iffalse = instruction.targets
+    if iftrue == following:
+      self.start.emit(f"j{CONDITIONS[condition]} {iffalse}\n")
+      return
+    self.start.emit(f"j{condition} {iftrue}\n")
+    if iffalse != following:
+      self.start.emit(f"jmp {iffalse}\n")
+
+  def translate_load(self, instruction:IRInstruction) -> None:
+    if self.locations[instruction.dest] in (instruction.name, self.homes.get(instruction.name)):
+      return
+    register:str = self.register(instruction.dest)
+    size:int = instruction.size
+    home:str|None = self.homes.get(instruction.name)
+    if home is not None:
+      width:int = self.width(instruction.dest) if size == 8 else 4
+      self.start.emit(f"mov {REGISTERNAMES[register][width]}, {REGISTERNAMES[home][width]}\n")
+      self.finish(instruction.dest, register)
+      return
+    memory:str = f"{STORAGESIZES[size][1]} [{instruction.name}]"
+    if size == 8 and self.width(instruction.dest) == 4:
+      self.start.emit(f"mov {REGISTERNAMES[register][4]}, dword [{instruction.name}]\n")
+    elif size == 8:
+      self.start.emit(f"mov {register}, {memory}\n")
+    elif size == 4:
+      self.start.emit(f"mov {REGISTERNAMES[register][4]}, {memory}\n")
+    else:
+      self.start.emit(f"movzx {REGISTERNAMES[register][4]}, {memory}\n")
+    self.finish(instruction.dest, register)
+
+  def translate_store(self, instruction:IRInstruction) -> None:
+    value:Operand = instruction.args[0]
+    size:int = instruction.size
+    if instruction.name in self.homes:
+      self.store_home(value, size, self.homes[instruction.name])
+      return
+    memory:str = f"{STORAGESIZES[size][1]} [{instruction.name}]"
+    if isinstance(value, int):
+      value &= size_mask(size)
+      if size < 8 or fits_imm32(value):
+        self.start.emit(f"mov {memory}, {imm32(value) if size == 8 else value}\n")
+        return
+    source:str = self.operand(value)
+    if not is_register(source):
+      self.move("rax", value)
+      source = "rax"
+    self.start.emit(f"mov {memory}, {REGISTERNAMES[source][size]}\n")
+
+  def store_home(self, value:Operand, size:int, home:str) -> None:
+    if isinstance(value, int):
+      value &= size_mask(size)
+      self.start.emit(f"mov {REGISTERNAMES[home][4] if value <= MASK32 else home}, {value}\n")
+      return
+    source:str = self.operand(value)
+    if not is_register(source):
+      self.move("rax", value)
+      source = "rax"
+    if source == home:
+      return
+    if size < 4:
+      self.start.emit(f"movzx {REGISTERNAMES[home][4]}, {REGISTERNAMES[source][size]}\n")
+    else:
+      self.start.emit(f"mov {REGISTERNAMES[home][size]}, {REGISTERNAMES[source][size]}\n")
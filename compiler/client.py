@@ -0,0 +1,59 @@
+from protocol import *
+import os
+import sys
+
+PATHFLAGS:tuple[str, ...] = ("-o", "--cache")
+
+def main(argc:int, argv:list[str]) -> int:
+  if argc < 2:
+    print("ERROR: not enough arguments. Use -h to show all flags and help.")
+    exit(0)
+
+  args:list[str] = argv[1:]
+  path:str = SOCKETPATH
+  if "--socket" in args:
+    index:int = args.index("--socket")
+    path = args[index + 1]
+    del args[index:index + 2]
+  if not args:
+    print("ERROR: not enough arguments. Use -h to show all flags and help.")
+    exit(0)
+  source:str|None = None
+  outputfile:str|None = None
+  if args[0] == "-":
+    source = sys.stdin.read()
+    args = args[1:]
+    if "-o" in args:
+      index:int = args.index("-o")
+      outputfile = args[index + 1]
+      del args[index:index + 2]
+  else:
+    if not args[0].startswith("-"):
+      args[0] = os.path.abspath(args[0])
+    for index in range(1, len(args) - 1):
+      if args[index] in PATHFLAGS:
+        args[index + 1] = os.path.abspath(args[index + 1])
+
+  try:
+    response:dict = request({"args":args, "source":source}, path)
+  except (FileNotFoundError, ConnectionRefusedError):
+    if source is not None:
+      print(f"ERROR: no compiler server is listening on {path}.")
+      exit(1)
+    os.execv(sys.executable, [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")] + args)
+
+  sys.stdout.write(response["stdout"])
+  if response["error"] is not None:
+    print(f"ERROR: {response['error']}")
+  if response["traceback"] is not None:
+    sys.stderr.write(response["traceback"])
+  if response["assembly"] is not None:
+    if outputfile is None:
+      sys.stdout.write(response["assembly"])
+    else:
+      with open(outputfile, "w") as file:
+        file.write(response["assembly"])
+  return response["status"]
+
+if __name__ == "__main__":
+  sys.exit(main(len(sys.argv), sys.argv))
@@ -0,0 +1,54 @@
+import os
+import struct
+from assembler import *
+
+BASEADDRESS:int = 0x400000
+PAGESIZE:int = 0x1000
+ENTRYSYMBOL:str = "_start"
+
+ELFHEADER:struct.Struct = struct.Struct("<16sHHIQQQIHHHHHH")
+PROGRAMHEADER:struct.Struct = struct.Struct("<IIQQQQQQ")
+ELFIDENT:bytes = b"\x7fELF\x02\x01\x01" + bytes(9)
+
+ET_EXEC:int = 2
+EM_X86_64:int = 0x3e
+PT_LOAD:int = 1
+PF_X:int = 1
+PF_W:int = 2
+PF_R:int = 4
+
+def align(value:int, alignment:int) -> int:
+  return (value + alignment - 1) // alignment * alignment
+
+def executable_bytes(image:Image) -> bytes:
+  textoffset:int = ELFHEADER.size + 2 * PROGRAMHEADER.size
+  dataoffset:int = textoffset + len(image.text)
+  addresses:dict[str,int] = {
+    ".text":BASEADDRESS + textoffset,
+    ".data":align(BASEADDRESS + dataoffset, PAGESIZE) + dataoffset % PAGESIZE
+  }
+  addresses[".bss"] = addresses[".data"] + len(image.data)
+
+  text:bytearray = bytearray(image.text)
+  for offset, symbol, addend in image.fixups:
+    if symbol not in image.symbols:
+      raise ValueError
+    section, position = image.symbols[symbol]
+    address:int = addresses[section] + position + addend
+    if not 0 <= address < 1 << 31:
+      raise ValueError
+    text[offset:offset + 4] = struct.pack("<I", address)
+
+  if image.symbols.get(ENTRYSYMBOL, (None,))[0] != ".text":
+    raise ValueError
+  entry:int = addresses[".text"] + image.symbols[ENTRYSYMBOL][1]
+
+  header:bytes = ELFHEADER.pack(ELFIDENT, ET_EXEC, EM_X86_64, 1, entry, ELFHEADER.size, 0, 0, ELFHEADER.size, PROGRAMHEADER.size, 2, 0, 0, 0)
+  code:bytes = PROGRAMHEADER.pack(PT_LOAD, PF_R | PF_X, 0, BASEADDRESS, BASEADDRESS, dataoffset, dataoffset, PAGESIZE)
+  data:bytes = PROGRAMHEADER.pack(PT_LOAD, PF_R | PF_W, dataoffset, addresses[".data"], addresses[".data"], len(image.data), len(image.data) + image.bss, PAGESIZE)
+  return b"".join((header, code, data, text, image.data))
+
+def write_executable(filename:str, image:Image) -> None:
+  with open(filename, "wb") as file:
+    file.write(executable_bytes(image))
+  os.chmod(filename, os.stat(filename).st_mode | 0o111)
@@ -0,0 +1,87 @@
+import shutil
+import tempfile
+
+SPILLLIMIT:int = 1 << 22
+
+class Section:
+  def __init__(self, header:str, limit:int = SPILLLIMIT) -> None:
+    self.chunks:list[str] = [header]
+    self.size:int = len(header)
+    self.limit:int = limit
+    self.spill = None
+    self.passes:list = []
+
+  def emit(self, code:str) -> None:
+    self.chunks.append(code)
+    self.size += len(code)
+    if self.size > self.limit:
+      self.flush()
+
+  def flush(self) -> None:
+    if self.spill is None:
+      self.spill = tempfile.TemporaryFile("w+")
+    self.spill.writelines(self.chunks)
+    self.chunks.clear()
+    self.size = 0
+
+  def lines(self):
+    if self.spill is not None:
+      self.spill.flush()
+      self.spill.seek(0)
+      yield from self.spill
+    for chunk in self.chunks:
+      yield from chunk.splitlines(True)
+
+  def getvalue(self) -> str:
+    if self.spill is None:
+      return "".join(self.chunks)
+    return "".join(self.lines())
+
+  def output(self):
+    lines = self.lines()
+    for process in self.passes:
+      lines = process(lines)
+    return lines
+
+  def write(self, file) -> None:
+    if self.passes:
+      file.writelines(self.output())
+      return
+    if self.spill is not None:
+      self.spill.flush()
+      self.spill.seek(0)
+      shutil.copyfileobj(self.spill, file)
+    file.writelines(self.chunks)
+
+  def close(self) -> None:
+    if self.spill is not None:
+      self.spill.close()
+      self.spill = None
+    self.chunks.clear()
+    self.size = 0
+
+class Emitter:
+  def __init__(self, limit:int = SPILLLIMIT) -> None:
+    self.limit:int = limit
+    self.sections:list[Section] = []
+
+  def section(self, header:str) -> Section:
+    section:Section = Section(header, self.limit)
+    self.sections.append(section)
+    return section
+
+  def write(self, file) -> None:
+    for section in self.sections:
+      section.write(file)
+      file.write("\n")
+
+  def getvalue(self) -> str:
+    parts:list[str] = []
+    for section in self.sections:
+      parts.extend(section.output())
+      parts.append("\n")
+    return "".join(parts)
+
+  def close(self) -> None:
+    for section in self.sections:
+      section.close()
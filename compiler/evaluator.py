@@ -0,0 +1,165 @@
+from astt import *
+from folding import *
+from symbols import *
+
+EVALSTEPS:int = 1000000
+
+OP_PUSH:int = 0
+OP_LOAD:int = 1
+OP_UNARY:int = 2
+OP_BINARY:int = 3
+
+ST_SET:int = 0
+ST_EXIT:int = 1
+ST_JUMP:int = 2
+
+class Evaluator:
+  def __init__(self, nodes:list[ASTNode], steps:int = EVALSTEPS) -> None:
+    self.nodes = nodes
+    self.steps:int = steps
+    self.scope:Scope = Scope()
+    self.slots:dict[str,int] = {}
+    self.sizes:list[int] = []
+    self.initial:list[int] = []
+    self.labels:dict[str,int] = {}
+    self.program:list[tuple] = []
+    self.executed:int = 0
+    self.exitcode:int|None = None
+    self.reason:str = None
+
+  def evaluate(self) -> list[ASTNode]|None:
+    if self.steps <= 0:
+      self.reason = "compile-time evaluation is disabled"
+      return None
+    try:
+      self.resolve()
+    except ValueError:
+      self.reason = "the program does not translate"
+      return None
+    if self.reason is not None:
+      return None
+    memory:list[int]|None = self.run()
+    if memory is None:
+      return None
+    return self.collapse(memory)
+
+  def resolve(self) -> None:
+    jumps:list[str] = []
+    for node in self.nodes:
+      type:str = node.asttype
+      if type == ASTT_RESERVE or type == ASTT_CONST:
+        self.scope.declare(node.name, SYMK_RESERVE if type == ASTT_RESERVE else SYMK_CONST, node.size)
+        self.slots[node.name] = len(self.sizes)
+        self.sizes.append(node.size)
+        self.initial.append(node.value & size_mask(node.size) if type == ASTT_CONST else 0)
+      elif type == ASTT_SET:
+        symbol:Symbol = self.scope.lookup(node.name)
+        code:list[tuple[int,object]] = self.compile(node.value)
+        if symbol.kind != SYMK_RESERVE:
+          raise ValueError
+        slot:int = self.slots[node.name]
+        self.program.append((ST_SET, code, slot, size_mask(self.sizes[slot])))
+      elif type == ASTT_EXIT:
+        self.program.append((ST_EXIT, self.compile(node.value)))
+      elif type == ASTT_LABEL:
+        self.scope.declare(f"label_{node.name}", SYMK_LABEL)
+        self.labels[node.name] = len(self.program)
+      elif type == ASTT_JUMP:
+        jumps.append(node.name)
+        self.program.append((ST_JUMP, self.compile(node.value), node.name))
+      else:
+        raise ValueError
+    for name in jumps:
+      if name not in self.labels:
+        raise ValueError
+    self.program = [(ST_JUMP, statement[1], self.labels[statement[2]]) if statement[0] == ST_JUMP else statement for statement in self.program]
+
+  def compile(self, node:ASTNode) -> list[tuple[int,object]]:
+    code:list[tuple[int,object]] = []
+    stack:list[tuple[ASTNode,bool]] = [(node, False)]
+    while stack:
+      node, visited = stack.pop()
+      type:str = node.asttype
+      if visited:
+        code.append((OP_UNARY if type in UNARYTYPES else OP_BINARY, type))
+      elif type == ASTT_NUM:
+        code.append((OP_PUSH, node.value & MASK64))
+      elif type == ASTT_VARCALL:
+        self.scope.variable(node.name)
+        code.append((OP_LOAD, self.slots[node.name]))
+      elif type == ASTT_POINTER:
+        self.scope.variable(node.name)
+        if self.reason is None:
+          self.reason = f"the address of {node.name} is not known at compile time"
+        code.append((OP_PUSH, 0))
+      elif type in UNARYTYPES:
+        stack.append((node, True))
+        stack.append((node.a, False))
+      elif type in BINARYTYPES:
+        stack.append((node, True))
+        stack.append((node.b, False))
+        stack.append((node.a, False))
+      else:
+        raise ValueError
+    return code
+
+  def run(self) -> list[int]|None:
+    memory:list[int] = list(self.initial)
+    program:list[tuple] = self.program
+    index:int = 0
+    while index < len(program):
+      if self.executed == self.steps:
+        self.reason = f"the step budget of {self.steps} statements ran out"
+        return None
+      self.executed += 1
+      statement:tuple = program[index]
+      value:int|None = self.execute(statement[1], memory)
+      if value is None:
+        self.reason = f"a division by zero traps after {self.executed} steps"
+        return None
+      kind:int = statement[0]
+      if kind == ST_SET:
+        memory[statement[2]] = value & statement[3]
+      elif kind == ST_EXIT:
+        self.exitcode = value
+        break
+      elif value == 1:
+        index = statement[2]
+        continue
+      index += 1
+    return memory
+
+  def execute(self, code:list[tuple[int,object]], memory:list[int]) -> int|None:
+    stack:list[int] = []
+    for op, argument in code:
+      if op == OP_PUSH:
+        stack.append(argument)
+      elif op == OP_LOAD:
+        stack.append(memory[argument])
+      elif op == OP_UNARY:
+        stack.append(evaluate_unary(argument, stack.pop()))
+      else:
+        b:int = stack.pop()
+        value:int|None = evaluate_binary(argument, stack.pop(), b)
+        if value is None:
+          return None
+        stack.append(value)
+    return stack[0]
+
+  def collapse(self, memory:list[int]) -> list[ASTNode]:
+    nodes:list[ASTNode] = []
+    for node in self.nodes:
+      if node.asttype == ASTT_RESERVE:
+        nodes.append(ASTReserve(node.name, node.size))
+        if memory[self.slots[node.name]]:
+          nodes.append(ASTSet(node.name, ASTNum(memory[self.slots[node.name]])))
+      elif node.asttype == ASTT_CONST:
+        nodes.append(ASTConst(node.name, node.size, node.value))
+    if self.exitcode is not None:
+      nodes.append(ASTExit(ASTNum(self.exitcode)))
+    return nodes
+
+  def report(self) -> str:
+    if self.reason is not None:
+      return f"compile-time evaluation stopped: {self.reason}"
+    return f"compile-time evaluation finished in {self.executed} steps"
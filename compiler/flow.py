@@ -0,0 +1,214 @@
+from astt import *
+from symbols import *
+from x86 import immediate_value
+
+def expression_names(node:ASTNode, names:set[str], pointers:set[str]) -> None:
+  stack:list[ASTNode] = [node]
+  while stack:
+    node = stack.pop()
+    type:str = node.asttype
+    if type in BINARYTYPES:
+      stack.append(node.b)
+      stack.append(node.a)
+    elif type == ASTT_VARCALL:
+      names.add(node.name)
+    elif type == ASTT_POINTER:
+      pointers.add(node.name)
+    elif type in UNARYTYPES:
+      stack.append(node.a)
+
+def may_trap(node:ASTNode) -> bool:
+  stack:list[ASTNode] = [node]
+  while stack:
+    node = stack.pop()
+    type:str = node.asttype
+    if type == ASTT_DIVIDE or type == ASTT_MODULUS:
+      if node.b.asttype != ASTT_NUM or immediate_value(node.b.value) == 0:
+        return True
+    if type in BINARYTYPES:
+      stack.append(node.b)
+      stack.append(node.a)
+    elif type in UNARYTYPES:
+      stack.append(node.a)
+  return False
+
+def jump_sense(node:ASTJump) -> bool|None:
+  if node.value.asttype == ASTT_NUM:
+    return immediate_value(node.value.value) == 1
+  return None
+
+def statement_successors(nodes:list[ASTNode], labels:dict[str,int], index:int) -> list[int]:
+  node:ASTNode = nodes[index]
+  following:list[int] = [index + 1] if index + 1 < len(nodes) else []
+  if node.asttype == ASTT_EXIT:
+    return []
+  if node.asttype == ASTT_JUMP:
+    sense:bool|None = jump_sense(node)
+    if sense is None:
+      return [labels[node.name]] + following
+    return [labels[node.name]] if sense else following
+  return following
+
+class StatementGraph:
+  def __init__(self, nodes:list[ASTNode], variables:dict[str,int]) -> None:
+    self.nodes = nodes
+    self.variables:dict[str,int] = variables
+    self.escaped:set[str] = set()
+    self.uses:list[int] = [0] * len(nodes)
+    self.labels:dict[str,int] = {}
+    self.blocks:list[tuple[int,int]] = []
+    self.successors:list[list[int]] = []
+    self.livein:list[int] = []
+    self.liveout:list[int] = []
+    self.build()
+    self.solve()
+
+  def build(self) -> None:
+    nodes:list[ASTNode] = self.nodes
+    variables:dict[str,int] = self.variables
+    leaders:list[int] = [0]
+    for index, node in enumerate(nodes):
+      if node.asttype in (ASTT_SET, ASTT_EXIT, ASTT_JUMP):
+        names:set[str] = set()
+        expression_names(node.value, names, self.escaped)
+        for name in names:
+          self.uses[index] |= variables.get(name, 0)
+      if node.asttype == ASTT_LABEL:
+        self.labels[node.name] = index
+        leaders.append(index)
+      elif node.asttype == ASTT_JUMP or node.asttype == ASTT_EXIT:
+        leaders.append(index + 1)
+    leaders = sorted({leader for leader in leaders if leader < len(nodes)})
+    self.blocks = [(leader, following) for leader, following in zip(leaders, leaders[1:] + [len(nodes)])]
+    owner:dict[int,int] = {start:block for block, (start, end) in enumerate(self.blocks)}
+    self.successors = [[owner[successor] for successor in statement_successors(nodes, self.labels, end - 1)] for start, end in self.blocks]
+
+  def solve(self) -> None:
+    generated:list[int] = []
+    killed:list[int] = []
+    for start, end in self.blocks:
+      gen:int = 0
+      kill:int = 0
+      for index in range(start, end):
+        gen |= self.uses[index] & ~kill
+        if self.nodes[index].asttype == ASTT_SET:
+          kill |= self.variables.get(self.nodes[index].name, 0)
+      generated.append(gen)
+      killed.append(kill)
+
+    self.livein = [0] * len(self.blocks)
+    self.liveout = [0] * len(self.blocks)
+    changed:bool = True
+    while changed:
+      changed = False
+      for block in reversed(range(len(self.blocks))):
+        out:int = 0
+        for successor in self.successors[block]:
+          out |= self.livein[successor]
+        inside:int = generated[block] | (out & ~killed[block])
+        if out != self.liveout[block] or inside != self.livein[block]:
+          self.liveout[block] = out
+          self.livein[block] = inside
+          changed = True
+
+class DeadCodeEliminator:
+  def __init__(self, nodes:list[ASTNode]) -> None:
+    self.nodes = nodes
+    self.removed:list[ASTNode] = []
+
+  def eliminate(self) -> list[ASTNode]:
+    self.check()
+    nodes:list[ASTNode] = self.nodes
+    while True:
+      result:list[ASTNode] = self.remove_unused(self.remove_dead_stores(self.remove_unreachable(nodes)))
+      if len(result) == len(nodes):
+        return result
+      nodes = result
+
+  def check(self) -> None:
+    scope:Scope = Scope()
+    jumps:list[str] = []
+    for node in self.nodes:
+      if node.asttype == ASTT_RESERVE:
+        scope.declare(node.name, SYMK_RESERVE, node.size, STORAGE_BSS)
+      elif node.asttype == ASTT_CONST:
+        scope.declare(node.name, SYMK_CONST, node.size, STORAGE_DATA)
+      elif node.asttype == ASTT_LABEL:
+        scope.declare(f"label_{node.name}", SYMK_LABEL, 0, STORAGE_TEXT)
+      else:
+        if node.asttype == ASTT_SET and scope.lookup(node.name).kind != SYMK_RESERVE:
+          raise ValueError
+        if node.asttype == ASTT_JUMP:
+          jumps.append(f"label_{node.name}")
+        names:set[str] = set()
+        expression_names(node.value, names, names)
+        for name in names:
+          scope.variable(name)
+    for name in jumps:
+      if scope.lookup(name).kind != SYMK_LABEL:
+        raise ValueError
+
+  def drop(self, nodes:list[ASTNode], keep:list[bool]) -> list[ASTNode]:
+    result:list[ASTNode] = []
+    for node, kept in zip(nodes, keep):
+      if kept:
+        result.append(node)
+      else:
+        self.removed.append(node)
+    return result
+
+  def remove_unreachable(self, nodes:list[ASTNode]) -> list[ASTNode]:
+    labels:dict[str,int] = {node.name:index for index, node in enumerate(nodes) if node.asttype == ASTT_LABEL}
+    reachable:list[bool] = [False] * len(nodes)
+    stack:list[int] = [0] if nodes else []
+    while stack:
+      index:int = stack.pop()
+      if not reachable[index]:
+        reachable[index] = True
+        stack.extend(statement_successors(nodes, labels, index))
+
+    targets:set[str] = {node.name for node, live in zip(nodes, reachable) if live and node.asttype == ASTT_JUMP and jump_sense(node) is not False}
+    keep:list[bool] = []
+    for node, live in zip(nodes, reachable):
+      if node.asttype == ASTT_RESERVE or node.asttype == ASTT_CONST:
+        keep.append(True)
+      elif node.asttype == ASTT_LABEL:
+        keep.append(live and node.name in targets)
+      elif node.asttype == ASTT_JUMP:
+        keep.append(live and jump_sense(node) is not False)
+      else:
+        keep.append(live)
+    return self.drop(nodes, keep)
+
+  def remove_dead_stores(self, nodes:list[ASTNode]) -> list[ASTNode]:
+    variables:dict[str,int] = {}
+    for node in nodes:
+      if node.asttype == ASTT_RESERVE:
+        variables[node.name] = 1 << len(variables)
+    graph:StatementGraph = StatementGraph(nodes, variables)
+
+    keep:list[bool] = [True] * len(nodes)
+    protected:int = 0
+    for name in graph.escaped:
+      protected |= variables.get(name, 0)
+    for block, (start, end) in enumerate(graph.blocks):
+      live:int = graph.liveout[block] | protected
+      for index in reversed(range(start, end)):
+        node:ASTNode = nodes[index]
+        if node.asttype == ASTT_SET:
+          bit:int = variables[node.name]
+          if not live & bit and not may_trap(node.value):
+            keep[index] = False
+            continue
+          live &= ~bit | protected
+        live |= graph.uses[index]
+    return self.drop(nodes, keep)
+
+  def remove_unused(self, nodes:list[ASTNode]) -> list[ASTNode]:
+    used:set[str] = set()
+    for node in nodes:
+      if node.asttype == ASTT_SET:
+        used.add(node.name)
+      if node.asttype in (ASTT_SET, ASTT_EXIT, ASTT_JUMP):
+        expression_names(node.value, used, used)
+    return self.drop(nodes, [node.name in used if node.asttype in (ASTT_RESERVE, ASTT_CONST) else True for node in nodes])
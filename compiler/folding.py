@@ -0,0 +1,114 @@
+from astt import *
+
+MASK64:int = (1 << 64) - 1
+
+ASSOCIATIVETYPES:set[str] = {ASTT_ADD, ASTT_MULTIPLY, ASTT_AND, ASTT_OR, ASTT_XOR}
+
+def size_mask(size:int) -> int:
+  return (1 << (8 * size)) - 1
+
+def signed(value:int) -> int:
+  return value - (1 << 64) if value >> 63 else value
+
+def evaluate_unary(type:str, a:int) -> int:
+  if type == ASTT_PLUSSIGN:
+    return a
+  elif type == ASTT_MINUSSIGN:
+    return -a & MASK64
+  elif type == ASTT_NOT:
+    return ~a & MASK64
+  raise ValueError
+
+def evaluate_binary(type:str, a:int, b:int) -> int|None:
+  if type == ASTT_ADD:
+    return (a + b) & MASK64
+  elif type == ASTT_SUBTRACT:
+    return (a - b) & MASK64
+  elif type == ASTT_MULTIPLY:
+    return (a * b) & MASK64
+  elif type == ASTT_DIVIDE:
+    return a // b if b != 0 else None
+  elif type == ASTT_MODULUS:
+    return a % b if b != 0 else None
+  elif type == ASTT_AND:
+    return a & b
+  elif type == ASTT_OR:
+    return a | b
+  elif type == ASTT_XOR:
+    return a ^ b
+  elif type == ASTT_EQUAL:
+    return int(a == b)
+  elif type == ASTT_NOT_EQUAL:
+    return int(a != b)
+  elif type == ASTT_GREATER:
+    return int(signed(a) > signed(b))
+  elif type == ASTT_LOWER:
+    return int(signed(a) < signed(b))
+  elif type == ASTT_GREATER_EQUAL:
+    return int(signed(a) >= signed(b))
+  elif type == ASTT_LOWER_EQUAL:
+    return int(signed(a) <= signed(b))
+  raise ValueError
+
+class ConstantFolder:
+  def __init__(self, nodes:list[ASTNode]) -> None:
+    self.nodes = nodes
+    self.consts:dict[str,int] = {}
+
+  def fold(self) -> list[ASTNode]:
+    return [self.fold_statement(node) for node in self.nodes]
+
+  def fold_statement(self, node:ASTNode) -> ASTNode:
+    if node.asttype == ASTT_CONST:
+      self.consts[node.name] = node.value & size_mask(node.size)
+    elif node.asttype == ASTT_SET:
+      return ASTSet(node.name, self.fold_expr(node.value))
+    elif node.asttype == ASTT_EXIT:
+      return ASTExit(self.fold_expr(node.value))
+    elif node.asttype == ASTT_JUMP:
+      return ASTJump(node.name, self.fold_expr(node.value))
+    return node
+
+  def fold_expr(self, node:ASTNode) -> ASTNode:
+    results:list[ASTNode] = []
+    stack:list[tuple[ASTNode,ASTNode,ASTNode]] = [(node, None, None)]
+    while stack:
+      node, left, right = stack.pop()
+      if left is not None:
+        b:ASTNode = None if right is None else results.pop()
+        results.append(self.fold_operation(node, left, right, results.pop(), b))
+        continue
+      type:str = node.asttype
+      if type == ASTT_VARCALL:
+        results.append(ASTNum(self.consts[node.name]) if node.name in self.consts else node)
+      elif type in LEAFTYPES:
+        results.append(node)
+      elif type in UNARYTYPES:
+        left = node.a
+        stack.append((node, left, None))
+        stack.append((left, None, None))
+      else:
+        left = node.a
+        right = node.b
+        stack.append((node, left, right))
+        stack.append((right, None, None))
+        stack.append((left, None, None))
+    return results[0]
+
+  def fold_operation(self, node:ASTNode, left:ASTNode, right:ASTNode, a:ASTNode, b:ASTNode) -> ASTNode:
+    type:str = node.asttype
+    if right is None:
+      if a.asttype == ASTT_NUM:
+        return ASTNum(evaluate_unary(type, a.value & MASK64))
+      return node if a is left else NODECLASSES[type](a)
+
+    if a.asttype == ASTT_NUM and b.asttype == ASTT_NUM:
+      value:int|None = evaluate_binary(type, a.value & MASK64, b.value & MASK64)
+      if value is not None:
+        return ASTNum(value)
+    if type in ASSOCIATIVETYPES and b.asttype == ASTT_NUM and a.asttype == type and a.b.asttype == ASTT_NUM:
+      value:int = evaluate_binary(type, a.b.value & MASK64, b.value & MASK64)
+      return NODECLASSES[type](a.a, ASTNum(value))
+    if a is left and b is right:
+      return node
+    return NODECLASSES[type](a, b)
@@ -0,0 +1,184 @@
+import glob
+import hashlib
+import json
+import os
+import re
+import sqlite3
+from translator import *
+from flow import expression_names
+
+CACHEFILE:str = "fragments.sqlite"
+CACHELIMIT:int = 64 << 20
+FETCHCHUNK:int = 500
+
+STATEMENTREGEX:re.Pattern = re.compile(r"(?:[^;']|'.'|')*;?", re.DOTALL)
+
+def compiler_digest() -> str:
+  digest = hashlib.blake2b(digest_size=16)
+  for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*.py"))):
+    with open(path, "rb") as file:
+      digest.update(file.read())
+  return digest.hexdigest()
+
+def split_statements(text:str) -> list[str]:
+  return [piece for piece in (match.group().strip() for match in STATEMENTREGEX.finditer(text)) if piece]
+
+class Fragment:
+  __slots__ = ("data", "bss", "code", "steps")
+  def __init__(self, data:str, bss:str, code:str, steps:list) -> None:
+    self.data:str = data
+    self.bss:str = bss
+    self.code:str = code
+    self.steps:list = steps
+
+class FragmentCache:
+  def __init__(self, directory:str, limit:int = CACHELIMIT) -> None:
+    os.makedirs(directory, exist_ok=True)
+    self.limit:int = limit
+    self.connection:sqlite3.Connection = sqlite3.connect(os.path.join(directory, CACHEFILE))
+    self.connection.execute("create table if not exists fragments (key text primary key, data text, bss text, code text, steps text, size integer, used integer)")
+    self.connection.execute("create index if not exists fragments_used on fragments (used)")
+    self.clock:int = (self.connection.execute("select max(used) from fragments").fetchone()[0] or 0) + 1
+
+  def fetch(self, keys:list[str]) -> dict[str,Fragment]:
+    fragments:dict[str,Fragment] = {}
+    keys = list(set(keys))
+    for start in range(0, len(keys), FETCHCHUNK):
+      chunk:list[str] = keys[start:start + FETCHCHUNK]
+      rows = self.connection.execute(f"select key, data, bss, code, steps from fragments where key in ({','.join('?' * len(chunk))})", chunk)
+      for key, data, bss, code, steps in rows:
+        fragments[key] = Fragment(data, bss, code, json.loads(steps))
+    return fragments
+
+  def touch(self, keys:list[str]) -> None:
+    self.connection.executemany("update fragments set used = ? where key = ?", [(self.clock, key) for key in keys])
+
+  def store(self, fragments:dict[str,Fragment]) -> None:
+    rows:list[tuple] = []
+    for key, fragment in fragments.items():
+      size:int = len(fragment.data) + len(fragment.bss) + len(fragment.code)
+      rows.append((key, fragment.data, fragment.bss, fragment.code, json.dumps(fragment.steps), size, self.clock))
+    self.connection.executemany("insert or replace into fragments values (?, ?, ?, ?, ?, ?, ?)", rows)
+
+  def evict(self) -> int:
+    total:int = self.connection.execute("select coalesce(sum(size), 0) from fragments").fetchone()[0]
+    evicted:list[tuple[str]] = []
+    if total > self.limit:
+      for key, size in self.connection.execute("select key, size from fragments order by used"):
+        if total <= self.limit:
+          break
+        evicted.append((key,))
+        total -= size
+      self.connection.executemany("delete from fragments where key = ?", evicted)
+    return len(evicted)
+
+  def close(self) -> None:
+    self.connection.commit()
+    self.connection.close()
+
+class IncrementalTranslator(Translator):
+  def __init__(self, text:str, cache:FragmentCache) -> None:
+    super().__init__([])
+    self.text:str = text
+    self.cache:FragmentCache = cache
+    self.hits:int = 0
+    self.misses:int = 0
+
+  def translate_nodes(self) -> None:
+    version:str = compiler_digest()
+    pieces:list[str] = split_statements(self.text)
+    occurrences:dict[str,int] = {}
+    keys:list[str] = []
+    for piece in pieces:
+      occurrence:int = occurrences.get(piece, 0)
+      occurrences[piece] = occurrence + 1
+      keys.append(hashlib.blake2b(f"{version}\n{piece}\n{occurrence}".encode(), digest_size=16).hexdigest())
+
+    cached:dict[str,Fragment] = self.cache.fetch(keys)
+    pending:list[str] = [piece for piece, key in zip(pieces, keys) if key not in cached]
+    parsed:list[ASTNode] = Parser(Lexer("\n".join(pending)).tokenize()).parse()
+    if len(parsed) != len(pending):
+      raise ValueError
+    fresh:dict[str,Fragment] = {}
+    used:list[str] = []
+    index:int = 0
+    for piece, key in zip(pieces, keys):
+      fragment:Fragment = cached.get(key)
+      if fragment is None:
+        nodes:list[ASTNode] = parsed[index:index + 1]
+        index += 1
+      elif self.replay(fragment.steps):
+        used.append(key)
+        self.hits += 1
+      else:
+        nodes:list[ASTNode] = Parser(Lexer(piece).tokenize()).parse()
+        fragment = None
+      if fragment is None:
+        fragment = self.translate_piece(nodes, key)
+        fresh[key] = fragment
+        self.misses += 1
+      if fragment.data:
+        self.sectionData.emit(fragment.data)
+      if fragment.bss:
+        self.sectionBss.emit(fragment.bss)
+      if fragment.code:
+        self.start.emit(fragment.code)
+
+    self.cache.touch(used)
+    self.cache.store(fresh)
+    self.cache.evict()
+
+  def replay(self, steps:list) -> bool:
+    declared:list[str] = []
+    for facts, declaration in steps:
+      for name, kind, size in facts:
+        symbol:Symbol = self.scope.symbols.get(name)
+        if symbol is None or symbol.kind != kind or symbol.size != size:
+          for name in declared:
+            del self.scope.symbols[name]
+          return False
+      if declaration is not None:
+        name, kind, size, storage = declaration
+        self.scope.declare(name, kind, size, storage)
+        declared.append(name)
+    return True
+
+  def facts(self, node:ASTNode) -> list[tuple[str,str,int]]:
+    if node.asttype not in (ASTT_SET, ASTT_EXIT, ASTT_JUMP):
+      return []
+    names:set[str] = set()
+    expression_names(node.value, names, names)
+    if node.asttype == ASTT_SET:
+      names.add(node.name)
+    facts:list[tuple[str,str,int]] = []
+    for name in sorted(names):
+      symbol:Symbol = self.scope.lookup(name)
+      facts.append((name, symbol.kind, symbol.size))
+    return facts
+
+  def translate_piece(self, nodes:list[ASTNode], key:str) -> Fragment:
+    sections:tuple[Section,Section,Section] = (self.sectionData, self.sectionBss, self.start)
+    fragments:tuple[Section,Section,Section] = (Section(""), Section(""), Section(""))
+    self.sectionData, self.sectionBss, self.start = fragments
+    self.labelPrefix = f"_{key[:16]}_"
+    self.cmptime = 0
+
+    steps:list = []
+    for node in nodes:
+      facts:list[tuple[str,str,int]] = self.facts(node)
+      declared:int = len(self.scope)
+      handler:callable = self.statements.get(node.asttype)
+      if handler is None:
+        raise ValueError
+      handler(node)
+      declaration:list|None = None
+      if len(self.scope) != declared:
+        symbol:Symbol = next(reversed(self.scope.symbols.values()))
+        declaration = [symbol.name, symbol.kind, symbol.size, symbol.storage]
+      steps.append([facts, declaration])
+
+    self.sectionData, self.sectionBss, self.start = sections
+    texts:list[str] = [fragment.getvalue() for fragment in fragments]
+    for fragment in fragments:
+      fragment.close()
+    return Fragment(*texts, steps)
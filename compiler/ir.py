@@ -0,0 +1,146 @@
+IR_LOAD = "load"
+IR_STORE = "store"
+IR_ADDR = "addr"
+IR_COPY = "copy"
+
+IR_ADD = "add"
+IR_SUB = "sub"
+IR_MUL = "mul"
+IR_DIV = "div"
+IR_MOD = "mod"
+IR_AND = "and"
+IR_OR = "or"
+IR_XOR = "xor"
+IR_NEG = "neg"
+IR_NOT = "not"
+
+IR_EQ = "eq"
+IR_NE = "ne"
+IR_GT = "gt"
+IR_LT = "lt"
+IR_GE = "ge"
+IR_LE = "le"
+
+IR_JUMP = "jump"
+IR_BRANCH = "branch"
+IR_EXIT = "exit"
+
+UNARYOPS:set[str] = {IR_NEG, IR_NOT}
+COMPARISONOPS:dict[str,str] = {IR_EQ:"e", IR_NE:"ne", IR_GT:"g", IR_LT:"l", IR_GE:"ge", IR_LE:"le"}
+BINARYOPS:set[str] = {IR_ADD, IR_SUB, IR_MUL, IR_DIV, IR_MOD, IR_AND, IR_OR, IR_XOR} | set(COMPARISONOPS)
+COMMUTATIVEOPS:set[str] = {IR_ADD, IR_MUL, IR_AND, IR_OR, IR_XOR, IR_EQ, IR_NE}
+TERMINATORS:set[str] = {IR_JUMP, IR_BRANCH, IR_EXIT}
+SIDEEFFECTS:set[str] = {IR_STORE} | TERMINATORS
+
+TYPENAMES:dict[int,str] = {1:"u8", 2:"u16", 4:"u32", 8:"u64"}
+
+class VReg:
+  __slots__ = ("index",)
+  def __init__(self, index:int) -> None:
+    self.index:int = index
+
+  def __repr__(self) -> str:
+    return f"%{self.index}"
+
+Operand = VReg|int
+
+class IRInstruction:
+  __slots__ = ("opcode", "dest", "args", "name", "size", "condition", "targets")
+  def __init__(self, opcode:str, dest:VReg = None, args:list[Operand] = None, name:str = None, size:int = 0, condition:str = None, targets:list[str] = None) -> None:
+    self.opcode:str = opcode
+    self.dest:VReg = dest
+    self.args:list[Operand] = [] if args is None else args
+    self.name:str = name
+    self.size:int = size
+    self.condition:str = condition
+    self.targets:list[str] = [] if targets is None else targets
+
+  def uses(self) -> list[VReg]:
+    return [arg for arg in self.args if isinstance(arg, VReg)]
+
+  def is_terminator(self) -> bool:
+    return self.opcode in TERMINATORS
+
+  def has_side_effects(self) -> bool:
+    if self.opcode == IR_DIV or self.opcode == IR_MOD:
+      return not isinstance(self.args[1], int) or self.args[1] == 0
+    return self.opcode in SIDEEFFECTS
+
+  def __repr__(self) -> str:
+    args:str = ", ".join(str(arg) for arg in self.args)
+    if self.opcode == IR_LOAD:
+      return f"{self.dest} = load {TYPENAMES[self.size]} {self.name}"
+    elif self.opcode == IR_STORE:
+      return f"store {TYPENAMES[self.size]} {self.name}, {args}"
+    elif self.opcode == IR_ADDR:
+      return f"{self.dest} = addr {self.name}"
+    elif self.opcode == IR_JUMP:
+      return f"jump {self.targets[0]}"
+    elif self.opcode == IR_BRANCH:
+      return f"branch {self.condition} {args} -> {self.targets[0]}, {self.targets[1]}"
+    elif self.opcode == IR_EXIT:
+      return f"exit {args}"
+    return f"{self.dest} = {self.opcode} {args}"
+
+class Block:
+  def __init__(self, name:str) -> None:
+    self.name:str = name
+    self.instructions:list[IRInstruction] = []
+
+  def terminator(self) -> IRInstruction|None:
+    if self.instructions and self.instructions[-1].is_terminator():
+      return self.instructions[-1]
+    return None
+
+  def successors(self) -> list[str]:
+    terminator:IRInstruction|None = self.terminator()
+    return [] if terminator is None else terminator.targets
+
+  def __repr__(self) -> str:
+    return f"{self.name}:\n" + "".join(f"  {instruction}\n" for instruction in self.instructions)
+
+class Variable:
+  def __init__(self, name:str, size:int, storage:str, value:int = None) -> None:
+    self.name:str = name
+    self.size:int = size
+    self.storage:str = storage
+    self.value:int = value
+
+  def __repr__(self) -> str:
+    if self.value is None:
+      return f"res {TYPENAMES[self.size]} {self.name}"
+    return f"const {TYPENAMES[self.size]} {self.name} = {self.value}"
+
+class IRProgram:
+  def __init__(self) -> None:
+    self.variables:dict[str,Variable] = {}
+    self.blocks:list[Block] = []
+    self.vregs:int = 0
+    self.anonymous:int = 0
+
+  def new_vreg(self) -> VReg:
+    vreg:VReg = VReg(self.vregs)
+    self.vregs += 1
+    return vreg
+
+  def new_block_name(self) -> str:
+    name:str = f"_block{self.anonymous}"
+    self.anonymous += 1
+    return name
+
+  def block_map(self) -> dict[str,Block]:
+    return {block.name:block for block in self.blocks}
+
+  def predecessors(self) -> dict[str,list[str]]:
+    result:dict[str,list[str]] = {block.name:[] for block in self.blocks}
+    for block in self.blocks:
+      for target in block.successors():
+        result[target].append(block.name)
+    return result
+
+  def instructions(self):
+    for block in self.blocks:
+      yield from block.instructions
+
+  def __repr__(self) -> str:
+    return "".join(f"{variable}\n" for variable in self.variables.values()) + "".join(f"{block}" for block in self.blocks)
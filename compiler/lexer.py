@@ -1,3 +1,12 @@
+import codecs
+import io
+import itertools
+import locale
+import mmap
+import os
+import re
+from types import GeneratorType
+
 TT_ID = "id"
 TT_INT = "int"
 TT_LPAREN = "left_paren"
@@ -20,7 +29,32 @@ TT_GREATER = "bigger"
 TT_LOWER = "lower"
 TT_EQUAL = "equal"
 
+PUNCTUATION:dict[str,str] = {
+  "(":TT_LPAREN,
+  ")":TT_RPAREN,
+  "{":TT_LCURLY,
+  "}":TT_RCURLY,
+  ":":TT_COLUMN,
+  ";":TT_SEMI,
+  "+":TT_PLUS,
+  "-":TT_MINUS,
+  "*":TT_MULTIPLY,
+  "/":TT_DIVIDE,
+  ",":TT_COMMA,
+  "&":TT_ANP,
+  "|":TT_OR,
+  "!":TT_NOT,
+  "^":TT_XOR,
+  "%":TT_MODULUS,
+  ">":TT_GREATER,
+  "<":TT_LOWER,
+  "=":TT_EQUAL
+}
+
+TOKENREGEX:re.Pattern = re.compile(r"(?P<punct>[(){}:;+\-*/,&|!^%><=])|(?P<id>[^\W\d_]\w*)|(?P<int>\d+)|'(?P<char>.)'|(?P<quote>')", re.DOTALL)
+
 class Token:
+  __slots__ = ("type", "value")
   type:int
   value:str|int
   def __init__(self, type:str, value:str = None) -> None:
@@ -30,104 +64,81 @@ class Token:
   def __repr__(self) -> str:
     return f"({self.type},{self.value})"
 
+PUNCTUATIONTOKENS:dict[str,Token] = {char:Token(type) for char, type in PUNCTUATION.items()}
+
+CHUNKSIZE:int = 1 << 16
+LOOKAHEAD:int = 2
+
+def source_chunks(path:str, size:int = CHUNKSIZE) -> GeneratorType:
+  decoder:io.IncrementalNewlineDecoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder(locale.getpreferredencoding(False))(), True)
+  with open(path, "rb") as file:
+    length:int = os.fstat(file.fileno()).st_size
+    if length:
+      with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as source:
+        for offset in range(0, length, size):
+          yield decoder.decode(source[offset:offset + size])
+          source.madvise(mmap.MADV_DONTNEED, offset, min(size, length - offset))
+  yield decoder.decode(b"", True)
+
 class Lexer:
   text:str
-  index:int
-  char:str
   def __init__(self, text:str) -> None:
     self.text = text
-    self.index = -1
-    self.char = None
-
-    self.next()
 
-  def next(self) -> None:
-    self.index += 1
-    self.char = self.text[self.index] if self.index < len(self.text) else None
-  
   def tokenize(self) -> list[Token]:
     tokens:list[Token] = []
+    append = tokens.append
+    punctuation:dict[str,Token] = PUNCTUATIONTOKENS
 
-    while self.char != None:
-      if self.char in " \n":
-        self.next()
-        continue
-
-      if self.char.isalpha():
-        tokens.append(self.id())
-        continue
-      elif self.char.isnumeric():
-        tokens.append(self.num())
-        continue
-      
-      match self.char:
-        case "(":
-          tokens.append(Token(TT_LPAREN))
-        case ")":
-          tokens.append(Token(TT_RPAREN))
-        case "{":
-          tokens.append(Token(TT_LCURLY))
-        case "}":
-          tokens.append(Token(TT_RCURLY))
-        case ":":
-          tokens.append(Token(TT_COLUMN))
-        case ";":
-          tokens.append(Token(TT_SEMI))
-        case "+":
-          tokens.append(Token(TT_PLUS))
-        case "-":
-          tokens.append(Token(TT_MINUS))
-        case "*":
-          tokens.append(Token(TT_MULTIPLY))
-        case "/":
-          tokens.append(Token(TT_DIVIDE))
-        case ",":
-          tokens.append(Token(TT_COMMA))
-        case "'":
-          tokens.append(self.character())
-        case "&":
-          tokens.append(Token(TT_ANP))
-        case "|":
-          tokens.append(Token(TT_OR))
-        case "!":
-          tokens.append(Token(TT_NOT))
-        case "^":
-          tokens.append(Token(TT_XOR))
-        case "%":
-          tokens.append(Token(TT_MODULUS))
-        case ">":
-          tokens.append(Token(TT_GREATER))
-        case "<":
-          tokens.append(Token(TT_LOWER))
-        case "=":
-          tokens.append(Token(TT_EQUAL))
-      self.next()
+    for match in TOKENREGEX.finditer(self.text):
+      kind:str = match.lastgroup
+      if kind == "punct":
+        append(punctuation[match.group()])
+      elif kind == "id":
+        append(Token(TT_ID, match.group()))
+      elif kind == "int":
+        append(Token(TT_INT, match.group()))
+      elif kind == "char":
+        append(Token(TT_INT, str(ord(match.group(kind)))))
+      else:
+        raise ValueError
     return tokens
-  
-  def skip_white_space(self) -> None:
-    while self.char in " \n":
-      self.next()
 
-  def id(self) -> Token:
-    value:str = ""
-    while self.char.isalnum() or self.char == "_":
-      value += self.char
-      self.next()
-    return Token(TT_ID, value)
+class StreamLexer:
+  def __init__(self, chunks) -> None:
+    self.chunks = chunks
+    self.count:int = 0
 
-  def num(self) -> Token:
-    value:str = ""
-    while self.char.isnumeric():
-      value += self.char
-      self.next()
-    return Token(TT_INT, value)
-  
-  def character(self) -> Token:
-    self.next()
-    value:str = str(ord(self.char))
-    self.next()
+  def tokens(self) -> itertools.chain:
+    return itertools.chain.from_iterable(self.batches())
 
-    if self.char != "'":
-      raise ValueError
+  def batches(self) -> GeneratorType:
+    pending:str = ""
+    for chunk in self.chunks:
+      tokens, pending = self.scan(pending + chunk, False)
+      self.count += len(tokens)
+      yield tokens
+    tokens = self.scan(pending, True)[0]
+    self.count += len(tokens)
+    yield tokens
 
-    return Token(TT_INT, value)
\ No newline at end of file
+  def scan(self, text:str, final:bool) -> tuple[list[Token],str]:
+    tokens:list[Token] = []
+    append = tokens.append
+    punctuation:dict[str,Token] = PUNCTUATIONTOKENS
+    end:int = len(text)
+    for match in TOKENREGEX.finditer(text):
+      if not final and (match.end() == end or match.start() >= end - LOOKAHEAD):
+        return tokens, text[match.start():]
+      kind:str = match.lastgroup
+      if kind == "punct":
+        append(punctuation[match.group()])
+      elif kind == "id":
+        append(Token(TT_ID, match.group()))
+      elif kind == "int":
+        append(Token(TT_INT, match.group()))
+      elif kind == "char":
+        append(Token(TT_INT, str(ord(match.group(kind)))))
+      else:
+        raise ValueError
+    return tokens, ""
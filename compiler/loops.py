@@ -0,0 +1,474 @@
+from ir import *
+from folding import *
+import operator
+
+UNROLLFACTOR:int = 4
+UNROLLLIMIT:int = 256
+LOOPREGISTERS:int = 8
+LOOPBLOCKS:int = 256
+SIGNEDLIMIT:int = (1 << 63) - 1
+
+PUREOPS:set[str] = (BINARYOPS | UNARYOPS | {IR_COPY, IR_ADDR}) - {IR_DIV, IR_MOD}
+NEGATEDOPS:dict[str,str] = {IR_EQ:IR_NE, IR_NE:IR_EQ, IR_LT:IR_GE, IR_GE:IR_LT, IR_GT:IR_LE, IR_LE:IR_GT}
+SWAPPEDOPS:dict[str,str] = {IR_EQ:IR_EQ, IR_NE:IR_NE, IR_LT:IR_GT, IR_GT:IR_LT, IR_LE:IR_GE, IR_GE:IR_LE}
+COMPARATORS:dict[str,callable] = {IR_EQ:operator.eq, IR_NE:operator.ne, IR_GT:operator.gt, IR_LT:operator.lt, IR_GE:operator.ge, IR_LE:operator.le}
+
+class Loop:
+  def __init__(self, header:str, blocks:set[str]) -> None:
+    self.header:str = header
+    self.blocks:set[str] = blocks
+    self.pressure:int = 0
+
+  def __repr__(self) -> str:
+    return f"({self.header}, {sorted(self.blocks)})"
+
+class LoopOptimizer:
+  def __init__(self, program:IRProgram, unroll:int = UNROLLFACTOR) -> None:
+    self.program:IRProgram = program
+    self.unroll:int = unroll
+    self.blocks:dict[str,Block] = program.block_map()
+    self.predecessors:dict[str,list[str]] = program.predecessors()
+    self.entry:str = program.blocks[0].name if program.blocks else None
+    self.positions:dict[str,float] = {block.name:index for index, block in enumerate(program.blocks)}
+    self.crossblock:set[VReg] = set()
+    self.widths:dict[VReg,int] = {}
+    self.enclosing:dict[str,list[Loop]] = {}
+
+  def optimize(self) -> IRProgram:
+    if not self.program.blocks:
+      return self.program
+    loops:list[Loop] = self.find_loops()
+    if not loops:
+      return self.program
+    owners:dict[VReg,str] = {}
+    for block in self.program.blocks:
+      for instruction in block.instructions:
+        if instruction.dest is not None:
+          owners[instruction.dest] = block.name
+    for block in self.program.blocks:
+      for instruction in block.instructions:
+        for arg in instruction.uses():
+          if owners.get(arg) != block.name:
+            self.crossblock.add(arg)
+
+    for loop in loops:
+      added:set[str] = self.optimize_loop(loop)
+      for outer in self.enclosing[loop.header]:
+        if outer is not loop:
+          outer.pressure = max(outer.pressure, loop.pressure)
+          outer.blocks |= {name for name in added if all(predecessor in outer.blocks for predecessor in self.predecessors[name]) and all(successor in outer.blocks for successor in self.blocks[name].successors())}
+    return self.program
+
+  def dominators(self) -> dict[str,str]:
+    entry:str = self.program.blocks[0].name
+    order:list[str] = []
+    visited:set[str] = {entry}
+    stack:list[tuple[str,list[str]]] = [(entry, list(self.blocks[entry].successors()))]
+    while stack:
+      name, successors = stack[-1]
+      if successors:
+        successor:str = successors.pop()
+        if successor not in visited:
+          visited.add(successor)
+          stack.append((successor, list(self.blocks[successor].successors())))
+      else:
+        order.append(name)
+        stack.pop()
+    order.reverse()
+    index:dict[str,int] = {name:position for position, name in enumerate(order)}
+
+    idom:dict[str,str] = {entry:entry}
+    changed:bool = True
+    while changed:
+      changed = False
+      for name in order[1:]:
+        dominator:str|None = None
+        for predecessor in self.predecessors[name]:
+          if predecessor not in idom:
+            continue
+          if dominator is None:
+            dominator = predecessor
+            continue
+          while predecessor != dominator:
+            while index[predecessor] > index[dominator]:
+              predecessor = idom[predecessor]
+            while index[dominator] > index[predecessor]:
+              dominator = idom[dominator]
+        if idom.get(name) != dominator:
+          idom[name] = dominator
+          changed = True
+    return idom
+
+  def find_loops(self) -> list[Loop]:
+    idom:dict[str,str] = self.dominators()
+    children:dict[str,list[str]] = {}
+    for name, dominator in idom.items():
+      if name != dominator:
+        children.setdefault(dominator, []).append(name)
+    first:dict[str,int] = {}
+    last:dict[str,int] = {}
+    stack:list[tuple[str,bool]] = [(self.program.blocks[0].name, False)]
+    while stack:
+      name, visited = stack.pop()
+      if visited:
+        last[name] = len(first)
+        continue
+      first[name] = len(first)
+      stack.append((name, True))
+      stack.extend((child, False) for child in children.get(name, []))
+
+    latches:dict[str,list[str]] = {}
+    for block in self.program.blocks:
+      if block.name not in idom:
+        continue
+      for target in block.successors():
+        if first[target] <= first[block.name] and last[block.name] <= last[target]:
+          latches.setdefault(target, []).append(block.name)
+
+    loops:list[Loop] = []
+    for header, sources in latches.items():
+      body:set[str] = {header}
+      stack:list[str] = list(sources)
+      while stack and len(body) <= LOOPBLOCKS:
+        name:str = stack.pop()
+        if name not in body:
+          body.add(name)
+          stack.extend(predecessor for predecessor in self.predecessors[name] if predecessor not in body)
+      if len(body) > LOOPBLOCKS:
+        continue
+      loop:Loop = Loop(header, body)
+      loops.append(loop)
+      for name in body:
+        self.enclosing.setdefault(name, []).append(loop)
+    return sorted(loops, key=lambda loop: len(loop.blocks))
+
+  def optimize_loop(self, loop:Loop) -> set[str]:
+    budget:int = LOOPREGISTERS - loop.pressure
+    if budget <= 0:
+      return set()
+    outside:list[str] = [name for name in self.predecessors[loop.header] if name not in loop.blocks]
+    entries:dict[str,int] = self.entry_values(outside[0]) if len(set(outside)) == 1 else {}
+    blocks:list[Block] = self.loop_blocks(loop)
+    accesses:dict[str,int] = {}
+    sizes:dict[str,int] = {}
+    for block in blocks:
+      for instruction in block.instructions:
+        if instruction.opcode == IR_STORE:
+          sizes[instruction.name] = instruction.size
+        if instruction.opcode == IR_STORE or instruction.opcode == IR_LOAD:
+          accesses[instruction.name] = accesses.get(instruction.name, 0) + 1
+    chosen:list[str] = sorted(sizes, key=lambda name: -accesses[name])[:budget]
+
+    preheader:Block = self.insert_preheader(loop, outside)
+    hoisted:int = self.hoist(blocks, loop.header, preheader, set(sizes), budget - len(chosen))
+    promoted:dict[str,tuple[VReg,int]] = self.promote(blocks, preheader, {name:sizes[name] for name in chosen})
+    loop.pressure += hoisted + len(promoted)
+    added:set[str] = {preheader.name} | self.write_back(loop, promoted)
+    self.unroll_counted(loop, preheader, promoted, entries)
+    return added
+
+  def entry_values(self, name:str) -> dict[str,int]:
+    values:dict[str,int] = {}
+    stored:set[str] = set()
+    for instruction in reversed(self.blocks[name].instructions):
+      if instruction.opcode == IR_STORE and instruction.name not in stored:
+        stored.add(instruction.name)
+        if isinstance(instruction.args[0], int):
+          values[instruction.name] = instruction.args[0] & size_mask(instruction.size)
+    if name == self.entry and not self.predecessors[name]:
+      for variable in self.program.variables.values():
+        if variable.name not in stored:
+          values[variable.name] = (variable.value or 0) & size_mask(variable.size)
+    return values
+
+  def insert_block(self, block:Block, position:int, anchor:float) -> None:
+    self.program.blocks.insert(position, block)
+    self.blocks[block.name] = block
+    self.positions[block.name] = anchor
+
+  def retarget(self, source:str, old:str, new:str) -> None:
+    terminator:IRInstruction = self.blocks[source].terminator()
+    terminator.targets = [new if target == old else target for target in terminator.targets]
+    self.predecessors[old] = [name for name in self.predecessors[old] if name != source]
+    self.predecessors[new].append(source)
+
+  def insert_preheader(self, loop:Loop, outside:list[str]) -> Block:
+    preheader:Block = Block(self.program.new_block_name())
+    preheader.instructions.append(IRInstruction(IR_JUMP, targets=[loop.header]))
+    self.insert_block(preheader, self.program.blocks.index(self.blocks[loop.header]), self.positions[loop.header] - 0.5)
+    self.predecessors[preheader.name] = []
+    for name in dict.fromkeys(outside):
+      self.retarget(name, loop.header, preheader.name)
+    self.predecessors[loop.header].append(preheader.name)
+    return preheader
+
+  def loop_blocks(self, loop:Loop) -> list[Block]:
+    return [self.blocks[name] for name in sorted(loop.blocks, key=lambda name: (self.positions[name], name))]
+
+  def hoist(self, blocks:list[Block], header:str, preheader:Block, stored:set[str], budget:int) -> int:
+    if budget <= 0:
+      return 0
+    defined:dict[VReg,int] = {}
+    for block in blocks:
+      for instruction in block.instructions:
+        if instruction.dest is not None:
+          defined[instruction.dest] = defined.get(instruction.dest, 0) + 1
+
+    def invariant(instruction:IRInstruction, block:Block) -> bool:
+      if instruction.dest is None or defined.get(instruction.dest) != 1:
+        return False
+      opcode:str = instruction.opcode
+      if opcode == IR_LOAD:
+        return instruction.name not in stored
+      if opcode == IR_DIV or opcode == IR_MOD:
+        if block.name != header and (not isinstance(instruction.args[1], int) or instruction.args[1] == 0):
+          return False
+      elif opcode not in PUREOPS:
+        return False
+      return all(arg not in defined for arg in instruction.uses())
+
+    hoisted:list[IRInstruction] = []
+    values:dict[tuple,VReg] = {}
+    replacements:dict[VReg,VReg] = {}
+    changed:bool = True
+    while changed:
+      changed = False
+      for block in blocks:
+        kept:list[IRInstruction] = []
+        for instruction in block.instructions:
+          if replacements:
+            instruction.args = [replacements.get(arg, arg) if isinstance(arg, VReg) else arg for arg in instruction.args]
+          if not invariant(instruction, block):
+            kept.append(instruction)
+            continue
+          key:tuple = (instruction.opcode, tuple(instruction.args), instruction.name, instruction.size)
+          if key in values and instruction.dest not in self.crossblock:
+            replacements[instruction.dest] = values[key]
+          elif len(hoisted) < budget:
+            hoisted.append(instruction)
+            values.setdefault(key, instruction.dest)
+          else:
+            kept.append(instruction)
+            continue
+          del defined[instruction.dest]
+          changed = True
+        block.instructions = kept
+    preheader.instructions[-1:-1] = hoisted
+    self.crossblock.update(instruction.dest for instruction in hoisted)
+    return len(hoisted)
+
+  def promote(self, blocks:list[Block], preheader:Block, sizes:dict[str,int]) -> dict[str,tuple[VReg,int]]:
+    promoted:dict[str,tuple[VReg,int]] = {name:(self.program.new_vreg(), size) for name, size in sizes.items()}
+    if not promoted:
+      return promoted
+    preheader.instructions[-1:-1] = [IRInstruction(IR_LOAD, vreg, name=name, size=size) for name, (vreg, size) in promoted.items()]
+    for vreg, size in promoted.values():
+      self.crossblock.add(vreg)
+      self.widths[vreg] = size
+
+    for block in blocks:
+      current:dict[str,Operand] = {name:vreg for name, (vreg, size) in promoted.items()}
+      replacements:dict[VReg,Operand] = {}
+      instructions:list[IRInstruction] = []
+      terminator:IRInstruction|None = block.terminator()
+      for instruction in block.instructions if terminator is None else block.instructions[:-1]:
+        instruction.args = [replacements.get(arg, arg) for arg in instruction.args]
+        if instruction.opcode == IR_LOAD and instruction.name in promoted:
+          if instruction.dest in self.crossblock:
+            instructions.append(IRInstruction(IR_COPY, instruction.dest, [current[instruction.name]]))
+          else:
+            replacements[instruction.dest] = current[instruction.name]
+        elif instruction.opcode == IR_STORE and instruction.name in promoted:
+          value:Operand = instruction.args[0]
+          if isinstance(value, int):
+            value &= size_mask(instruction.size)
+          elif instruction.size < self.widths.get(value, 8):
+            masked:VReg = self.program.new_vreg()
+            instructions.append(IRInstruction(IR_AND, masked, [value, size_mask(instruction.size)]))
+            value = masked
+          current[instruction.name] = value
+        else:
+          instructions.append(instruction)
+
+      pending:list[tuple[VReg,Operand]] = [(vreg, current[name]) for name, (vreg, size) in promoted.items() if current[name] is not vreg]
+      redefined:set[VReg] = {vreg for vreg, value in pending}
+      for index, (vreg, value) in enumerate(pending):
+        if value in redefined:
+          saved:VReg = self.program.new_vreg()
+          instructions.append(IRInstruction(IR_COPY, saved, [value]))
+          self.widths[saved] = self.widths[value]
+          pending[index] = (vreg, saved)
+      if terminator is not None:
+        terminator.args = [replacements.get(arg, arg) for arg in terminator.args]
+        for index, arg in enumerate(terminator.args):
+          if arg in redefined:
+            saved:VReg = self.program.new_vreg()
+            instructions.append(IRInstruction(IR_COPY, saved, [arg]))
+            terminator.args[index] = saved
+      instructions.extend(IRInstruction(IR_COPY, vreg, [value]) for vreg, value in pending)
+      if terminator is not None:
+        instructions.append(terminator)
+      block.instructions = instructions
+    return promoted
+
+  def write_back(self, loop:Loop, promoted:dict[str,tuple[VReg,int]]) -> set[str]:
+    added:set[str] = set()
+    if not promoted:
+      return added
+    blocks:list[Block] = self.loop_blocks(loop)
+    edges:list[tuple[Block,str]] = []
+    for block in blocks:
+      for target in dict.fromkeys(block.successors()):
+        if target not in loop.blocks:
+          position:int = self.program.blocks.index(block) + 1
+          follows:bool = position < len(self.program.blocks) and self.program.blocks[position].name == target
+          if follows:
+            edges.insert(0, (block, target))
+          else:
+            edges.append((block, target))
+    for block, target in edges:
+      writeback:Block = Block(self.program.new_block_name())
+      writeback.instructions = [IRInstruction(IR_STORE, args=[vreg], name=name, size=size) for name, (vreg, size) in promoted.items()]
+      writeback.instructions.append(IRInstruction(IR_JUMP, targets=[target]))
+      position:int = self.program.blocks.index(block) + 1
+      anchor:float = self.positions[block.name] + 0.5
+      if position == len(self.program.blocks) or self.program.blocks[position].name != target:
+        position = self.program.blocks.index(blocks[-1]) + 1
+        anchor = self.positions[blocks[-1].name] + 0.5
+        while position < len(self.program.blocks) and self.program.blocks[position].name in added:
+          position += 1
+      self.insert_block(writeback, position, anchor)
+      self.predecessors[writeback.name] = []
+      self.retarget(block.name, target, writeback.name)
+      self.predecessors[target].append(writeback.name)
+      added.add(writeback.name)
+    return added
+
+  def unroll_counted(self, loop:Loop, preheader:Block, promoted:dict[str,tuple[VReg,int]], entries:dict[str,int]) -> None:
+    if self.unroll < 2 or len(loop.blocks) != 1:
+      return
+    block:Block = self.blocks[loop.header]
+    terminator:IRInstruction|None = block.terminator()
+    if terminator is None or terminator.opcode != IR_BRANCH or loop.header not in terminator.targets:
+      return
+    body:list[IRInstruction] = block.instructions[:-1]
+    if len(body) * self.unroll > UNROLLLIMIT:
+      return
+
+    count:int|None = None
+    for name, (vreg, size) in promoted.items():
+      if name in entries:
+        count = self.trip_count(body, terminator, loop.header, vreg, size, entries[name])
+        if count is not None:
+          break
+    if count is None or count < self.unroll:
+      return
+
+    multiple:set[VReg] = {vreg for vreg, size in promoted.values()}
+    unrolled:list[IRInstruction] = []
+    for _ in range(self.unroll - 1):
+      unrolled.extend(self.renamed(body, multiple)[0])
+    unrolled.extend(body)
+    block.instructions = unrolled + [terminator]
+    peeled:list[IRInstruction] = []
+    for _ in range(count % self.unroll):
+      peeled.extend(self.renamed(body, multiple)[0])
+    preheader.instructions[-1:-1] = peeled
+
+  def renamed(self, body:list[IRInstruction], multiple:set[VReg]) -> tuple[list[IRInstruction],dict[VReg,VReg]]:
+    mapping:dict[VReg,VReg] = {}
+    instructions:list[IRInstruction] = []
+    for instruction in body:
+      dest:VReg|None = instruction.dest
+      if dest is not None and dest not in multiple:
+        mapping[dest] = self.program.new_vreg()
+        dest = mapping[dest]
+      args:list[Operand] = [mapping.get(arg, arg) if isinstance(arg, VReg) else arg for arg in instruction.args]
+      instructions.append(IRInstruction(instruction.opcode, dest, args, instruction.name, instruction.size, instruction.condition, list(instruction.targets)))
+    return instructions, mapping
+
+  def trip_count(self, body:list[IRInstruction], terminator:IRInstruction, header:str, vreg:VReg, size:int, entry:int) -> int|None:
+    definitions:dict[VReg,IRInstruction] = {}
+    for instruction in body:
+      if instruction.dest is not None:
+        if instruction.dest in definitions:
+          return None
+        definitions[instruction.dest] = instruction
+    if vreg not in definitions or definitions[vreg].opcode != IR_COPY:
+      return None
+
+    def resolve(operand:Operand) -> Operand:
+      while isinstance(operand, VReg) and operand is not vreg and operand in definitions:
+        instruction:IRInstruction = definitions[operand]
+        if instruction.opcode == IR_COPY:
+          operand = instruction.args[0]
+        elif instruction.opcode == IR_AND and isinstance(instruction.args[1], int) and instruction.args[1] & size_mask(size) == size_mask(size):
+          operand = instruction.args[0]
+        else:
+          break
+      return operand
+
+    update:Operand = resolve(definitions[vreg].args[0])
+    if not isinstance(update, VReg) or update not in definitions:
+      return None
+    step:int|None = None
+    increment:IRInstruction = definitions[update]
+    if increment.opcode == IR_ADD and len(increment.args) == 2:
+      a, b = increment.args
+      if resolve(a) is vreg and isinstance(b, int):
+        step = b
+      elif resolve(b) is vreg and isinstance(a, int):
+        step = a
+      if step is not None and step >= 1 << 63:
+        step -= 1 << 64
+    elif increment.opcode == IR_SUB and resolve(increment.args[0]) is vreg and isinstance(increment.args[1], int):
+      step = -signed(increment.args[1] & MASK64)
+    if step is None or step == 0 or abs(step) >= 1 << 31:
+      return None
+
+    condition:str = terminator.condition
+    if terminator.targets[0] != header:
+      condition = NEGATEDOPS[condition]
+    a, b = terminator.args
+    if isinstance(a, int):
+      a, b = b, a
+      condition = SWAPPEDOPS[condition]
+    if not isinstance(b, int):
+      return None
+    operand:Operand = resolve(a)
+    if operand is vreg:
+      offset:int = 0
+    elif operand is update:
+      offset:int = 1
+    else:
+      return None
+
+    highest:int = min(size_mask(size), SIGNEDLIMIT)
+    if step > 0:
+      last:int = (highest - entry) // step + 1 - offset
+    else:
+      last:int = entry // -step + 1 - offset
+    if entry > highest or last < 1:
+      return None
+
+    comparator:callable = COMPARATORS[condition]
+    bound:int = signed(b & MASK64)
+    def continues(iteration:int) -> bool:
+      return comparator(entry + (iteration - 1 + offset) * step, bound)
+
+    if not continues(1):
+      return 1
+    if continues(last):
+      return None
+    low:int = 1
+    high:int = last
+    while high - low > 1:
+      middle:int = (low + high) // 2
+      if continues(middle):
+        low = middle
+      else:
+        high = middle
+    return high
+
+def optimize_loops(program:IRProgram, unroll:int = UNROLLFACTOR) -> None:
+  LoopOptimizer(program, unroll).optimize()
@@ -0,0 +1,197 @@
+from astt import *
+from ir import *
+from symbols import *
+from x86 import immediate_value
+
+ASTOPERATIONS:dict[str,str] = {
+  ASTT_ADD:IR_ADD,
+  ASTT_SUBTRACT:IR_SUB,
+  ASTT_MULTIPLY:IR_MUL,
+  ASTT_DIVIDE:IR_DIV,
+  ASTT_MODULUS:IR_MOD,
+  ASTT_AND:IR_AND,
+  ASTT_OR:IR_OR,
+  ASTT_XOR:IR_XOR,
+  ASTT_EQUAL:IR_EQ,
+  ASTT_NOT_EQUAL:IR_NE,
+  ASTT_GREATER:IR_GT,
+  ASTT_LOWER:IR_LT,
+  ASTT_GREATER_EQUAL:IR_GE,
+  ASTT_LOWER_EQUAL:IR_LE,
+  ASTT_MINUSSIGN:IR_NEG,
+  ASTT_NOT:IR_NOT
+}
+
+class Lowering:
+  def __init__(self, nodes:list[ASTNode]) -> None:
+    self.nodes = nodes
+    self.program:IRProgram = IRProgram()
+    self.scope:Scope = Scope()
+    self.block:Block = None
+    self.jumps:list[str] = []
+    self.needs:dict[ASTNode,int] = {}
+    self.values:dict[ASTNode,Operand] = {}
+
+    self.statements:dict[str,callable] = {
+      ASTT_RESERVE:self.lower_reserve,
+      ASTT_CONST:self.lower_const,
+      ASTT_SET:self.lower_set,
+      ASTT_EXIT:self.lower_exit,
+      ASTT_LABEL:self.lower_label,
+      ASTT_JUMP:self.lower_jump
+    }
+    self.expressions:dict[str,callable] = {
+      ASTT_NUM:self.lower_num,
+      ASTT_VARCALL:self.lower_varcall,
+      ASTT_POINTER:self.lower_pointer,
+      ASTT_PLUSSIGN:self.lower_plussign
+    }
+    for type in UNARYTYPES - {ASTT_PLUSSIGN}:
+      self.expressions[type] = self.lower_unary
+    for type in BINARYTYPES:
+      self.expressions[type] = self.lower_binary
+
+  def lower(self) -> IRProgram:
+    self.start_block(self.program.new_block_name())
+    for node in self.nodes:
+      self.lower_statement(node)
+    if self.block is not None:
+      self.emit(IRInstruction(IR_EXIT, args=[0]))
+
+    for name in self.jumps:
+      if self.scope.lookup(name).kind != SYMK_LABEL:
+        raise ValueError
+    return self.program
+
+  def start_block(self, name:str) -> None:
+    if self.block is not None:
+      self.emit(IRInstruction(IR_JUMP, targets=[name]))
+    self.block = Block(name)
+    self.program.blocks.append(self.block)
+    self.values.clear()
+
+  def emit(self, instruction:IRInstruction) -> None:
+    if self.block is None:
+      self.block = Block(self.program.new_block_name())
+      self.program.blocks.append(self.block)
+      self.values.clear()
+    self.block.instructions.append(instruction)
+    if instruction.is_terminator():
+      self.block = None
+
+  def lower_statement(self, node:ASTNode) -> None:
+    self.needs.clear()
+    self.values.clear()
+    handler:callable = self.statements.get(node.asttype)
+    if handler is None:
+      raise ValueError
+    handler(node)
+
+  def lower_reserve(self, node:ASTReserve) -> None:
+    self.scope.declare(node.name, SYMK_RESERVE, node.size, STORAGE_BSS)
+    self.program.variables[node.name] = Variable(node.name, node.size, STORAGE_BSS)
+
+  def lower_const(self, node:ASTConst) -> None:
+    self.scope.declare(node.name, SYMK_CONST, node.size, STORAGE_DATA)
+    self.program.variables[node.name] = Variable(node.name, node.size, STORAGE_DATA, node.value)
+
+  def lower_set(self, node:ASTSet) -> None:
+    symbol:Symbol = self.scope.lookup(node.name)
+    if symbol.kind != SYMK_RESERVE:
+      raise ValueError
+    value:Operand = self.lower_value(node.value)
+    self.emit(IRInstruction(IR_STORE, args=[value], name=node.name, size=symbol.size))
+
+  def lower_exit(self, node:ASTExit) -> None:
+    self.emit(IRInstruction(IR_EXIT, args=[self.lower_value(node.value)]))
+
+  def lower_label(self, node:ASTLabel) -> None:
+    self.scope.declare(f"label_{node.name}", SYMK_LABEL, 0, STORAGE_TEXT)
+    self.start_block(f"label_{node.name}")
+
+  def lower_jump(self, node:ASTJump) -> None:
+    self.jumps.append(f"label_{node.name}")
+    fallthrough:str = self.program.new_block_name()
+    register_needs(node.value, self.needs)
+    trampoline(self.lower_branch(node.value, f"label_{node.name}", fallthrough))
+    self.start_block(fallthrough)
+
+  def lower_value(self, node:ASTNode) -> Operand:
+    register_needs(node, self.needs)
+    return trampoline(self.lower_expr(node))
+
+  def lower_branch(self, node:ASTNode, iftrue:str, iffalse:str) -> GeneratorType:
+    type:str = node.asttype
+    if type in COMPARISONTYPES:
+      a, b = yield from self.lower_operands(node)
+      self.emit(IRInstruction(IR_BRANCH, args=[a, b], condition=ASTOPERATIONS[type], targets=[iftrue, iffalse]))
+    elif (type == ASTT_AND or type == ASTT_OR) and is_condition(node):
+      middle:str = self.program.new_block_name()
+      if type == ASTT_AND:
+        yield self.lower_branch(node.a, middle, iffalse)
+      else:
+        yield self.lower_branch(node.a, iftrue, middle)
+      self.start_block(middle)
+      yield self.lower_branch(node.b, iftrue, iffalse)
+    elif type == ASTT_NUM:
+      self.emit(IRInstruction(IR_JUMP, targets=[iftrue if immediate_value(node.value) == 1 else iffalse]))
+    else:
+      value:Operand = yield self.lower_expr(node)
+      self.emit(IRInstruction(IR_BRANCH, args=[value, 1], condition=IR_EQ, targets=[iftrue, iffalse]))
+
+  def need(self, node:ASTNode) -> int:
+    return self.needs[node]
+
+  def lower_operands(self, node:ASTNode) -> GeneratorType:
+    if self.need(node.b) > self.need(node.a):
+      b:Operand = yield self.lower_expr(node.b)
+      return (yield self.lower_expr(node.a)), b
+    a:Operand = yield self.lower_expr(node.a)
+    return a, (yield self.lower_expr(node.b))
+
+  def lower_expr(self, node:ASTNode) -> GeneratorType|Operand:
+    if node in self.values:
+      return self.values[node]
+    handler:callable = self.expressions.get(node.asttype)
+    if handler is None:
+      raise ValueError
+    if node.asttype in LEAFTYPES:
+      operand:Operand = handler(node)
+      self.values[node] = operand
+      return operand
+    return self.lower_shared(node, handler)
+
+  def lower_shared(self, node:ASTNode, handler:callable) -> GeneratorType:
+    operand:Operand = yield handler(node)
+    self.values[node] = operand
+    return operand
+
+  def lower_num(self, node:ASTNum) -> Operand:
+    return immediate_value(node.value)
+
+  def lower_varcall(self, node:ASTVarcall) -> Operand:
+    symbol:Symbol = self.scope.variable(node.name)
+    dest:VReg = self.program.new_vreg()
+    self.emit(IRInstruction(IR_LOAD, dest, name=node.name, size=symbol.size))
+    return dest
+
+  def lower_pointer(self, node:ASTPointer) -> Operand:
+    self.scope.variable(node.name)
+    dest:VReg = self.program.new_vreg()
+    self.emit(IRInstruction(IR_ADDR, dest, name=node.name))
+    return dest
+
+  def lower_plussign(self, node:ASTPlussign) -> GeneratorType:
+    return (yield self.lower_expr(node.a))
+
+  def lower_unary(self, node:ASTMinussign|ASTNot) -> GeneratorType:
+    a:Operand = yield self.lower_expr(node.a)
+    dest:VReg = self.program.new_vreg()
+    self.emit(IRInstruction(ASTOPERATIONS[node.asttype], dest, [a]))
+    return dest
+
+  def lower_binary(self, node:ASTNode) -> GeneratorType:
+    a, b = yield from self.lower_operands(node)
+    dest:VReg = self.program.new_vreg()
+    self.emit(IRInstruction(ASTOPERATIONS[node.asttype], dest, [a, b]))
+    return dest
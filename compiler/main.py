@@ -1,49 +1,426 @@
 from lexer import *
 from parser import *
 from translator import *
+from folding import *
+from lowering import *
+from passes import *
+from backend import *
+from flow import *
+from incremental import *
+from protocol import *
+from elf import *
+from stats import *
+from evaluator import *
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import contextlib
+import copy
+import functools
+import io
+import signal
 import sys
 import os
+import tempfile
+import time
+import traceback
+
+VALUEFLAGS:tuple[str, ...] = ("-o", "--cache", "--cache-limit", "-j", "--manifest", "--socket", "--eval-steps", "--unroll")
+
+class Options:
+  def __init__(self) -> None:
+    self.inputfile:str = None
+    self.outputfile:str = None
+    self.level:int = 1
+    self.peepholeStats:bool = False
+    self.dumpIR:bool = False
+    self.timePasses:bool = False
+    self.dceStats:bool = False
+    self.compactAST:bool = False
+    self.cacheDirectory:str = None
+    self.cacheLimit:int = CACHELIMIT
+    self.batch:list[tuple[str,str]] = []
+    self.jobs:int = os.cpu_count() or 1
+    self.socket:str = SOCKETPATH
+    self.elf:bool = False
+    self.stats:str = None
+    self.evalSteps:int = EVALSTEPS
+    self.evalReport:bool = False
+    self.unroll:int = UNROLLFACTOR
+    self.registerVariables:bool = False
+    self.memoryTraffic:bool = False
+    self.stream:bool = False
 
 def print_help() -> None:
-  print("Help:\n  -o [str] : name of output file\n  -h : print help")
+  print("Help:\n  -o [str] : name of output file\n  -O[0-2] : optimization level, default -O1\n  --peephole-stats : print peephole rule hit counts\n  --dump-ir : print the intermediate representation\n  --time-passes : print the time spent in each IR pass\n  --dce-stats : print the bytes removed from each section by dead code elimination\n  --compact-ast : keep the syntax tree in flat arrays instead of node objects\n  --stats[=json] : print per-phase wall time, cpu time and memory peak with token, node, symbol and section counts, as text or json\n  --eval-steps [int] : statement budget for running the program at compile time at -O2, 0 disables, default 1000000\n  --eval-report : print whether compile-time evaluation finished or why it stopped\n  --unroll [int] : unroll factor for counted loops at -O2, 1 disables, default 4\n  --register-variables : keep frequently used variables in registers, variables whose address is taken stay in memory\n  --memory-traffic : print the loads and stores of each variable at -O0 with variables in memory and with --register-variables\n  --stream : read the source through mmap and translate each statement as soon as it is parsed, requires -O0\n  --elf : encode the program and write a static x86-64 ELF executable instead of NASM source\n  --cache [dir] : reuse translated statements from a cache directory, requires -O0\n  --cache-limit [int] : cache size limit in bytes, default 64 MiB\n  --batch [files] : compile every listed file to a .asm file next to it, must be the first argument\n  --manifest [str] : in batch mode, read input files and optional output files from a list, one pair per line\n  -j [int] : number of batch or server worker processes, default number of cpus\n  --serve : keep the compiler loaded and answer compiler/client.py requests on a unix socket, must be the first argument\n  --socket [str] : socket path for --serve and compiler/client.py, default $PCOMPILER_SOCKET or /tmp/pcompiler-[uid].sock\n  -h : print help")
   sys.exit(0)
 
-def parse_arguments(argv:list[str]) -> tuple[str,str]:
-  inputfile:str = argv[1]
-  outputfile:str
+def parse_arguments(argv:list[str]) -> Options:
+  options:Options = Options()
+  options.inputfile = argv[1]
   for index, arg in enumerate(argv[2:].copy()):
     if arg == "-h":
       print_help()
     elif arg == "-o":
-      outputfile = argv[index+3]
+      options.outputfile = argv[index+3]
+    elif arg in ("-O0", "-O1", "-O2"):
+      options.level = int(arg[2:])
+    elif arg == "--peephole-stats":
+      options.peepholeStats = True
+    elif arg == "--dump-ir":
+      options.dumpIR = True
+    elif arg == "--time-passes":
+      options.timePasses = True
+    elif arg == "--dce-stats":
+      options.dceStats = True
+    elif arg == "--compact-ast":
+      options.compactAST = True
+    elif arg in ("--stats", "--stats=text", "--stats=json"):
+      options.stats = "json" if arg == "--stats=json" else "text"
+    elif arg == "--eval-steps":
+      options.evalSteps = int(argv[index+3])
+    elif arg == "--unroll":
+      options.unroll = int(argv[index+3])
+    elif arg == "--eval-report":
+      options.evalReport = True
+    elif arg == "--register-variables":
+      options.registerVariables = True
+    elif arg == "--memory-traffic":
+      options.memoryTraffic = True
+    elif arg == "--stream":
+      options.stream = True
+    elif arg == "--elf":
+      options.elf = True
+    elif arg == "--cache":
+      options.cacheDirectory = argv[index+3]
+    elif arg == "--cache-limit":
+      options.cacheLimit = int(argv[index+3])
+    elif arg == "-j":
+      options.jobs = int(argv[index+3])
+    elif arg == "--socket":
+      options.socket = argv[index+3]
+    elif arg == "--manifest":
+      options.batch.extend(read_manifest(argv[index+3]))
+    elif options.inputfile == "--batch" and not arg.startswith("-") and argv[index+1] not in VALUEFLAGS:
+      options.batch.append((arg, f"{os.path.splitext(arg)[0]}.asm"))
   
-  if not (os.path.isfile(inputfile)):
+  if options.inputfile == "--batch":
+    for inputfile, outputfile in options.batch:
+      if not (os.path.isfile(inputfile)):
+        print(f"ERROR: batch input {inputfile} is not a valid input file.")
+        exit(1)
+    if options.cacheDirectory is not None:
+      print("ERROR: --cache can not be used with --batch.")
+      exit(1)
+    if options.outputfile is not None:
+      print("ERROR: -o can not be used with --batch, name output files with --manifest.")
+      exit(1)
+  elif options.inputfile != "--serve" and not (os.path.isfile(options.inputfile)):
     print("ERROR: first argument must be a valid input file.")
     exit(1)
+  if options.jobs < 1:
+    print("ERROR: -j must be at least 1.")
+    exit(1)
+  if options.unroll < 1:
+    print("ERROR: --unroll must be at least 1.")
+    exit(1)
+  if options.cacheDirectory is not None and options.level != 0:
+    print("ERROR: --cache requires -O0.")
+    exit(1)
+  if options.memoryTraffic and options.level != 0:
+    print("ERROR: --memory-traffic requires -O0.")
+    exit(1)
+  if options.stream and options.level != 0:
+    print("ERROR: --stream requires -O0.")
+    exit(1)
+  if options.stream and (options.elf or options.cacheDirectory is not None or options.compactAST or options.dumpIR or options.registerVariables or options.memoryTraffic):
+    print("ERROR: --stream keeps no program in memory and can not be used with --elf, --cache, --compact-ast, --dump-ir, --register-variables or --memory-traffic.")
+    exit(1)
+  if (options.registerVariables or options.memoryTraffic) and options.cacheDirectory is not None:
+    print("ERROR: --register-variables and --memory-traffic translate the whole program and can not be used with --cache.")
+    exit(1)
 
-  return inputfile, outputfile
+  return options
+
+def read_manifest(filename:str) -> list[tuple[str,str]]:
+  batch:list[tuple[str,str]] = []
+  with open(filename, "r") as file:
+    for line in file:
+      fields:list[str] = line.split()
+      if len(fields) == 1:
+        batch.append((fields[0], f"{os.path.splitext(fields[0])[0]}.asm"))
+      elif len(fields) == 2:
+        batch.append((fields[0], fields[1]))
+      elif fields:
+        print(f"ERROR: manifest line must be an input file and an optional output file: {line.strip()}")
+        exit(1)
+  return batch
+
+def variable_allocator(nodes:list[ASTNode], options:Options) -> VariableAllocator|None:
+  if not options.registerVariables:
+    return None
+  allocator:VariableAllocator = VariableAllocator(nodes)
+  allocator.allocate()
+  return allocator
+
+def pass_manager(options:Options) -> PassManager:
+  return PassManager(options.level, [(name, level, functools.partial(function, unroll=options.unroll) if function is optimize_loops else function) for name, level, function in IRPASSES])
+
+def measure_sections(nodes:list[ASTNode], options:Options) -> dict[str,int]:
+  program:IRProgram = Lowering(nodes).lower()
+  pass_manager(options).run(program)
+  return section_sizes(Backend(program, Peephole(), variable_allocator(nodes, options)).translate().splitlines())
 
 def main(argc:int, argv:list[str]) -> int:
   if argc < 2:
     print("ERROR: not enough arguments. Use -h to show all flags and help.")
     exit(0)
   
-  inputfile, outputfile = parse_arguments(argv)
+  options:Options = parse_arguments(argv)
+  if options.inputfile == "--batch":
+    return compile_batch(options)
+  if options.inputfile == "--serve":
+    return serve(options)
+  return compile_file(options)
+
+def error_message(error:Exception) -> str:
+  return f"{type(error).__name__}: {error}" if str(error) else type(error).__name__
+
+def compile_job(options:Options) -> tuple[str,str|None]:
+  output:io.StringIO = io.StringIO()
+  try:
+    with contextlib.redirect_stdout(output):
+      compile_file(options)
+  except Exception as error:
+    return output.getvalue(), error_message(error)
+  return output.getvalue(), None
+
+def serve_job(args:list[str], source:str|None) -> dict:
+  if args and args[0] in ("--batch", "--serve"):
+    return {"status":1, "stdout":"", "error":f"{args[0]} can not be used through the server.", "traceback":None, "assembly":None}
+  if source is not None and "--elf" in args:
+    return {"status":1, "stdout":"", "error":"--elf needs an output file.", "traceback":None, "assembly":None}
+  with tempfile.TemporaryDirectory() as directory:
+    outputfile:str = os.path.join(directory, "output.asm")
+    if source is not None:
+      inputfile:str = os.path.join(directory, "input.src")
+      with open(inputfile, "w") as file:
+        file.write(source)
+      args = [inputfile, "-o", outputfile] + args
+    output:io.StringIO = io.StringIO()
+    trace:str|None = None
+    try:
+      with contextlib.redirect_stdout(output):
+        status:int = main(len(args) + 1, ["main.py"] + args)
+    except SystemExit as exception:
+      status = exception.code if isinstance(exception.code, int) else 1 if exception.code else 0
+    except Exception:
+      status, trace = 1, traceback.format_exc()
+    assembly:str|None = None
+    if source is not None and status == 0:
+      with open(outputfile, "r") as file:
+        assembly = file.read()
+  return {"status":status, "stdout":output.getvalue(), "error":None, "traceback":trace, "assembly":assembly}
+
+async def serve_connection(reader:asyncio.StreamReader, writer:asyncio.StreamWriter, executor:ProcessPoolExecutor) -> None:
+  try:
+    size, = HEADER.unpack(await reader.readexactly(HEADER.size))
+    message:dict = decode_message(await reader.readexactly(size))
+    response:dict = await asyncio.get_running_loop().run_in_executor(executor, serve_job, list(message.get("args", [])), message.get("source"))
+    writer.write(encode_message(response))
+    await writer.drain()
+  except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+    pass
+  finally:
+    writer.close()
+
+async def serve_forever(path:str, executor:ProcessPoolExecutor) -> None:
+  server:asyncio.Server = await asyncio.start_unix_server(lambda reader, writer: serve_connection(reader, writer, executor), path)
+  asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, server.close)
+  print(f"listening on {path}", flush=True)
+  try:
+    await server.serve_forever()
+  except asyncio.CancelledError:
+    pass
+
+def serve(options:Options) -> int:
+  if listening(options.socket):
+    print(f"ERROR: a server is already listening on {options.socket}.")
+    exit(1)
+  if os.path.exists(options.socket):
+    os.unlink(options.socket)
+
+  executor:ProcessPoolExecutor = ProcessPoolExecutor(options.jobs, initializer=signal.signal, initargs=(signal.SIGINT, signal.SIG_IGN))
+  try:
+    asyncio.run(serve_forever(options.socket, executor))
+  except KeyboardInterrupt:
+    pass
+  finally:
+    executor.shutdown()
+    if os.path.exists(options.socket):
+      os.unlink(options.socket)
+  return 0
+
+def compile_batch(options:Options) -> int:
+  jobs:list[Options] = []
+  for inputfile, outputfile in options.batch:
+    job:Options = copy.copy(options)
+    job.inputfile, job.outputfile, job.batch = inputfile, outputfile, []
+    jobs.append(job)
+
+  start:float = time.perf_counter()
+  failed:int = 0
+  executor:ProcessPoolExecutor|None = ProcessPoolExecutor(options.jobs) if options.jobs > 1 else None
+  if executor is None:
+    results = map(compile_job, jobs)
+  else:
+    results = executor.map(compile_job, jobs, chunksize=max(1, len(jobs) // (options.jobs * 4)))
+  for job, (output, error) in zip(jobs, results):
+    if output:
+      print(f"{job.inputfile}:\n{output}", end="" if output.endswith("\n") else "\n")
+    if error is not None:
+      print(f"ERROR: {job.inputfile}: {error}")
+      failed += 1
+  if executor is not None:
+    executor.shutdown()
+  seconds:float = time.perf_counter() - start
+
+  size:int = sum(os.path.getsize(job.inputfile) for job in jobs)
+  print(f"compiled {len(jobs) - failed} of {len(jobs)} files in {seconds:.2f} s: {len(jobs) / seconds:.1f} files/s, {size / seconds / 1e6:.2f} MB/s")
+  return 1 if failed else 0
+
+def write_output(options:Options, translator:Translator|Backend, stats:CompileStats|None, name:str) -> None:
+  if options.elf:
+    with phase(stats, name):
+      assembly:str = translator.translate()
+      translator.emitter.close()
+    with phase(stats, "assemble"):
+      write_executable(options.outputfile, Assembler(assembly.splitlines()).assemble())
+    if stats is not None:
+      stats.count_sections(assembly.splitlines())
+    return
+  with phase(stats, name):
+    with open(options.outputfile, "w") as file:
+      translator.translate_to(file)
+  if stats is not None:
+    with open(options.outputfile, "r") as file:
+      stats.count_sections(file)
+
+def print_stats(options:Options, stats:CompileStats|None) -> None:
+  if stats is None:
+    return
+  stats.stop()
+  print(stats.to_json() if options.stats == "json" else stats.report())
+
+def print_memory_traffic(nodes:list[ASTNode]) -> None:
+  before:dict[str,tuple[int,int]] = memory_traffic(Translator(nodes).translate().splitlines())
+  translator:Translator = Translator(nodes, registerVariables=True)
+  after:dict[str,tuple[int,int]] = memory_traffic(translator.translate().splitlines())
+  for name, (loads, stores) in before.items():
+    newloads, newstores = after.get(name, (0, 0))
+    home:str = f" in {translator.homes[name]}" if name in translator.homes else ""
+    print(f"{name}: {loads} loads, {stores} stores -> {newloads} loads, {newstores} stores{home}")
+  print(f"total: {sum(loads for loads, stores in before.values())} loads, {sum(stores for loads, stores in before.values())} stores -> {sum(loads for loads, stores in after.values())} loads, {sum(stores for loads, stores in after.values())} stores")
+
+def compile_file(options:Options) -> int:
+  stats:CompileStats|None = CompileStats() if options.stats is not None else None
+  if options.stream:
+    lexer:StreamLexer = StreamLexer(source_chunks(options.inputfile))
+    translator:Translator = Translator(Parser(lexer.tokens()).stream())
+    write_output(options, translator, stats, "stream")
+    if stats is not None:
+      stats.tokens = lexer.count
+      stats.count_scope(translator.scope)
+    print_stats(options, stats)
+    return 0
+
+  with phase(stats, "read"):
+    with open(options.inputfile, "r") as file:
+      text:str = file.read()
+
+  if options.cacheDirectory is not None:
+    if options.dumpIR or stats is not None:
+      tokens:list[Token] = Lexer(text).tokenize()
+      nodes:list[ASTNode] = Parser(tokens).parse()
+    if options.dumpIR:
+      print(Lowering(nodes).lower())
+    if stats is not None:
+      stats.count_tokens(tokens)
+      stats.count_nodes(nodes)
+      stats.count_symbols(nodes)
+    cache:FragmentCache = FragmentCache(options.cacheDirectory, options.cacheLimit)
+    translator:IncrementalTranslator = IncrementalTranslator(text, cache)
+    write_output(options, translator, stats, "incremental")
+    cache.close()
+    print_stats(options, stats)
+    return 0
+
+  with phase(stats, "tokenize"):
+    lexer:Lexer = Lexer(text)
+    tokens:list[Token] = lexer.tokenize()
+
+  with phase(stats, "parse"):
+    if options.compactAST:
+      nodes:NodeStore = NodeStore()
+      Parser(tokens, nodes).parse()
+    else:
+      parser:Parser = Parser(tokens)
+      nodes:list[ASTNode] = parser.parse()
+  if stats is not None:
+    stats.count_tokens(tokens)
+    stats.count_nodes(nodes)
+    stats.count_symbols(nodes)
+
+  if options.level == 0:
+    if options.dumpIR:
+      print(Lowering(nodes).lower())
+
+    translator:Translator = Translator(nodes, registerVariables=options.registerVariables)
+    write_output(options, translator, stats, "translate")
+    if options.memoryTraffic:
+      print_memory_traffic(nodes)
+    print_stats(options, stats)
+    return 0
 
-  with open(inputfile, "r") as file:
-    text:str = file.read()
+  if options.level == 2:
+    with phase(stats, "evaluate"):
+      evaluator:Evaluator = Evaluator(nodes, options.evalSteps)
+      evaluated:list[ASTNode]|None = evaluator.evaluate()
+    if evaluated is not None:
+      nodes = evaluated
+    if options.evalReport:
+      print(evaluator.report())
 
-  lexer:Lexer = Lexer(text)
-  tokens:list[Token] = lexer.tokenize()
+  with phase(stats, "fold"):
+    nodes = ConstantFolder(nodes).fold()
+  with phase(stats, "eliminate"):
+    eliminator:DeadCodeEliminator = DeadCodeEliminator(nodes)
+    nodes = eliminator.eliminate()
+  with phase(stats, "lower"):
+    lowering:Lowering = Lowering(nodes)
+    program:IRProgram = lowering.lower()
+    allocator:VariableAllocator|None = variable_allocator(nodes, options)
 
-  parser:Parser = Parser(tokens)
-  nodes:list[ASTNode] = parser.parse()
+  with phase(stats, "passes"):
+    passes:PassManager = pass_manager(options)
+    passes.run(program)
+  if options.dumpIR:
+    print(program)
 
-  translator:Translator = Translator(nodes)
-  code:str = translator.translate()
+  peephole:Peephole = Peephole()
+  backend:Backend = Backend(program, peephole, allocator)
+  write_output(options, backend, stats, "backend")
 
-  with open(outputfile, "w") as file:
-    file.write(code)
+  if options.dceStats:
+    before:dict[str,int] = measure_sections(eliminator.nodes, options)
+    after:dict[str,int] = measure_sections(nodes, options)
+    print(f"statements removed: {len(eliminator.removed)}")
+    for section, size in before.items():
+      print(f"{section}: {size - after.get(section, 0)} of {size} bytes removed")
+  if options.timePasses:
+    print(passes.report())
+  if options.peepholeStats:
+    print(peephole.report())
+  print_stats(options, stats)
 
   return 0
 
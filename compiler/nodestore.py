@@ -0,0 +1,121 @@
+from array import array
+from astt import *
+from folding import MASK64, signed
+
+NODETYPES:tuple[str, ...] = tuple(NODECLASSES)
+NODECODES:dict[str,int] = {type:code for code, type in enumerate(NODETYPES)}
+IMMEDIATECODES:set[int] = {NODECODES[ASTT_NUM], NODECODES[ASTT_CONST]}
+NAMEDTYPES:set[str] = {ASTT_VARCALL, ASTT_POINTER, ASTT_LABEL}
+
+class NodeStore:
+  def __init__(self) -> None:
+    self.opcodes:array = array("B")
+    self.left:array = array("q")
+    self.right:array = array("q")
+    self.immediates:array = array("q")
+    self.names:list[str] = []
+    self.nameIndices:dict[str,int] = {}
+    self.statements:array = array("q")
+
+    self.constructors:dict[type,callable] = {
+      ASTNum:lambda value: self.add(ASTT_NUM, 0, 0, signed(value & MASK64)),
+      ASTReserve:lambda name, size: self.add(ASTT_RESERVE, self.intern(name), size, 0),
+      ASTConst:lambda name, size, value: self.add(ASTT_CONST, self.intern(name), size, signed(value & MASK64)),
+      ASTSet:lambda name, value: self.add(ASTT_SET, self.intern(name), value, 0),
+      ASTJump:lambda name, value: self.add(ASTT_JUMP, self.intern(name), value, 0),
+      ASTExit:lambda value: self.add(ASTT_EXIT, 0, value, 0)
+    }
+    for type in NAMEDTYPES:
+      self.constructors[NODECLASSES[type]] = lambda name, type=type: self.add(type, self.intern(name), 0, 0)
+    for type in UNARYTYPES:
+      self.constructors[NODECLASSES[type]] = lambda a, type=type: self.add(type, a, 0, 0)
+    for type in BINARYTYPES:
+      self.constructors[NODECLASSES[type]] = lambda a, b, type=type: self.add(type, a, b, 0)
+
+  def __len__(self) -> int:
+    return len(self.statements)
+
+  def __getitem__(self, index:int) -> "NodeView":
+    return NodeView(self, self.statements[index])
+
+  def intern(self, name:str) -> int:
+    index:int = self.nameIndices.get(name)
+    if index is None:
+      index = len(self.names)
+      self.names.append(name)
+      self.nameIndices[name] = index
+    return index
+
+  def add(self, type:str, left:int, right:int, immediate:int) -> int:
+    self.opcodes.append(NODECODES[type])
+    self.left.append(left)
+    self.right.append(right)
+    self.immediates.append(immediate)
+    return len(self.opcodes) - 1
+
+  def node(self, index:int) -> ASTNode:
+    return trampoline(self.build(index))
+
+  def build(self, index:int) -> GeneratorType:
+    view:NodeView = NodeView(self, index)
+    type:str = view.asttype
+    if type == ASTT_NUM:
+      return ASTNum(view.value)
+    elif type in NAMEDTYPES:
+      return NODECLASSES[type](view.name)
+    elif type == ASTT_RESERVE:
+      return ASTReserve(view.name, view.size)
+    elif type == ASTT_CONST:
+      return ASTConst(view.name, view.size, view.value)
+    elif type == ASTT_SET or type == ASTT_JUMP:
+      return NODECLASSES[type](view.name, (yield self.build(self.right[index])))
+    elif type == ASTT_EXIT:
+      return ASTExit((yield self.build(self.right[index])))
+    elif type in UNARYTYPES:
+      return NODECLASSES[type]((yield self.build(self.left[index])))
+    a:ASTNode = yield self.build(self.left[index])
+    return NODECLASSES[type](a, (yield self.build(self.right[index])))
+
+  def nodes(self) -> list[ASTNode]:
+    return [self.node(index) for index in self.statements]
+
+class NodeView:
+  __slots__ = ("store", "index")
+  def __init__(self, store:NodeStore, index:int) -> None:
+    self.store:NodeStore = store
+    self.index:int = index
+
+  @property
+  def asttype(self) -> str:
+    return NODETYPES[self.store.opcodes[self.index]]
+
+  @property
+  def name(self) -> str:
+    return self.store.names[self.store.left[self.index]]
+
+  @property
+  def size(self) -> int:
+    return self.store.right[self.index]
+
+  @property
+  def a(self) -> "NodeView":
+    return NodeView(self.store, self.store.left[self.index])
+
+  @property
+  def b(self) -> "NodeView":
+    return NodeView(self.store, self.store.right[self.index])
+
+  @property
+  def value(self) -> "int|NodeView":
+    if self.store.opcodes[self.index] in IMMEDIATECODES:
+      return self.store.immediates[self.index] & MASK64
+    return NodeView(self.store, self.store.right[self.index])
+
+  def __eq__(self, other) -> bool:
+    return isinstance(other, NodeView) and other.index == self.index and other.store is self.store
+
+  def __hash__(self) -> int:
+    return self.index
+
+  def __repr__(self) -> str:
+    return format_node(self)
@@ -1,5 +1,6 @@
 from lexer import *
 from astt import *
+from nodestore import *
 
 VARTYPEDICT:dict[str,int] = {
   "u64":8,
@@ -8,17 +9,62 @@ VARTYPEDICT:dict[str,int] = {
   "u8":1
 }
 
+BINARYOPERATORS:dict[str,tuple[int,type,type]] = {
+  TT_PLUS:(1, ASTAdd, None),
+  TT_MINUS:(1, ASTSubtract, None),
+  TT_MULTIPLY:(2, ASTMultiply, None),
+  TT_DIVIDE:(2, ASTDivide, None),
+  TT_MODULUS:(2, ASTModulus, None),
+  TT_ANP:(3, ASTAnd, None),
+  TT_OR:(3, ASTOr, None),
+  TT_XOR:(3, ASTXor, None),
+  TT_EQUAL:(3, None, ASTEqual),
+  TT_NOT:(3, None, ASTNotequal),
+  TT_GREATER:(3, ASTGreater, ASTGreaterequal),
+  TT_LOWER:(3, ASTLower, ASTLowerequal)
+}
+UNARYOPERATORS:dict[str,type] = {TT_PLUS:ASTPlussign, TT_MINUS:ASTMinussign, TT_NOT:ASTNot}
+UNARYPOWER:int = 4
+PARENTHESISPOWER:int = 0
+SHAREDLIMIT:int = 1 << 16
+
 class Parser:
-  def __init__(self, tokens:list[Token]) -> None:
-    self.tokens = tokens
+  def __init__(self, tokens:list[Token], store:NodeStore = None) -> None:
+    self.tokens = iter(tokens)
     self.token = None
-    self.index = -1
-    self.nodes:list[ASTNode] = []
+    self.nodes:list[ASTNode] = [] if store is None else store.statements
+    self.shared:dict[tuple,ASTNode] = {}
+    constructors:dict[type,callable] = {nodeclass:nodeclass for nodeclass in NODECLASSES.values()} if store is None else store.constructors
+    self.constructors:dict[type,callable] = {nodeclass:self.hash_consed(nodeclass, constructor) if nodeclass.asttype in EXPRESSIONTYPES else constructor for nodeclass, constructor in constructors.items()}
+    self.binary:dict[str,tuple[int,callable,callable]] = {type:(power, self.constructors.get(single), self.constructors.get(compound)) for type, (power, single, compound) in BINARYOPERATORS.items()}
+    self.unary:dict[str,callable] = {type:self.constructors[operator] for type, operator in UNARYOPERATORS.items()}
+    self.statements:dict[str,callable] = {
+      "res":self.parse_reserve,
+      "const":self.parse_const,
+      "set":self.parse_set,
+      "exit":self.parse_exit,
+      "label":self.parse_label,
+      "jump":self.parse_jump
+    }
+    self.factors:dict[str,callable] = {
+      TT_INT:self.parse_int,
+      TT_ID:self.parse_varcall,
+      TT_ANP:self.parse_pointer
+    }
     self.next()
   
+  def hash_consed(self, nodeclass:type, constructor:callable) -> callable:
+    shared:dict[tuple,ASTNode] = self.shared
+    def construct(*fields) -> ASTNode:
+      key:tuple = (nodeclass, *fields)
+      node:ASTNode = shared.get(key)
+      if node is None:
+        node = shared[key] = constructor(*fields)
+      return node
+    return construct
+
   def next(self) -> None:
-    self.index += 1
-    self.token = self.tokens[self.index] if self.index < len(self.tokens) else None
+    self.token = next(self.tokens, None)
   
   def expect(self, type:str) -> None:
     self.next()
@@ -27,140 +73,98 @@ class Parser:
   
   def parse(self) -> list[ASTNode]:
     while not (self.token is None):
-      if self.token.type != TT_ID:
-        raise ValueError
-      if self.token.value == "res":
-        self.nodes.append(self.parse_reserve())
-      elif self.token.value == "const":
-        self.nodes.append(self.parse_const())
-      elif self.token.value == "set":
-        self.nodes.append(self.parse_set())
-      elif self.token.value == "exit":
-        self.nodes.append(self.parse_exit())
-      elif self.token.value == "label":
-        self.nodes.append(self.parse_label())
-      elif self.token.value == "jump":
-        self.nodes.append(self.parse_jump())
-      else:
-        raise ValueError
+      self.nodes.append(self.parse_statement())
+    self.shared.clear()
     return self.nodes
-  
-  def parse_expr(self) -> ASTAdd|ASTSubtract:
-    result = self.parse_term()
-
-    while (not (self.token is None)) and (self.token.type in (TT_PLUS, TT_MINUS)):
-      if self.token.type == TT_PLUS:
-        self.next()
-        result = ASTAdd(result, self.parse_term())
-      elif self.token.type == TT_MINUS:
-        self.next()
-        result = ASTSubtract(result, self.parse_term())
-      else:
-        raise ValueError
-    return result
 
-  def parse_term(self) -> ASTMultiply|ASTDivide|ASTModulus:
-    result = self.parse_bitwise()
+  def stream(self) -> GeneratorType:
+    while not (self.token is None):
+      yield self.parse_statement()
+      if len(self.shared) > SHAREDLIMIT:
+        self.shared.clear()
+    self.shared.clear()
 
-    while (not (self.token is None)) and (self.token.type in (TT_MULTIPLY, TT_DIVIDE, TT_MODULUS)):
-      if self.token.type == TT_MULTIPLY:
-        self.next()
-        result = ASTMultiply(result, self.parse_bitwise())
-      elif self.token.type == TT_DIVIDE:
-        self.next()
-        result = ASTDivide(result, self.parse_bitwise())
-      elif self.token.type == TT_MODULUS:
+  def parse_statement(self) -> ASTNode:
+    if self.token.type != TT_ID:
+      raise ValueError
+    handler:callable = self.statements.get(self.token.value)
+    if handler is None:
+      raise ValueError
+    return handler()
+  
+  def parse_expr(self) -> ASTNode:
+    operands:list[ASTNode] = []
+    operators:list[tuple[int,callable]] = []
+    depth:int = 0
+    while True:
+      while self.token is not None and (self.token.type == TT_LPAREN or self.token.type in self.unary):
+        if self.token.type == TT_LPAREN:
+          operators.append((PARENTHESISPOWER, None))
+          depth += 1
+        else:
+          operators.append((UNARYPOWER, self.unary[self.token.type]))
         self.next()
-        result = ASTModulus(result, self.parse_bitwise())
-      else:
-        raise ValueError
-    
-    return result
+      operands.append(self.parse_factor())
 
-  def parse_bitwise(self) -> ASTAnd|ASTOr|ASTXor:
-    result = self.parse_factor()
-
-    while (not (self.token is None)) and (self.token.type in (TT_ANP, TT_OR, TT_XOR, TT_GREATER, TT_LOWER, TT_EQUAL, TT_NOT)):
-      if self.token.type == TT_ANP:
-        self.next()
-        result = ASTAnd(result, self.parse_factor())
-      elif self.token.type == TT_OR:
-        self.next()
-        result = ASTOr(result, self.parse_factor())
-      elif self.token.type == TT_XOR:
-        self.next()
-        result = ASTXor(result, self.parse_factor())
-      elif self.token.type == TT_EQUAL:
+      while self.token is not None and self.token.type == TT_RPAREN and depth:
+        while operators[-1][1] is not None:
+          self.reduce(operands, operators)
+        operators.pop()
+        depth -= 1
         self.next()
-        if self.token.type == TT_EQUAL:
-          self.next()
-          result = ASTEqual(result, self.parse_factor())
-        else:
+
+      if self.token is None or self.token.type not in self.binary:
+        if depth:
           raise ValueError
-      elif self.token.type == TT_GREATER:
-        self.next()
-        if self.token.type == TT_EQUAL:
-          self.next()
-          result = ASTGreaterequal(result, self.parse_factor())
-        else:
-          result = ASTGreater(result, self.parse_factor())
-      elif self.token.type == TT_LOWER:
-        self.next()
-        if self.token.type == TT_EQUAL:
-          self.next()
-          result = ASTLowerequal(result, self.parse_factor())
-        else:
-          result = ASTLower(result, self.parse_factor())
-      elif self.token.type == TT_NOT:
+        while operators:
+          self.reduce(operands, operators)
+        return operands[0]
+
+      power, single, compound = self.binary[self.token.type]
+      self.next()
+      if compound is not None and self.token is not None and self.token.type == TT_EQUAL:
         self.next()
-        if self.token.type == TT_EQUAL:
-          self.next()
-          result = ASTNotequal(result, self.parse_factor())
-        else:
-          raise ValueError
+        operator:callable = compound
+      elif single is not None:
+        operator:callable = single
       else:
         raise ValueError
-    
-    return result
+      while operators and operators[-1][0] >= power:
+        self.reduce(operands, operators)
+      operators.append((power, operator))
+
+  def reduce(self, operands:list[ASTNode], operators:list[tuple[int,callable]]) -> None:
+    power, operator = operators.pop()
+    if power == UNARYPOWER:
+      operands.append(operator(operands.pop()))
+    else:
+      b:ASTNode = operands.pop()
+      operands.append(operator(operands.pop(), b))
 
-  def parse_factor(self) -> ASTNum|ASTVarcall|ASTPointer|ASTPlussign|ASTMinussign|ASTNot:
+  def parse_factor(self) -> ASTNum|ASTVarcall|ASTPointer:
     if self.token is None:
       raise ValueError
-    elif self.token.type == TT_LPAREN:
-      self.next()
-      result = self.parse_expr()
-      if self.token.type != TT_RPAREN:
-        raise ValueError
-      self.next()
-      
-      return result
-    elif self.token.type == TT_INT:
-      result = ASTNum(self.token.value)
-      self.next()
-      return result
-    elif self.token.type == TT_ID:
-      result = ASTVarcall(self.token.value)
-      self.next()
-      return result
-    elif self.token.type == TT_ANP:
-      self.next()
-      result = ASTPointer(self.parse_factor())
-      return result
-    elif self.token.type == TT_PLUS:
-      self.next()
-      result = ASTPlussign(self.parse_factor())
-      return result
-    elif self.token.type == TT_MINUS:
-      self.next()
-      result = ASTMinussign(self.parse_factor())
-      return result
-    elif self.token.type == TT_NOT:
-      self.next()
-      result = ASTNot(self.parse_factor())
-      return result
-    else:
+    handler:callable = self.factors.get(self.token.type)
+    if handler is None:
       raise ValueError
-  
+    return handler()
+
+  def parse_int(self) -> ASTNum:
+    result = self.constructors[ASTNum](int(self.token.value))
+    self.next()
+    return result
+
+  def parse_varcall(self) -> ASTVarcall:
+    result = self.constructors[ASTVarcall](self.token.value)
+    self.next()
+    return result
+
+  def parse_pointer(self) -> ASTPointer:
+    self.expect(TT_ID)
+    result = self.constructors[ASTPointer](self.token.value)
+    self.next()
+    return result
+
   def parse_reserve(self) -> ASTReserve:
     self.expect(TT_ID)
     varsize = VARTYPEDICT[self.token.value]
@@ -172,7 +176,7 @@ class Parser:
     self.expect(TT_SEMI)
     self.next()
 
-    return ASTReserve(varname, varsize)
+    return self.constructors[ASTReserve](varname, varsize)
   
   def parse_const(self) -> ASTConst:
     self.expect(TT_ID)
@@ -186,13 +190,13 @@ class Parser:
     self.next()
 
     if self.token.type == TT_INT:
-      value = self.token.value
+      value = int(self.token.value)
     else:
       raise ValueError
     
     self.expect(TT_SEMI)
     self.next()
-    return ASTConst(varname, varsize, value)
+    return self.constructors[ASTConst](varname, varsize, value)
   
   def parse_set(self) -> ASTSet:
     self.expect(TT_ID)
@@ -203,14 +207,14 @@ class Parser:
     value = self.parse_expr()
     self.next()
 
-    return ASTSet(varname, value)
+    return self.constructors[ASTSet](varname, value)
 
   def parse_exit(self) -> ASTExit:
     self.next()
     value = self.parse_expr()
     self.next()
     
-    return ASTExit(value)
+    return self.constructors[ASTExit](value)
 
   def parse_label(self) -> ASTLabel:
     self.expect(TT_ID)
@@ -218,7 +222,7 @@ class Parser:
     self.expect(TT_SEMI)
     self.next()
 
-    return ASTLabel(name)
+    return self.constructors[ASTLabel](name)
   
   def parse_jump(self) -> ASTJump:
     self.next()
@@ -228,4 +232,4 @@ class Parser:
     value = self.parse_expr()
     self.next()
 
-    return ASTJump(name, value)
\ No newline at end of file
+    return self.constructors[ASTJump](name, value)
\ No newline at end of file
@@ -0,0 +1,222 @@
+import time
+from ir import *
+from folding import *
+from lowering import ASTOPERATIONS
+from loops import *
+
+IROPERATIONS:dict[str,str] = {operation:type for type, operation in ASTOPERATIONS.items()}
+
+def replace_operands(program:IRProgram, replacements:dict[VReg,Operand]) -> None:
+  if not replacements:
+    return
+  for instruction in program.instructions():
+    for index, arg in enumerate(instruction.args):
+      while arg in replacements:
+        arg = replacements[arg]
+      instruction.args[index] = arg
+
+def simplify_cfg(program:IRProgram) -> None:
+  blocks:dict[str,Block] = program.block_map()
+  forward:dict[str,str] = {}
+  for block in program.blocks[1:]:
+    if len(block.instructions) == 1 and block.instructions[0].opcode == IR_JUMP and block.instructions[0].targets[0] != block.name:
+      forward[block.name] = block.instructions[0].targets[0]
+
+  def resolve(name:str) -> str:
+    seen:set[str] = set()
+    while name in forward and name not in seen:
+      seen.add(name)
+      name = forward[name]
+    return name
+
+  for block in program.blocks:
+    terminator:IRInstruction|None = block.terminator()
+    if terminator is None:
+      continue
+    terminator.targets = [resolve(target) for target in terminator.targets]
+    if terminator.opcode == IR_BRANCH and terminator.targets[0] == terminator.targets[1]:
+      block.instructions[-1] = IRInstruction(IR_JUMP, targets=terminator.targets[:1])
+
+  reachable:set[str] = set()
+  stack:list[str] = [program.blocks[0].name]
+  while stack:
+    name:str = stack.pop()
+    if name not in reachable:
+      reachable.add(name)
+      stack.extend(blocks[name].successors())
+  program.blocks = [block for block in program.blocks if block.name in reachable]
+
+  predecessors:dict[str,list[str]] = program.predecessors()
+  merged:set[str] = set()
+  for block in program.blocks:
+    if block.name in merged:
+      continue
+    while True:
+      terminator:IRInstruction|None = block.terminator()
+      if terminator is None or terminator.opcode != IR_JUMP:
+        break
+      target:str = terminator.targets[0]
+      if target == block.name or target == program.blocks[0].name or len(predecessors[target]) != 1:
+        break
+      block.instructions[-1:] = blocks[target].instructions
+      merged.add(target)
+      for successor in blocks[target].successors():
+        predecessors[successor] = [block.name if name == target else name for name in predecessors[successor]]
+  program.blocks = [block for block in program.blocks if block.name not in merged]
+
+def eliminate_dead_code(program:IRProgram) -> None:
+  uses:dict[VReg,int] = {}
+  for instruction in program.instructions():
+    for arg in instruction.uses():
+      uses[arg] = uses.get(arg, 0) + 1
+
+  changed:bool = True
+  while changed:
+    changed = False
+    for block in program.blocks:
+      kept:list[IRInstruction] = []
+      for instruction in reversed(block.instructions):
+        if instruction.dest is not None and not instruction.has_side_effects() and uses.get(instruction.dest, 0) == 0:
+          for arg in instruction.uses():
+            uses[arg] -= 1
+          changed = True
+        else:
+          kept.append(instruction)
+      kept.reverse()
+      block.instructions = kept
+
+def forward_stores(program:IRProgram) -> None:
+  replacements:dict[VReg,Operand] = {}
+  for block in program.blocks:
+    known:dict[str,tuple[Operand,int]] = {}
+    instructions:list[IRInstruction] = []
+    for instruction in block.instructions:
+      for index, arg in enumerate(instruction.args):
+        while arg in replacements:
+          arg = replacements[arg]
+        instruction.args[index] = arg
+
+      if instruction.opcode == IR_STORE:
+        value:Operand = instruction.args[0]
+        if isinstance(value, int):
+          known[instruction.name] = (value & size_mask(instruction.size), 8)
+        else:
+          known[instruction.name] = (value, instruction.size)
+      elif instruction.opcode == IR_LOAD:
+        name:str = instruction.name
+        if name in known:
+          value, size = known[name]
+          if size == 8:
+            replacements[instruction.dest] = value
+            continue
+          instruction = IRInstruction(IR_AND, instruction.dest, [value, size_mask(size)])
+        known[name] = (instruction.dest, 8)
+      instructions.append(instruction)
+    block.instructions = instructions
+  replace_operands(program, replacements)
+
+def fold_constants(program:IRProgram) -> None:
+  replacements:dict[VReg,Operand] = {}
+  branches:bool = False
+  for block in program.blocks:
+    instructions:list[IRInstruction] = []
+    for instruction in block.instructions:
+      for index, arg in enumerate(instruction.args):
+        instruction.args[index] = replacements.get(arg, arg)
+
+      if instruction.opcode == IR_BRANCH and all(isinstance(arg, int) for arg in instruction.args):
+        taken:int = evaluate_binary(IROPERATIONS[instruction.condition], *instruction.args)
+        instruction = IRInstruction(IR_JUMP, targets=[instruction.targets[0 if taken else 1]])
+        branches = True
+      elif instruction.opcode in IROPERATIONS and all(isinstance(arg, int) for arg in instruction.args):
+        if instruction.opcode in UNARYOPS:
+          value:int|None = evaluate_unary(IROPERATIONS[instruction.opcode], instruction.args[0])
+        else:
+          value:int|None = evaluate_binary(IROPERATIONS[instruction.opcode], *instruction.args)
+        if value is not None:
+          replacements[instruction.dest] = value
+          continue
+      instructions.append(instruction)
+    block.instructions = instructions
+  replace_operands(program, replacements)
+  if branches:
+    simplify_cfg(program)
+
+def value_key(instruction:IRInstruction) -> tuple|None:
+  if instruction.opcode == IR_LOAD or instruction.opcode == IR_ADDR:
+    return (instruction.opcode, instruction.name)
+  if instruction.opcode not in IROPERATIONS:
+    return None
+  if instruction.opcode in COMMUTATIVEOPS:
+    return (instruction.opcode, *sorted(instruction.args, key=lambda arg: (isinstance(arg, VReg), arg.index if isinstance(arg, VReg) else arg)))
+  return (instruction.opcode, *instruction.args)
+
+def number_values(program:IRProgram) -> None:
+  replacements:dict[VReg,Operand] = {}
+  for block in program.blocks:
+    values:dict[tuple,VReg] = {}
+    instructions:list[IRInstruction] = []
+    for instruction in block.instructions:
+      for index, arg in enumerate(instruction.args):
+        instruction.args[index] = replacements.get(arg, arg)
+
+      if instruction.opcode == IR_STORE:
+        values.pop((IR_LOAD, instruction.name), None)
+      else:
+        key:tuple|None = value_key(instruction)
+        if key is not None:
+          if key in values:
+            replacements[instruction.dest] = values[key]
+            continue
+          values[key] = instruction.dest
+      instructions.append(instruction)
+    block.instructions = instructions
+  replace_operands(program, replacements)
+
+def eliminate_dead_stores(program:IRProgram) -> None:
+  for block in program.blocks:
+    pending:dict[str,int] = {}
+    dead:set[int] = set()
+    for index, instruction in enumerate(block.instructions):
+      if instruction.opcode == IR_STORE:
+        if instruction.name in pending:
+          dead.add(pending[instruction.name])
+        pending[instruction.name] = index
+      elif instruction.opcode == IR_LOAD:
+        pending.pop(instruction.name, None)
+    if dead:
+      block.instructions = [instruction for index, instruction in enumerate(block.instructions) if index not in dead]
+
+IRPASSES:list[tuple[str,int,callable]] = [
+  ("simplify-cfg", 1, simplify_cfg),
+  ("store-forwarding", 2, forward_stores),
+  ("constant-folding", 2, fold_constants),
+  ("value-numbering", 1, number_values),
+  ("dead-stores", 2, eliminate_dead_stores),
+  ("loops", 2, optimize_loops),
+  ("dead-code", 1, eliminate_dead_code)
+]
+
+class PassManager:
+  def __init__(self, level:int, passes:list[tuple[str,int,callable]] = None) -> None:
+    self.level:int = level
+    self.passes:list[tuple[str,int,callable]] = []
+    self.times:dict[str,float] = {}
+    for name, level, function in (IRPASSES if passes is None else passes):
+      self.register(name, level, function)
+
+  def register(self, name:str, level:int, function:callable) -> None:
+    self.passes.append((name, level, function))
+    self.times[name] = 0.0
+
+  def run(self, program:IRProgram) -> IRProgram:
+    for name, level, function in self.passes:
+      if level > self.level:
+        continue
+      start:float = time.perf_counter()
+      function(program)
+      self.times[name] += time.perf_counter() - start
+    return program
+
+  def report(self) -> str:
+    return "\n".join(f"{name}: {1000 * self.times[name]:.3f} ms" for name, level, function in self.passes if level <= self.level)
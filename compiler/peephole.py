@@ -0,0 +1,192 @@
+from x86 import *
+
+LOOKAHEAD:int = 12
+BACKTRACK:int = 2
+
+def register_dead(window:list[Instruction], index:int, register:str) -> bool:
+  for instruction in window[index:]:
+    if instruction.is_control():
+      return False
+    reads:set[str]|None = instruction.reads()
+    if reads is None or register in reads:
+      return False
+    writes:set[str]|None = instruction.writes()
+    if writes is None:
+      return False
+    if register in writes:
+      return True
+  return False
+
+def flags_dead(window:list[Instruction], index:int) -> bool:
+  for instruction in window[index:]:
+    if instruction.reads_flags() or instruction.is_control():
+      return False
+    if instruction.writes_flags():
+      return True
+  return False
+
+def rule_jump_next(window:list[Instruction], index:int) -> tuple[int,list[str]]|None:
+  first:Instruction = window[index]
+  if first.mnemonic == "jmp" and index + 1 < len(window) and window[index + 1].label == first.operands[0]:
+    return 1, []
+  return None
+
+def rule_compare_set(window:list[Instruction], index:int) -> tuple[int,list[str]]|None:
+  lines:list[Instruction] = window[index:index + 6]
+  if len(lines) < 6 or not lines[0].is_jump() or lines[0].mnemonic == "jmp":
+    return None
+  true:str = lines[0].operands[0]
+  if not true.startswith("cmptrue"):
+    return None
+  end:str = "cmpend" + true[7:]
+  register:str = lines[1].operands[0] if lines[1].operands else None
+  if register is None or lines[1].text != f"xor {register}, {register}" or lines[2].text != f"jmp {end}":
+    return None
+  if lines[3].label != true or lines[4].text != f"mov {register}, 1" or lines[5].label != end:
+    return None
+  base:str = REGISTERS[register][0]
+  low:str = REGISTERNAMES[base][1]
+  return 6, [f"set{lines[0].mnemonic[1:]} {low}", f"movzx {REGISTERNAMES[base][4]}, {low}"]
+
+def rule_zero_extend_load(window:list[Instruction], index:int) -> tuple[int,list[str]]|None:
+  first:Instruction = window[index]
+  if first.mnemonic != "xor" or len(first.operands) != 2 or first.operands[0] != first.operands[1] or index + 1 >= len(window):
+    return None
+  register:str = first.operands[0]
+  if not is_register(register) or REGISTERS[register][1] != 8:
+    return None
+  load:Instruction = window[index + 1]
+  if load.mnemonic != "mov" or not is_register(load.operands[0]) or not is_memory(load.operands[1]):
+    return None
+  base, size = REGISTERS[load.operands[0]]
+  if base != register or registers_in(load.operands[1:]) or not flags_dead(window, index + 2):
+    return None
+  if size >= 4:
+    return 2, [load.text]
+  return 2, [f"movzx {REGISTERNAMES[register][4]}, {load.operands[1]}"]
+
+def rule_store_reload(window:list[Instruction], index:int) -> tuple[int,list[str]]|None:
+  store:Instruction = window[index]
+  if store.mnemonic != "mov" or index + 1 >= len(window) or not is_memory(store.operands[0]) or not is_register(store.operands[1]):
+    return None
+  load:Instruction = window[index + 1]
+  if load.mnemonic not in ("mov", "movzx") or not is_register(load.operands[0]) or len(load.operands) != 2 or registers_in(store.operands[:1]):
+    return None
+  source, size = REGISTERS[store.operands[1]]
+  target, targetsize = REGISTERS[load.operands[0]]
+  if load.mnemonic == "mov" and size == 8 and targetsize == 4 and load.operands[1] == "dword " + store.operands[0].split(" ", 1)[1]:
+    return 2, [store.text, f"mov {REGISTERNAMES[target][4]}, {REGISTERNAMES[source][4]}"]
+  if load.operands[1] != store.operands[0]:
+    return None
+  if targetsize < 4 or (load.mnemonic == "mov" and targetsize != size):
+    return None
+  if size == 8:
+    return 2, [store.text] if source == target else [store.text, f"mov {target}, {source}"]
+  if size == 4:
+    return 2, [store.text, f"mov {REGISTERNAMES[target][4]}, {REGISTERNAMES[source][4]}"]
+  return 2, [store.text, f"movzx {REGISTERNAMES[target][4]}, {store.operands[1]}"]
+
+def rule_immediate_operand(window:list[Instruction], index:int) -> tuple[int,list[str]]|None:
+  first:Instruction = window[index]
+  if first.mnemonic != "mov" or index + 1 >= len(window) or not is_register(first.operands[0]) or not is_immediate(first.operands[1]):
+    return None
+  register:str = first.operands[0]
+  if REGISTERS[register][1] != 8:
+    return None
+  value:int = immediate_value(first.operands[1])
+  use:Instruction = window[index + 1]
+  if use.mnemonic not in ("add", "sub", "and", "or", "xor", "cmp", "imul", "push") or not fits_imm32(value):
+    return None
+  if use.mnemonic == "push":
+    if use.operands[0] != register or not register_dead(window, index + 2, register):
+      return None
+    return 2, [f"push {imm32(value)}"]
+  if len(use.operands) != 2 or use.operands[1] != register or use.operands[0] == register or not is_register(use.operands[0]):
+    return None
+  if not register_dead(window, index + 2, register):
+    return None
+  if use.mnemonic == "imul":
+    return 2, [f"imul {use.operands[0]}, {use.operands[0]}, {imm32(value)}"]
+  return 2, [f"{use.mnemonic} {use.operands[0]}, {imm32(value)}"]
+
+def rule_push_pop(window:list[Instruction], index:int) -> tuple[int,list[str]]|None:
+  first:Instruction = window[index]
+  if first.mnemonic != "push" or index + 1 >= len(window) or window[index + 1].mnemonic != "pop":
+    return None
+  source:str = first.operands[0]
+  target:str = window[index + 1].operands[0]
+  if source == target:
+    return 2, []
+  if is_memory(source) and is_memory(target):
+    return None
+  return 2, [f"mov {target}, {source}"]
+
+def rule_self_move(window:list[Instruction], index:int) -> tuple[int,list[str]]|None:
+  first:Instruction = window[index]
+  if first.mnemonic == "mov" and len(first.operands) == 2 and first.operands[0] == first.operands[1] and REGISTERS.get(first.operands[0], (None, 0))[1] == 8:
+    return 1, []
+  return None
+
+def rule_zero_register(window:list[Instruction], index:int) -> tuple[int,list[str]]|None:
+  first:Instruction = window[index]
+  if first.mnemonic != "mov" or first.operands[1:] != ["0"] or not is_register(first.operands[0]) or REGISTERS[first.operands[0]][1] < 4:
+    return None
+  if not flags_dead(window, index + 1):
+    return None
+  register:str = REGISTERNAMES[REGISTERS[first.operands[0]][0]][4]
+  return 1, [f"xor {register}, {register}"]
+
+CONDITIONALJUMPS:tuple[str, ...] = tuple(f"j{condition}" for condition in CONDITIONS)
+
+PEEPHOLERULES:list[tuple[str,tuple[str, ...],callable]] = [
+  ("jump-next", ("jmp",), rule_jump_next),
+  ("compare-set", CONDITIONALJUMPS, rule_compare_set),
+  ("zero-extend-load", ("xor",), rule_zero_extend_load),
+  ("store-reload", ("mov",), rule_store_reload),
+  ("immediate-operand", ("mov",), rule_immediate_operand),
+  ("push-pop", ("push",), rule_push_pop),
+  ("self-move", ("mov",), rule_self_move),
+  ("zero-register", ("mov",), rule_zero_register)
+]
+
+class Peephole:
+  def __init__(self, rules:list[tuple[str,tuple[str, ...],callable]] = None) -> None:
+    self.rules:dict[str,list[tuple[str,callable]]] = {}
+    self.hits:dict[str,int] = {}
+    for name, mnemonics, rule in (PEEPHOLERULES if rules is None else rules):
+      self.register(name, mnemonics, rule)
+
+  def register(self, name:str, mnemonics:tuple[str, ...], rule:callable) -> None:
+    for mnemonic in mnemonics:
+      self.rules.setdefault(mnemonic, []).append((name, rule))
+    self.hits[name] = 0
+
+  def optimize(self, lines):
+    window:list[Instruction] = []
+    index:int = 0
+    for line in lines:
+      window.append(Instruction(line))
+      while len(window) - index > LOOKAHEAD:
+        index = self.step(window, index)
+        if index > LOOKAHEAD:
+          for instruction in window[:index - BACKTRACK]:
+            yield instruction.text + "\n"
+          del window[:index - BACKTRACK]
+          index = BACKTRACK
+    while index < len(window):
+      index = self.step(window, index)
+    for instruction in window:
+      yield instruction.text + "\n"
+
+  def step(self, window:list[Instruction], index:int) -> int:
+    for name, rule in self.rules.get(window[index].mnemonic, ()):
+      match:tuple[int,list[str]]|None = rule(window, index)
+      if match is not None:
+        count, replacement = match
+        window[index:index + count] = [Instruction(text) for text in replacement]
+        self.hits[name] += 1
+        return max(0, index - BACKTRACK)
+    return index + 1
+
+  def report(self) -> str:
+    return "\n".join(f"{name}: {hits}" for name, hits in self.hits.items())
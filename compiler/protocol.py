@@ -0,0 +1,46 @@
+import json
+import os
+import socket
+import struct
+
+SOCKETPATH:str = os.environ.get("PCOMPILER_SOCKET", f"/tmp/pcompiler-{os.getuid()}.sock")
+HEADER:struct.Struct = struct.Struct(">Q")
+RECEIVECHUNK:int = 1 << 20
+
+def encode_message(message:dict) -> bytes:
+  data:bytes = json.dumps(message).encode()
+  return HEADER.pack(len(data)) + data
+
+def decode_message(data:bytes) -> dict:
+  message = json.loads(data)
+  if not isinstance(message, dict):
+    raise ValueError
+  return message
+
+def receive_exactly(connection:socket.socket, size:int) -> bytes:
+  chunks:list[bytes] = []
+  while size:
+    chunk:bytes = connection.recv(min(size, RECEIVECHUNK))
+    if not chunk:
+      raise ConnectionError
+    chunks.append(chunk)
+    size -= len(chunk)
+  return b"".join(chunks)
+
+def receive_message(connection:socket.socket) -> dict:
+  size, = HEADER.unpack(receive_exactly(connection, HEADER.size))
+  return decode_message(receive_exactly(connection, size))
+
+def request(message:dict, path:str = SOCKETPATH) -> dict:
+  with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+    connection.connect(path)
+    connection.sendall(encode_message(message))
+    return receive_message(connection)
+
+def listening(path:str) -> bool:
+  with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+    try:
+      connection.connect(path)
+    except OSError:
+      return False
+  return True
@@ -0,0 +1,170 @@
+import bisect
+from ir import *
+
+ALLOCATABLEREGISTERS:tuple[str, ...] = ("rbx", "rcx", "rsi", "rdi", "r8", "r9", "r10", "r11", "r12", "r13", "r14", "r15")
+
+class Interval:
+  __slots__ = ("vreg", "start", "end", "location")
+  def __init__(self, vreg:VReg, position:int) -> None:
+    self.vreg:VReg = vreg
+    self.start:int = position
+    self.end:int = position
+    self.location:str = None
+
+  def extend(self, position:int) -> None:
+    if position < self.start:
+      self.start = position
+    if position > self.end:
+      self.end = position
+
+  def __repr__(self) -> str:
+    return f"({self.vreg}, {self.start}, {self.end}, {self.location})"
+
+def register_accesses(instruction:IRInstruction) -> tuple[list[VReg],list[VReg]]:
+  return instruction.uses(), [] if instruction.dest is None else [instruction.dest]
+
+def variable_accesses(instruction:IRInstruction) -> tuple[list[str],list[str]]:
+  if instruction.opcode == IR_LOAD:
+    return [instruction.name], []
+  if instruction.opcode == IR_STORE:
+    return [], [instruction.name]
+  return [], []
+
+def liveness(program:IRProgram, accesses:callable = register_accesses) -> tuple[dict[str,set],dict[str,set]]:
+  uses:dict[str,set] = {}
+  defs:dict[str,set] = {}
+  for block in program.blocks:
+    used:set = set()
+    defined:set = set()
+    for instruction in block.instructions:
+      reads, writes = accesses(instruction)
+      for arg in reads:
+        if arg not in defined:
+          used.add(arg)
+      defined.update(writes)
+    uses[block.name] = used
+    defs[block.name] = defined
+
+  livein:dict[str,set] = {block.name:set() for block in program.blocks}
+  liveout:dict[str,set] = {block.name:set() for block in program.blocks}
+  changed:bool = True
+  while changed:
+    changed = False
+    for block in reversed(program.blocks):
+      out:set = set()
+      for successor in block.successors():
+        out |= livein[successor]
+      inside:set = uses[block.name] | (out - defs[block.name])
+      if out != liveout[block.name] or inside != livein[block.name]:
+        liveout[block.name] = out
+        livein[block.name] = inside
+        changed = True
+  return livein, liveout
+
+def variable_interference(program:IRProgram) -> tuple[set[str],dict[str,set[str]]]:
+  livein, liveout = liveness(program, variable_accesses)
+  interference:dict[str,set[str]] = {}
+  for block in program.blocks:
+    live:set[str] = set(liveout[block.name])
+    for instruction in reversed(block.instructions):
+      reads, writes = variable_accesses(instruction)
+      for name in writes:
+        live.discard(name)
+        for other in live:
+          interference.setdefault(name, set()).add(other)
+          interference.setdefault(other, set()).add(name)
+      live.update(reads)
+  return (livein[program.blocks[0].name] if program.blocks else set()), interference
+
+class LinearScan:
+  def __init__(self, program:IRProgram, registers:tuple[str, ...] = ALLOCATABLEREGISTERS, homes:dict[str,str] = {}) -> None:
+    self.program:IRProgram = program
+    self.homes:dict[str,str] = homes
+    self.registers:tuple[str, ...] = tuple(register for register in registers if register not in homes.values())
+    self.intervals:dict[VReg,Interval] = {}
+    self.loads:dict[VReg,IRInstruction] = {}
+    self.stores:dict[str,list[int]] = {}
+    self.spills:int = 0
+
+  def build_intervals(self) -> list[Interval]:
+    livein, liveout = liveness(self.program)
+    defined:set[VReg] = set()
+    multiple:set[VReg] = set()
+    position:int = 0
+    for block in self.program.blocks:
+      start:int = position
+      for instruction in block.instructions:
+        for arg in instruction.uses():
+          self.touch(arg, position)
+        if instruction.dest is not None:
+          self.touch(instruction.dest, position)
+          if instruction.dest in defined:
+            multiple.add(instruction.dest)
+          defined.add(instruction.dest)
+        if instruction.opcode == IR_LOAD and (instruction.size == 8 or instruction.name in self.homes):
+          self.loads[instruction.dest] = instruction
+        elif instruction.opcode == IR_STORE:
+          self.stores.setdefault(instruction.name, []).append(position)
+        position += 1
+      for vreg in livein[block.name]:
+        self.touch(vreg, start)
+      for vreg in liveout[block.name]:
+        self.touch(vreg, position)
+    for vreg in multiple:
+      self.loads.pop(vreg, None)
+    return sorted(self.intervals.values(), key=lambda interval: interval.start)
+
+  def touch(self, vreg:VReg, position:int) -> None:
+    interval:Interval = self.intervals.get(vreg)
+    if interval is None:
+      self.intervals[vreg] = Interval(vreg, position)
+    else:
+      interval.extend(position)
+
+  def allocate(self) -> dict[VReg,str]:
+    free:list[str] = list(reversed(self.registers))
+    active:list[Interval] = []
+    for interval in self.build_intervals():
+      while active and active[0].end <= interval.start:
+        free.append(active.pop(0).location)
+
+      location:str|None = self.reload_location(interval)
+      if location in self.homes.values():
+        interval.location = location
+        continue
+      if free:
+        interval.location = free.pop()
+      else:
+        last:Interval = active[-1]
+        if last.end > interval.end:
+          interval.location = last.location
+          last.location = self.spill_location(last)
+          active.pop()
+        else:
+          interval.location = self.spill_location(interval)
+          continue
+      index:int = 0
+      while index < len(active) and active[index].end <= interval.end:
+        index += 1
+      active.insert(index, interval)
+    return {vreg:interval.location for vreg, interval in self.intervals.items()}
+
+  def spill_location(self, interval:Interval) -> str:
+    location:str|None = self.reload_location(interval)
+    if location is not None:
+      return location
+    return self.spill_slot()
+
+  def reload_location(self, interval:Interval) -> str|None:
+    load:IRInstruction = self.loads.get(interval.vreg)
+    if load is not None:
+      stores:list[int] = self.stores.get(load.name, [])
+      index:int = bisect.bisect_right(stores, interval.start)
+      if index == len(stores) or stores[index] > interval.end:
+        return self.homes.get(load.name, load.name)
+    return None
+
+  def spill_slot(self) -> str:
+    name:str = f"_spill{self.spills}"
+    self.spills += 1
+    return name
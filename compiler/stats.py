@@ -0,0 +1,110 @@
+from astt import *
+from nodestore import *
+from symbols import *
+from assembler import *
+import contextlib
+import json
+import time
+import tracemalloc
+
+DECLARATIONTYPES:set[str] = {ASTT_RESERVE, ASTT_CONST, ASTT_LABEL}
+
+class PhaseStats:
+  def __init__(self, name:str, wall:float, cpu:float, peak:int|None) -> None:
+    self.name:str = name
+    self.wall:float = wall
+    self.cpu:float = cpu
+    self.peak:int|None = peak
+
+class CompileStats:
+  def __init__(self, memory:bool = True) -> None:
+    self.memory:bool = memory
+    self.phases:list[PhaseStats] = []
+    self.tokens:int = 0
+    self.nodes:dict[str,int] = {}
+    self.symbols:int = 0
+    self.sections:dict[str,tuple[int,int]] = {}
+
+  @contextlib.contextmanager
+  def phase(self, name:str):
+    if self.memory:
+      if not tracemalloc.is_tracing():
+        tracemalloc.start()
+      tracemalloc.reset_peak()
+    wall:float = time.perf_counter()
+    cpu:float = time.process_time()
+    try:
+      yield
+    finally:
+      wall = time.perf_counter() - wall
+      cpu = time.process_time() - cpu
+      self.phases.append(PhaseStats(name, wall, cpu, tracemalloc.get_traced_memory()[1] if self.memory else None))
+
+  def stop(self) -> None:
+    if self.memory and tracemalloc.is_tracing():
+      tracemalloc.stop()
+
+  def count_tokens(self, tokens:list) -> None:
+    self.tokens = len(tokens)
+
+  def count_nodes(self, nodes:list[ASTNode]|NodeStore) -> None:
+    counts:dict[str,int] = {}
+    if isinstance(nodes, NodeStore):
+      for code in nodes.opcodes:
+        counts[NODETYPES[code]] = counts.get(NODETYPES[code], 0) + 1
+    else:
+      stack:list[ASTNode] = list(nodes)
+      seen:set[int] = set()
+      while stack:
+        node:ASTNode = stack.pop()
+        if id(node) in seen:
+          continue
+        seen.add(id(node))
+        counts[node.asttype] = counts.get(node.asttype, 0) + 1
+        for field in ("value", "a", "b"):
+          child = getattr(node, field, None)
+          if isinstance(child, ASTNode):
+            stack.append(child)
+    self.nodes = dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+
+  def count_symbols(self, nodes:list[ASTNode]|NodeStore) -> None:
+    self.symbols = sum(1 for node in nodes if node.asttype in DECLARATIONTYPES)
+
+  def count_scope(self, scope:Scope) -> None:
+    self.symbols = len(scope) - len(KEYWORDS)
+
+  def count_sections(self, lines) -> None:
+    self.sections = section_statistics(lines)
+
+  def as_dict(self) -> dict:
+    return {
+      "phases":[{"name":phase.name, "wall":phase.wall, "cpu":phase.cpu, "peak":phase.peak} for phase in self.phases],
+      "tokens":self.tokens,
+      "nodes":self.nodes,
+      "symbols":self.symbols,
+      "sections":{section:{"instructions":instructions, "bytes":size} for section, (instructions, size) in self.sections.items()}
+    }
+
+  def to_json(self) -> str:
+    return json.dumps(self.as_dict(), indent=2)
+
+  def report(self) -> str:
+    lines:list[str] = []
+    for phase in self.phases:
+      line:str = f"{phase.name}: {1000 * phase.wall:.3f} ms wall, {1000 * phase.cpu:.3f} ms cpu"
+      if phase.peak is not None:
+        line += f", {phase.peak / 1e6:.3f} MB peak"
+      lines.append(line)
+    lines.append(f"total: {1000 * sum(phase.wall for phase in self.phases):.3f} ms wall, {1000 * sum(phase.cpu for phase in self.phases):.3f} ms cpu")
+    lines.append(f"tokens: {self.tokens}")
+    if self.nodes:
+      lines.append(f"nodes: {sum(self.nodes.values())}" + "".join(f", {asttype} {count}" for asttype, count in self.nodes.items()))
+    lines.append(f"symbols: {self.symbols}")
+    for section, (instructions, size) in self.sections.items():
+      lines.append(f"{section}: {instructions} instructions, {size} bytes")
+    return "\n".join(lines)
+
+def phase(stats:CompileStats|None, name:str):
+  if stats is None:
+    return contextlib.nullcontext()
+  return stats.phase(name)
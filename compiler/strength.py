@@ -0,0 +1,88 @@
+from x86 import *
+
+MASK64:int = (1 << 64) - 1
+
+LEAFACTORS:tuple[int, ...] = (3, 5, 9)
+
+def is_power_of_two(value:int) -> bool:
+  return value > 0 and value & (value - 1) == 0
+
+def multiply_plan(value:int) -> list[tuple[str,int]]|None:
+  value &= MASK64
+  if value == 0:
+    return [("zero", 0)]
+  negated:int = -value & MASK64
+  if negated < value:
+    plan:list[tuple[str,int]]|None = multiply_plan(negated)
+    if plan is None or len(plan) > 1:
+      return None
+    return plan + [("neg", 0)]
+
+  shift:int = (value & -value).bit_length() - 1
+  odd:int = value >> shift
+  plan:list[tuple[str,int]] = []
+  if odd in LEAFACTORS:
+    plan.append(("lea", odd))
+  elif odd != 1:
+    for factor in LEAFACTORS:
+      if odd % factor == 0 and odd // factor in LEAFACTORS:
+        plan += [("lea", factor), ("lea", odd // factor)]
+        break
+    else:
+      return None
+  if shift:
+    plan.append(("shl", shift))
+  if len(plan) > 2:
+    return None
+  return plan
+
+def multiply_lines(register:str, plan:list[tuple[str,int]]) -> list[str]:
+  lines:list[str] = []
+  for operation, operand in plan:
+    if operation == "zero":
+      lines.append(f"xor {REGISTERNAMES[register][4]}, {REGISTERNAMES[register][4]}")
+    elif operation == "lea":
+      lines.append(f"lea {register}, [{register}+{register}*{operand - 1}]")
+    elif operation == "shl":
+      lines.append(f"shl {register}, {operand}")
+    elif operation == "neg":
+      lines.append(f"neg {register}")
+  return lines
+
+def mask_lines(register:str, bits:int) -> list[str]:
+  if bits == 0:
+    return [f"xor {REGISTERNAMES[register][4]}, {REGISTERNAMES[register][4]}"]
+  if bits < 32:
+    return [f"and {register}, {(1 << bits) - 1}"]
+  if bits == 32:
+    return [f"mov {REGISTERNAMES[register][4]}, {REGISTERNAMES[register][4]}"]
+  if bits < 64:
+    return [f"shl {register}, {64 - bits}", f"shr {register}, {64 - bits}"]
+  return []
+
+def find_magic(divisor:int, bits:int) -> tuple[int,int]|None:
+  for shift in range(65):
+    multiplier:int = -(-(1 << (64 + shift)) // divisor)
+    if multiplier > MASK64:
+      return None
+    error:int = multiplier * divisor - (1 << (64 + shift))
+    if error * ((1 << bits) - 1) < 1 << (64 + shift):
+      return multiplier, shift
+  return None
+
+def division_magic(divisor:int, bits:int = 64) -> tuple[int,int,int,bool]:
+  if divisor <= 1 or is_power_of_two(divisor) or divisor > MASK64:
+    raise ValueError
+
+  magic:tuple[int,int]|None = find_magic(divisor, bits)
+  if magic is not None:
+    return 0, magic[0], magic[1], False
+
+  preshift:int = (divisor & -divisor).bit_length() - 1
+  if preshift:
+    magic = find_magic(divisor >> preshift, bits - preshift)
+    if magic is not None:
+      return preshift, magic[0], magic[1], False
+
+  shift:int = (divisor - 1).bit_length()
+  return 0, -(-(1 << (64 + shift)) // divisor) - (1 << 64), shift, True
@@ -0,0 +1,53 @@
+SYMK_KEYWORD = "keyword"
+SYMK_RESERVE = "reserve"
+SYMK_CONST = "const"
+SYMK_LABEL = "label"
+
+STORAGE_BSS = "bss"
+STORAGE_DATA = "data"
+STORAGE_TEXT = "text"
+
+KEYWORDS:tuple[str, ...] = ("_start", "res", "set", "const", "label", "jump", "exit")
+
+class Symbol:
+  def __init__(self, name:str, kind:str, size:int = 0, storage:str = None) -> None:
+    self.name:str = name
+    self.kind:str = kind
+    self.size:int = size
+    self.storage:str = storage
+
+  def __repr__(self) -> str:
+    return f"({self.kind}, {self.name}, {self.size}, {self.storage})"
+
+class Scope:
+  def __init__(self) -> None:
+    self.symbols:dict[str,Symbol] = {name:Symbol(name, SYMK_KEYWORD) for name in KEYWORDS}
+
+  def __contains__(self, name:str) -> bool:
+    return name in self.symbols
+
+  def __len__(self) -> int:
+    return len(self.symbols)
+
+  def declare(self, name:str, kind:str, size:int = 0, storage:str = None) -> Symbol:
+    if name in self.symbols:
+      raise ValueError
+
+    symbol:Symbol = Symbol(name, kind, size, storage)
+    self.symbols[name] = symbol
+    return symbol
+
+  def lookup(self, name:str) -> Symbol:
+    symbol:Symbol = self.symbols.get(name)
+    if symbol is None:
+      raise ValueError
+    return symbol
+
+  def variable(self, name:str) -> Symbol:
+    symbol:Symbol = self.lookup(name)
+    if symbol.kind != SYMK_RESERVE and symbol.kind != SYMK_CONST:
+      raise ValueError
+    return symbol
+
+  def __repr__(self) -> str:
+    return f"{list(self.symbols.values())}"
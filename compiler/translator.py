@@ -1,5 +1,10 @@
 from lexer import *
 from parser import *
+from emitter import *
+from symbols import *
+from x86 import *
+from folding import size_mask
+from varalloc import *
 
 ASTExpr = ASTAdd|ASTSubtract|ASTMultiply|ASTDivide|ASTPlussign|ASTMinussign|ASTAnd|ASTOr|ASTXor|ASTNot|ASTNum|ASTVarcall|ASTPointer
 
@@ -10,243 +15,407 @@ SIZEATRIBUTES:dict[int,tuple[str, str]] = {
   8:("rax", "dq", "qword")
 }
 
-class Scope:
-  labels:list[str] = ["_start", "res", "set", "const", "label", "jump", "exit"]
-  reservedVarLabels:list[str] = []
-  reservedVars:dict[str,int] = {}
-  constLabels:list[str] = []
-  consts:dict[str,int] = {}
+SCRATCHREGISTERS:tuple[str, ...] = ("rax", "rbx", "rcx", "rsi", "rdi", "r8", "r9", "r10", "r11")
 
-  def __repr__(self) -> str:
-    return f"{self.labels}, {self.reservedVarLabels}, {self.reservedVars}, {self.constLabels}, {self.consts}"
+COMPARISONCONDITIONS:dict[str,str] = {
+  ASTT_EQUAL:"e",
+  ASTT_NOT_EQUAL:"ne",
+  ASTT_GREATER:"g",
+  ASTT_LOWER:"l",
+  ASTT_GREATER_EQUAL:"ge",
+  ASTT_LOWER_EQUAL:"le"
+}
+
+SWAPPEDCONDITIONS:dict[str,str] = {"e":"e", "ne":"ne", "g":"l", "l":"g", "ge":"le", "le":"ge"}
+
+UNSIGNEDCONDITIONS:dict[str,str] = {"e":"e", "ne":"ne", "g":"a", "l":"b", "ge":"ae", "le":"be"}
+
+MASK32:int = (1 << 32) - 1
 
 ###
 
 class Translator:
-  def __init__(self, nodes:list[ASTNode]) -> None:
+  def __init__(self, nodes:list[ASTNode], registerVariables:bool = False) -> None:
     self.nodes = nodes
+    self.registerVariables:bool = registerVariables
+    self.homes:dict[str,str] = {}
 
-    self.sectionData = "section .data\n"
-    self.sectionBss = "section .bss\n"
-    self.sectionText = "section .text\nglobal _start\n"
-    self.start = "_start:\n"
-    self.end = "mov rax, 60\nmov rdi, 0\nsyscall\n"
+    self.emitter:Emitter = Emitter()
+    self.sectionData:Section = self.emitter.section("section .data\n")
+    self.sectionBss:Section = self.emitter.section("section .bss\n")
+    self.sectionText:Section = self.emitter.section("section .text\nglobal _start\n")
+    self.start:Section = self.emitter.section("_start:\n")
+    self.end:Section = self.emitter.section("mov rax, 60\nmov rdi, 0\nsyscall\n")
 
     self.cmptime = 0
+    self.labelPrefix:str = ""
+    self.needs:dict[ASTNode,int] = {}
+    self.bits:dict[ASTNode,int] = {}
+    self.widths:dict[ASTNode,int] = {}
 
     self.scope:Scope = Scope()
 
+    self.statements:dict[str,callable] = {
+      ASTT_RESERVE:self.translate_reserve,
+      ASTT_SET:self.translate_set,
+      ASTT_EXIT:self.translate_exit,
+      ASTT_CONST:self.translate_const,
+      ASTT_LABEL:self.translate_label,
+      ASTT_JUMP:self.translate_jump
+    }
+    self.expressions:dict[str,callable] = {
+      ASTT_NUM:self.translate_num,
+      ASTT_VARCALL:self.translate_varcall,
+      ASTT_POINTER:self.translate_pointer,
+      ASTT_ADD:self.translate_add,
+      ASTT_SUBTRACT:self.translate_subtract,
+      ASTT_MULTIPLY:self.translate_multiply,
+      ASTT_DIVIDE:self.translate_divide,
+      ASTT_PLUSSIGN:self.translate_plussign,
+      ASTT_MINUSSIGN:self.translate_minussign,
+      ASTT_AND:self.translate_and,
+      ASTT_OR:self.translate_or,
+      ASTT_XOR:self.translate_xor,
+      ASTT_NOT:self.translate_not,
+      ASTT_MODULUS:self.translate_modulus,
+      ASTT_EQUAL:self.translate_equal,
+      ASTT_NOT_EQUAL:self.translate_not_equal,
+      ASTT_GREATER:self.translate_greater,
+      ASTT_LOWER:self.translate_lower,
+      ASTT_GREATER_EQUAL:self.translate_greaterequal,
+      ASTT_LOWER_EQUAL:self.translate_lowerequal
+    }
+
   def compile(self) -> str:
-    return f"{self.sectionData}\n{self.sectionBss}\n{self.sectionText}\n{self.start}\n{self.end}\n"
+    return self.emitter.getvalue()
   
   def translate(self) -> str:
-    for node in self.nodes:
-      if node.asttype == ASTT_RESERVE:
-        self.translate_reserve(node)
-      elif node.asttype == ASTT_SET:
-        self.translate_set(node)
-      elif node.asttype == ASTT_EXIT:
-        self.translate_exit(node)
-      elif node.asttype == ASTT_CONST:
-        self.translate_const(node)
-      elif node.asttype == ASTT_LABEL:
-        self.translate_label(node)
-      elif node.asttype == ASTT_JUMP:
-        self.translate_jump(node)
+    self.translate_nodes()
     return self.compile()
-  
-  def translate_num(self, node:ASTNum) -> None:
-    self.start += f"mov rax, {node.value}\n"
 
-  def translate_varcall(self, node:ASTVarcall) -> None:
-    if not node.name in self.scope.labels:
-      raise ValueError
-    
-    if node.name in self.scope.reservedVarLabels:
-      self.start += f"xor rax, rax\nmov {SIZEATRIBUTES[self.scope.reservedVars[node.name]][0]}, {SIZEATRIBUTES[self.scope.reservedVars[node.name]][2]} [{node.name}]\n"
-    elif node.name in self.scope.constLabels:
-      self.start += f"xor rax, rax\nmov {SIZEATRIBUTES[self.scope.consts[node.name]][0]}, {SIZEATRIBUTES[self.scope.consts[node.name]][2]} [{node.name}]\n"
-    else:
-      raise ValueError
+  def translate_to(self, file) -> None:
+    self.translate_nodes()
+    self.emitter.write(file)
+    self.emitter.close()
 
-  def translate_pointer(self, node:ASTPointer) -> None:
-    if not node.name in self.scope.labels:
-      raise ValueError
-    
-    if node.name in self.scope.reservedVarLabels or node.name in self.scope.constLabels:
-      self.start += f"mov rax, {node.name}\n"
+  def translate_nodes(self) -> None:
+    if self.registerVariables:
+      self.allocate_variables()
+    statements:dict[str,callable] = self.statements
+    for node in self.nodes:
+      handler:callable = statements.get(node.asttype)
+      if handler is None:
+        raise ValueError
+      handler(node)
+  
+  def allocate_variables(self) -> None:
+    allocator:VariableAllocator = VariableAllocator(self.nodes)
+    self.homes = allocator.allocate()
+    for register in allocator.zeroed_registers():
+      self.start.emit(f"xor {REGISTERNAMES[register][4]}, {REGISTERNAMES[register][4]}\n")
+
+  def translate_num(self, node:ASTNum, regs:tuple[str, ...]) -> None:
+    if self.widths[node] == 4:
+      self.start.emit(f"mov {REGISTERNAMES[regs[0]][4]}, {immediate_value(node.value) & MASK32}\n")
     else:
-      raise ValueError
-
-  def load_operands(self, node:ASTAdd|ASTSubtract|ASTMultiply|ASTDivide|ASTModulus|ASTAnd|ASTOr|ASTXor) -> None:
-    self.translate_expr(node.b)
-    self.start += "push rax\n"
-    self.translate_expr(node.a)
-    self.start += "pop rbx\n"
+      self.start.emit(f"mov {regs[0]}, {node.value}\n")
+
+  def translate_varcall(self, node:ASTVarcall, regs:tuple[str, ...]) -> None:
+    size:int = self.scope.variable(node.name).size
+    home:str|None = self.homes.get(node.name)
+    if home is not None:
+      width:int = 4 if size <= 4 or self.widths[node] == 4 else 8
+      self.start.emit(f"mov {REGISTERNAMES[regs[0]][width]}, {REGISTERNAMES[home][width]}\n")
+    elif size < 4:
+      self.start.emit(f"movzx {REGISTERNAMES[regs[0]][4]}, {SIZEATRIBUTES[size][2]} [{node.name}]\n")
+    elif size == 4 or self.widths[node] == 4:
+      self.start.emit(f"mov {REGISTERNAMES[regs[0]][4]}, dword [{node.name}]\n")
+    else:
+      self.start.emit(f"mov {regs[0]}, qword [{node.name}]\n")
+
+  def translate_pointer(self, node:ASTPointer, regs:tuple[str, ...]) -> None:
+    self.scope.variable(node.name)
+    self.start.emit(f"mov {regs[0]}, {node.name}\n")
+
+  def need(self, node:ASTExpr) -> int:
+    return self.needs[node]
+
+  def infer_widths(self, node:ASTExpr, demand:int) -> None:
+    bits:dict[ASTNode,int] = self.bits
+    widths:dict[ASTNode,int] = self.widths
+    bits.clear()
+    widths.clear()
+    value_bits(node, lambda name: self.scope.variable(name).size, bits)
+    stack:list[tuple[ASTExpr,int]] = [(node, demand)]
+    while stack:
+      node, demand = stack.pop()
+      width:int = 4 if demand <= 4 or bits[node] <= 32 else 8
+      if widths.get(node, 0) >= width:
+        continue
+      widths[node] = width
+      type:str = node.asttype
+      if type in UNARYTYPES:
+        stack.append((node.a, width))
+      elif type in BINARYTYPES:
+        child:int = width if type in WRAPPINGTYPES else 8
+        stack.append((node.b, child))
+        stack.append((node.a, child))
+
+  def sized(self, register:str, node:ASTExpr) -> str:
+    return REGISTERNAMES[register][self.widths[node]]
+
+  def direct_operand(self, node:ASTExpr, width:int) -> str|None:
+    if node.asttype == ASTT_NUM:
+      value:int = immediate_value(node.value)
+      if width == 4:
+        return str(value & MASK32)
+      return imm32(value) if fits_imm32(value) else None
+    if node.asttype == ASTT_VARCALL:
+      size:int = self.scope.variable(node.name).size
+      if node.name in self.homes:
+        return REGISTERNAMES[self.homes[node.name]][width]
+      if size == 8:
+        return f"{SIZEATRIBUTES[width][2]} [{node.name}]"
+      if size == 4 and width == 4:
+        return f"dword [{node.name}]"
+    return None
+
+  def translate_alu(self, node:ASTAdd|ASTSubtract|ASTMultiply|ASTAnd|ASTOr|ASTXor, regs:tuple[str, ...], mnemonic:str) -> GeneratorType:
+    width:int = self.widths[node]
+    a:ASTExpr = node.a
+    operand:str|None = self.direct_operand(node.b, width)
+    if operand is None and node.asttype != ASTT_SUBTRACT:
+      operand = self.direct_operand(a, width)
+      a = node.b
+    if operand is None:
+      yield from self.load_operands(node, regs)
+      self.start.emit(f"{mnemonic} {REGISTERNAMES[regs[0]][width]}, {REGISTERNAMES[regs[1]][width]}\n")
+      return
+    yield self.translate_expr(a, regs)
+    register:str = REGISTERNAMES[regs[0]][width]
+    if mnemonic == "imul" and is_immediate(operand):
+      self.start.emit(f"imul {register}, {register}, {operand}\n")
+    else:
+      self.start.emit(f"{mnemonic} {register}, {operand}\n")
+
+  def load_operands(self, node:ASTAdd|ASTSubtract|ASTMultiply|ASTDivide|ASTModulus|ASTAnd|ASTOr|ASTXor, regs:tuple[str, ...]) -> GeneratorType:
+    a:int = self.need(node.a)
+    b:int = self.need(node.b)
+
+    if a >= len(regs) and b >= len(regs):
+      yield self.translate_expr(node.b, regs)
+      self.start.emit(f"push {regs[0]}\n")
+      yield self.translate_expr(node.a, regs)
+      self.start.emit(f"pop {regs[1]}\n")
+    elif b > a:
+      yield self.translate_expr(node.b, (regs[1], regs[0]) + regs[2:])
+      yield self.translate_expr(node.a, (regs[0],) + regs[2:])
+    else:
+      yield self.translate_expr(node.a, regs)
+      yield self.translate_expr(node.b, regs[1:])
 
-  def translate_plussign(self, node:ASTPlussign) -> None:
-    self.translate_expr(node.a)
+  def translate_plussign(self, node:ASTPlussign, regs:tuple[str, ...]) -> GeneratorType:
+    yield self.translate_expr(node.a, regs)
 
-  def translate_minussign(self, node:ASTMinussign) -> None:
-    self.translate_expr(node.a)
-    self.start += "neg rax\n"
+  def translate_minussign(self, node:ASTMinussign, regs:tuple[str, ...]) -> GeneratorType:
+    yield self.translate_expr(node.a, regs)
+    self.start.emit(f"neg {self.sized(regs[0], node)}\n")
 
-  def translate_not(self, node:ASTNot) -> None:
-    self.translate_expr(node.a)
-    self.start += "not arx\n"
+  def translate_not(self, node:ASTNot, regs:tuple[str, ...]) -> GeneratorType:
+    yield self.translate_expr(node.a, regs)
+    self.start.emit(f"not {self.sized(regs[0], node)}\n")
 
-  def translate_add(self, node:ASTAdd) -> None:
-    self.load_operands(node)
-    self.start += "add rax, rbx\n"
+  def translate_add(self, node:ASTAdd, regs:tuple[str, ...]) -> GeneratorType:
+    return self.translate_alu(node, regs, "add")
   
-  def translate_subtract(self, node:ASTSubtract) -> None:
-    self.load_operands(node)
-    self.start += "sub rax, rbx\n"
-
-  def translate_multiply(self, node:ASTMultiply) -> None:
-    self.load_operands(node)
-    self.start += "mul rbx\n"
-
-  def translate_divide(self, node:ASTDivide) -> None:
-    self.load_operands(node)
-    self.start += "div rbx\n"
-
-  def translate_modulus(self, node:ASTModulus) -> None:
-    self.load_operands(node)
-    self.start += "xor rdx, rdx\ndiv rbx\nmov rax, rdx\n"
-
-  def translate_and(self, node:ASTAnd) -> None:
-    self.load_operands(node)
-    self.start += "and rax, rbx\n"
-
-  def translate_or(self, node:ASTOr) -> None:
-    self.load_operands(node)
-    self.start += "or rax, rbx\n"
-
-  def translate_xor(self, node:ASTXor) -> None:
-    self.load_operands(node)
-    self.start += "xor rax, rbx\n"
-
-  def translate_equal(self, node:ASTEqual) -> None:
-    self.load_operands(node)
-    self.start += f"cmp rax, rbx\nje cmptrue{self.cmptime}\nxor rax, rax\njmp cmpend{self.cmptime}\ncmptrue{self.cmptime}:\nmov rax, 1\ncmpend{self.cmptime}:\n"
+  def translate_subtract(self, node:ASTSubtract, regs:tuple[str, ...]) -> GeneratorType:
+    return self.translate_alu(node, regs, "sub")
+
+  def translate_multiply(self, node:ASTMultiply, regs:tuple[str, ...]) -> GeneratorType:
+    return self.translate_alu(node, regs, "imul")
+
+  def divide(self, node:ASTDivide|ASTModulus, regs:tuple[str, ...], result:str) -> None:
+    width:int = 4 if self.bits[node.a] <= 32 and self.bits[node.b] <= 32 else 8
+    if regs[0] == "rax":
+      self.start.emit(f"xor edx, edx\ndiv {REGISTERNAMES[regs[1]][width]}\n")
+      if result != "rax":
+        self.start.emit(f"mov rax, {result}\n")
+    elif regs[1] == "rax":
+      self.start.emit(f"xchg rax, {regs[0]}\nxor edx, edx\ndiv {REGISTERNAMES[regs[0]][width]}\nmov {regs[0]}, {result}\n")
+    elif "rax" in regs:
+      self.start.emit(f"mov rax, {regs[0]}\nxor edx, edx\ndiv {REGISTERNAMES[regs[1]][width]}\nmov {regs[0]}, {result}\n")
+    else:
+      self.start.emit(f"push rax\nmov rax, {regs[0]}\nxor edx, edx\ndiv {REGISTERNAMES[regs[1]][width]}\nmov {regs[0]}, {result}\npop rax\n")
+
+  def translate_divide(self, node:ASTDivide, regs:tuple[str, ...]) -> GeneratorType:
+    yield from self.load_operands(node, regs)
+    self.divide(node, regs, "rax")
+
+  def translate_modulus(self, node:ASTModulus, regs:tuple[str, ...]) -> GeneratorType:
+    yield from self.load_operands(node, regs)
+    self.divide(node, regs, "rdx")
+
+  def translate_and(self, node:ASTAnd, regs:tuple[str, ...]) -> GeneratorType:
+    return self.translate_alu(node, regs, "and")
+
+  def translate_or(self, node:ASTOr, regs:tuple[str, ...]) -> GeneratorType:
+    return self.translate_alu(node, regs, "or")
+
+  def translate_xor(self, node:ASTXor, regs:tuple[str, ...]) -> GeneratorType:
+    return self.translate_alu(node, regs, "xor")
+
+  def compare_operands(self, node:ASTEqual, regs:tuple[str, ...]) -> GeneratorType:
+    condition:str = COMPARISONCONDITIONS[node.asttype]
+    a:ASTExpr = node.a
+    b:ASTExpr = node.b
+    swapped:bool = False
+    if a.asttype == ASTT_NUM and b.asttype != ASTT_NUM:
+      a, b = b, a
+      swapped = True
+      condition = SWAPPEDCONDITIONS[condition]
+    width:int = 4 if self.bits[a] <= 32 and self.bits[b] <= 32 else 8
+
+    if b.asttype == ASTT_NUM and a.asttype == ASTT_VARCALL:
+      size:int = self.scope.variable(a.name).size
+      value:int = immediate_value(b.value)
+      home:str|None = self.homes.get(a.name)
+      if size < 8 and value >> (8 * size) == 0:
+        target:str = REGISTERNAMES[home][4] if home is not None else f"{SIZEATRIBUTES[size][2]} [{a.name}]"
+        self.start.emit(f"cmp {target}, {value}\n")
+        return UNSIGNEDCONDITIONS[condition]
+      if size == 8 and fits_imm32(value):
+        target:str = home if home is not None else f"qword [{a.name}]"
+        self.start.emit(f"cmp {target}, {imm32(value)}\n")
+        return condition
+    if width == 4:
+      condition = UNSIGNEDCONDITIONS[condition]
+    operand:str|None = self.direct_operand(b, width)
+    if operand is not None:
+      yield self.translate_expr(a, regs)
+      self.start.emit(f"cmp {REGISTERNAMES[regs[0]][width]}, {operand}\n")
+    elif not swapped:
+      yield from self.load_operands(node, regs)
+      self.start.emit(f"cmp {REGISTERNAMES[regs[0]][width]}, {REGISTERNAMES[regs[1]][width]}\n")
+    else:
+      yield from self.load_operands(node, (regs[1], regs[0]) + regs[2:])
+      self.start.emit(f"cmp {REGISTERNAMES[regs[0]][width]}, {REGISTERNAMES[regs[1]][width]}\n")
+    return condition
+
+  def compare(self, node:ASTEqual, regs:tuple[str, ...]) -> GeneratorType:
+    condition:str = yield from self.compare_operands(node, regs)
+    suffix:str = self.label_suffix()
+    register:str = REGISTERNAMES[regs[0]][4]
+    self.start.emit(f"j{condition} cmptrue{suffix}\nxor {register}, {register}\njmp cmpend{suffix}\ncmptrue{suffix}:\nmov {register}, 1\ncmpend{suffix}:\n")
+
+  def label_suffix(self) -> str:
+    suffix:str = f"{self.labelPrefix}{self.cmptime}"
     self.cmptime += 1
+    return suffix
+
+  def branch(self, node:ASTExpr, target:str, sense:bool) -> GeneratorType:
+    type:str = node.asttype
+    if type in COMPARISONTYPES:
+      condition:str = yield from self.compare_operands(node, SCRATCHREGISTERS)
+      self.start.emit(f"j{condition if sense else CONDITIONS[condition]} {target}\n")
+    elif (type == ASTT_AND or type == ASTT_OR) and is_condition(node):
+      if (type == ASTT_AND) == sense:
+        skip:str = f"cmpskip{self.label_suffix()}"
+        yield self.branch(node.a, skip, not sense)
+        yield self.branch(node.b, target, sense)
+        self.start.emit(f"{skip}:\n")
+      else:
+        yield self.branch(node.a, target, sense)
+        yield self.branch(node.b, target, sense)
+    elif type == ASTT_NUM:
+      if (immediate_value(node.value) == 1) == sense:
+        self.start.emit(f"jmp {target}\n")
+    else:
+      yield self.translate_expr(node, SCRATCHREGISTERS)
+      self.start.emit(f"cmp {'eax' if self.bits[node] <= 32 else 'rax'}, 1\nj{'e' if sense else 'ne'} {target}\n")
+
+  def translate_equal(self, node:ASTEqual, regs:tuple[str, ...]) -> GeneratorType:
+    return self.compare(node, regs)
   
-  def translate_not_equal(self, node:ASTEqual) -> None:
-    self.load_operands(node)
-    self.start += f"cmp rax, rbx\njne cmptrue{self.cmptime}\nxor rax, rax\njmp cmpend{self.cmptime}\ncmptrue{self.cmptime}:\nmov rax, 1\ncmpend{self.cmptime}:\n"
-    self.cmptime += 1
+  def translate_not_equal(self, node:ASTEqual, regs:tuple[str, ...]) -> GeneratorType:
+    return self.compare(node, regs)
   
-  def translate_greater(self, node:ASTEqual) -> None:
-    self.load_operands(node)
-    self.start += f"cmp rax, rbx\njg cmptrue{self.cmptime}\nxor rax, rax\njmp cmpend{self.cmptime}\ncmptrue{self.cmptime}:\nmov rax, 1\ncmpend{self.cmptime}:\n"
-    self.cmptime += 1
+  def translate_greater(self, node:ASTEqual, regs:tuple[str, ...]) -> GeneratorType:
+    return self.compare(node, regs)
   
-  def translate_lower(self, node:ASTEqual) -> None:
-    self.load_operands(node)
-    self.start += f"cmp rax, rbx\njl cmptrue{self.cmptime}\nxor rax, rax\njmp cmpend{self.cmptime}\ncmptrue{self.cmptime}:\nmov rax, 1\ncmpend{self.cmptime}:\n"
-    self.cmptime += 1
+  def translate_lower(self, node:ASTEqual, regs:tuple[str, ...]) -> GeneratorType:
+    return self.compare(node, regs)
   
-  def translate_greaterequal(self, node:ASTEqual) -> None:
-    self.load_operands(node)
-    self.start += f"cmp rax, rbx\njge cmptrue{self.cmptime}\nxor rax, rax\njmp cmpend{self.cmptime}\ncmptrue{self.cmptime}:\nmov rax, 1\ncmpend{self.cmptime}:\n"
-    self.cmptime += 1
+  def translate_greaterequal(self, node:ASTEqual, regs:tuple[str, ...]) -> GeneratorType:
+    return self.compare(node, regs)
   
-  def translate_lowerequal(self, node:ASTEqual) -> None:
-    self.load_operands(node)
-    self.start += f"cmp rax, rbx\njle cmptrue{self.cmptime}\nxor rax, rax\njmp cmpend{self.cmptime}\ncmptrue{self.cmptime}:\nmov rax, 1\ncmpend{self.cmptime}:\n"
-    self.cmptime += 1
-
-  def translate_expr(self, node:ASTExpr) -> None:
-    type = node.asttype
-    if type == ASTT_NUM:
-      self.translate_num(node)
-    elif type == ASTT_VARCALL:
-      self.translate_varcall(node)
-    elif type == ASTT_POINTER:
-      self.translate_pointer(node)
-    elif type == ASTT_ADD:
-      self.translate_add(node)
-    elif type == ASTT_SUBTRACT:
-      self.translate_subtract(node)
-    elif type == ASTT_MULTIPLY:
-      self.translate_multiply(node)
-    elif type == ASTT_DIVIDE:
-      self.translate_divide(node)
-    elif type == ASTT_PLUSSIGN:
-      self.translate_plussign(node)
-    elif type == ASTT_MINUSSIGN:
-      self.translate_minussign(node)
-    elif type == ASTT_AND:
-      self.translate_and(node)
-    elif type == ASTT_OR:
-      self.translate_or(node)
-    elif type == ASTT_XOR:
-      self.translate_xor(node)
-    elif type == ASTT_NOT:
-      self.translate_not(node)
-    elif type == ASTT_MODULUS:
-      self.translate_modulus(node)
-    elif type == ASTT_EQUAL:
-      self.translate_equal(node)
-    elif type == ASTT_NOT_EQUAL:
-      self.translate_not_equal(node)
-    elif type == ASTT_GREATER:
-      self.translate_greater(node)
-    elif type == ASTT_LOWER:
-      self.translate_lower(node)
-    elif type == ASTT_GREATER_EQUAL:
-      self.translate_greaterequal(node)
-    elif type == ASTT_LOWER_EQUAL:
-      self.translate_lowerequal(node)
-    else:
+  def translate_lowerequal(self, node:ASTEqual, regs:tuple[str, ...]) -> GeneratorType:
+    return self.compare(node, regs)
+
+  def translate_value(self, node:ASTExpr, demand:int = 8) -> None:
+    self.needs.clear()
+    register_needs(node, self.needs)
+    self.infer_widths(node, demand)
+    trampoline(self.translate_expr(node, SCRATCHREGISTERS))
+
+  def translate_expr(self, node:ASTExpr, regs:tuple[str, ...]) -> GeneratorType|None:
+    handler:callable = self.expressions.get(node.asttype)
+    if handler is None:
       raise ValueError
+    return handler(node, regs)
 
   def translate_reserve(self, node:ASTReserve) -> None:
-    if node.name in self.scope.labels:
-      raise ValueError
-    
-    self.scope.labels.append(node.name)
-    self.scope.reservedVarLabels.append(node.name)
-    self.scope.reservedVars[node.name] = node.size
+    self.scope.declare(node.name, SYMK_RESERVE, node.size, STORAGE_BSS)
 
-    self.sectionBss += f"{node.name}: resb {node.size}\n"
+    self.sectionBss.emit(f"{node.name}: resb {node.size}\n")
   
   def translate_set(self, node:ASTSet) -> None:
-    if not (node.name in self.scope.labels):
-      raise ValueError
-    
-    self.translate_expr(node.value)
-    
-    if node.name in self.scope.reservedVarLabels:
-      self.start += f"mov {SIZEATRIBUTES[self.scope.reservedVars[node.name]][2]} [{node.name}], {SIZEATRIBUTES[self.scope.reservedVars[node.name]][0]}\n"
-    else:
+    symbol:Symbol = self.scope.lookup(node.name)
+    if symbol.kind != SYMK_RESERVE:
       raise ValueError
+
+    home:str|None = self.homes.get(node.name)
+    if home is not None:
+      self.store_home(node, symbol.size, home)
+      return
+
+    if node.value.asttype == ASTT_NUM:
+      value:int = immediate_value(node.value.value) & size_mask(symbol.size)
+      if symbol.size < 8 or fits_imm32(value):
+        self.start.emit(f"mov {SIZEATRIBUTES[symbol.size][2]} [{node.name}], {imm32(value) if symbol.size == 8 else value}\n")
+        return
+
+    self.translate_value(node.value, symbol.size)
+    self.start.emit(f"mov {SIZEATRIBUTES[symbol.size][2]} [{node.name}], {SIZEATRIBUTES[symbol.size][0]}\n")
   
+  def store_home(self, node:ASTSet, size:int, home:str) -> None:
+    if node.value.asttype == ASTT_NUM:
+      value:int = immediate_value(node.value.value) & size_mask(size)
+      self.start.emit(f"mov {REGISTERNAMES[home][4] if value <= MASK32 else home}, {value}\n")
+      return
+
+    self.translate_value(node.value, size)
+    if size < 4:
+      self.start.emit(f"movzx {REGISTERNAMES[home][4]}, {SIZEATRIBUTES[size][0]}\n")
+    else:
+      self.start.emit(f"mov {REGISTERNAMES[home][size]}, {SIZEATRIBUTES[size][0]}\n")
+
   def translate_const(self, node:ASTConst) -> None:
-    if node.name in self.scope.labels:
-      raise ValueError
-    
-    self.scope.labels.append(node.name)
-    self.scope.constLabels.append(node.name)
-    self.scope.consts[node.name] = node.size
+    self.scope.declare(node.name, SYMK_CONST, node.size, STORAGE_DATA)
 
-    self.sectionData += f"{node.name}: {SIZEATRIBUTES[node.size][1]} {node.value}\n"
+    self.sectionData.emit(f"{node.name}: {SIZEATRIBUTES[node.size][1]} {node.value}\n")
   
   def translate_exit(self, node:ASTExit) -> None:
-    self.translate_expr(node.value)
+    self.translate_value(node.value)
 
-    self.start += f"mov rdi, rax\nmov rax, 60\nsyscall\n"
+    self.start.emit(f"mov rdi, rax\nmov rax, 60\nsyscall\n")
   
   def translate_label(self, node:ASTLabel):
-    if f"label_{node.name}" in self.scope.labels:
-      raise ValueError
-
-    self.scope.labels.append(f"label_{node.name}")
+    self.scope.declare(f"label_{node.name}", SYMK_LABEL, 0, STORAGE_TEXT)
 
-    self.start += f"label_{node.name}:\n"
+    self.start.emit(f"label_{node.name}:\n")
 
   def translate_jump(self, node:ASTJump):
-    self.translate_expr(node.value)
-
-    self.start += f"cmp rax, 1\nje label_{node.name}\n"
\ No newline at end of file
+    self.needs.clear()
+    register_needs(node.value, self.needs)
+    self.infer_widths(node.value, 8)
+    trampoline(self.branch(node.value, f"label_{node.name}", True))
\ No newline at end of file
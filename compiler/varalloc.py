@@ -0,0 +1,95 @@
+from astt import *
+from flow import *
+
+VARIABLEREGISTERS:tuple[str, ...] = ("r12", "r13", "r14", "r15", "rbp")
+CANDIDATESPERREGISTER:int = 4
+LOOPWEIGHT:int = 8
+LOOPDEPTHLIMIT:int = 4
+
+class VariableAllocator:
+  def __init__(self, nodes:list[ASTNode], registers:tuple[str, ...] = VARIABLEREGISTERS) -> None:
+    self.nodes = nodes
+    self.registers:tuple[str, ...] = registers
+    self.weights:dict[str,int] = {}
+    self.escaped:set[str] = set()
+    self.homes:dict[str,str] = {}
+    self.uninitialized:set[str] = set()
+
+  def allocate(self) -> dict[str,str]:
+    nodes:list[ASTNode] = self.nodes
+    reserves:set[str] = set()
+    labels:dict[str,int] = {}
+    for index, node in enumerate(nodes):
+      if node.asttype == ASTT_RESERVE:
+        reserves.add(node.name)
+      elif node.asttype == ASTT_LABEL:
+        labels[node.name] = index
+    for node in nodes:
+      if node.asttype == ASTT_JUMP and node.name not in labels:
+        return self.homes
+
+    self.count_uses(labels)
+    ranked:list[str] = sorted((name for name in self.weights if name in reserves and name not in self.escaped), key=lambda name: (-self.weights[name], name))
+    candidates:list[str] = ranked[:CANDIDATESPERREGISTER * len(self.registers)]
+    if not candidates:
+      return self.homes
+    variables:dict[str,int] = {name:1 << bit for bit, name in enumerate(candidates)}
+    graph:StatementGraph = StatementGraph(nodes, variables)
+    interference:list[int] = self.interference(graph, len(candidates))
+    entry:int = graph.livein[0] if graph.blocks else 0
+    self.uninitialized = {name for name, bit in variables.items() if entry & bit}
+
+    for bit, name in enumerate(candidates):
+      taken:set[str] = {self.homes[other] for index, other in enumerate(candidates[:bit]) if interference[bit] >> index & 1 and other in self.homes}
+      for register in self.registers:
+        if register not in taken:
+          self.homes[name] = register
+          break
+    return self.homes
+
+  def zeroed_registers(self) -> list[str]:
+    return [register for register in self.registers if any(self.homes.get(name) == register for name in self.uninitialized)]
+
+  def count_uses(self, labels:dict[str,int]) -> None:
+    nodes:list[ASTNode] = self.nodes
+    depths:list[int] = [0] * (len(nodes) + 1)
+    for index, node in enumerate(nodes):
+      if node.asttype == ASTT_JUMP and labels[node.name] <= index and jump_sense(node) is not False:
+        depths[labels[node.name]] += 1
+        depths[index + 1] -= 1
+    depth:int = 0
+    for index, node in enumerate(nodes):
+      depth += depths[index]
+      if node.asttype not in (ASTT_SET, ASTT_EXIT, ASTT_JUMP):
+        continue
+      names:set[str] = set()
+      expression_names(node.value, names, self.escaped)
+      if node.asttype == ASTT_SET:
+        names.add(node.name)
+      weight:int = LOOPWEIGHT ** min(depth, LOOPDEPTHLIMIT)
+      for name in names:
+        self.weights[name] = self.weights.get(name, 0) + weight
+
+  def interference(self, graph:StatementGraph, count:int) -> list[int]:
+    interference:list[int] = [0] * count
+    entry:int = graph.livein[0] if graph.blocks else 0
+    for bit in range(count):
+      if entry >> bit & 1:
+        interference[bit] |= entry & ~(1 << bit)
+    for block, (start, end) in enumerate(graph.blocks):
+      live:int = graph.liveout[block]
+      for index in reversed(range(start, end)):
+        node:ASTNode = graph.nodes[index]
+        if node.asttype == ASTT_SET and node.name in graph.variables:
+          bit:int = graph.variables[node.name]
+          defined:int = bit.bit_length() - 1
+          interference[defined] |= live & ~bit
+          live &= ~bit
+        live |= graph.uses[index]
+    for bit in range(count):
+      others:int = interference[bit]
+      while others:
+        lowest:int = others & -others
+        interference[lowest.bit_length() - 1] |= 1 << bit
+        others ^= lowest
+    return interference
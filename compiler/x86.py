@@ -0,0 +1,148 @@
+REGISTERNAMES:dict[str,dict[int,str]] = {
+  "rax":{1:"al", 2:"ax", 4:"eax", 8:"rax"},
+  "rbx":{1:"bl", 2:"bx", 4:"ebx", 8:"rbx"},
+  "rcx":{1:"cl", 2:"cx", 4:"ecx", 8:"rcx"},
+  "rdx":{1:"dl", 2:"dx", 4:"edx", 8:"rdx"},
+  "rsi":{1:"sil", 2:"si", 4:"esi", 8:"rsi"},
+  "rdi":{1:"dil", 2:"di", 4:"edi", 8:"rdi"},
+  "rbp":{1:"bpl", 2:"bp", 4:"ebp", 8:"rbp"},
+  "rsp":{1:"spl", 2:"sp", 4:"esp", 8:"rsp"},
+  "r8":{1:"r8b", 2:"r8w", 4:"r8d", 8:"r8"},
+  "r9":{1:"r9b", 2:"r9w", 4:"r9d", 8:"r9"},
+  "r10":{1:"r10b", 2:"r10w", 4:"r10d", 8:"r10"},
+  "r11":{1:"r11b", 2:"r11w", 4:"r11d", 8:"r11"},
+  "r12":{1:"r12b", 2:"r12w", 4:"r12d", 8:"r12"},
+  "r13":{1:"r13b", 2:"r13w", 4:"r13d", 8:"r13"},
+  "r14":{1:"r14b", 2:"r14w", 4:"r14d", 8:"r14"},
+  "r15":{1:"r15b", 2:"r15w", 4:"r15d", 8:"r15"}
+}
+
+REGISTERS:dict[str,tuple[str,int]] = {name:(base, size) for base, names in REGISTERNAMES.items() for size, name in names.items()}
+
+MEMORYSIZES:dict[str,int] = {"byte":1, "word":2, "dword":4, "qword":8}
+
+CONDITIONS:dict[str,str] = {"e":"ne", "ne":"e", "g":"le", "le":"g", "l":"ge", "ge":"l", "a":"be", "be":"a", "b":"ae", "ae":"b", "z":"nz", "nz":"z"}
+
+SYSCALLREADS:set[str] = {"rax", "rdi", "rsi", "rdx", "r10", "r8", "r9"}
+SYSCALLWRITES:set[str] = {"rax", "rcx", "r11"}
+
+FLAGWRITERS:set[str] = {"add", "sub", "and", "or", "xor", "cmp", "test", "neg", "imul", "mul", "div", "shl", "shr", "sar", "inc", "dec"}
+
+def is_register(operand:str) -> bool:
+  return operand in REGISTERS
+
+def is_immediate(operand:str) -> bool:
+  return operand.lstrip("-").isdigit()
+
+def is_memory(operand:str) -> bool:
+  return operand.endswith("]")
+
+def immediate_value(operand:str) -> int:
+  return int(operand) & ((1 << 64) - 1)
+
+def fits_imm32(value:int) -> bool:
+  return value < (1 << 31) or value >= (1 << 64) - (1 << 31)
+
+def imm32(value:int) -> str:
+  return str(value - (1 << 64) if value >= (1 << 63) else value)
+
+def memory_size(operand:str) -> int:
+  return MEMORYSIZES.get(operand.split(" ", 1)[0], 0)
+
+class Instruction:
+  __slots__ = ("text", "label", "mnemonic", "operands")
+  def __init__(self, text:str) -> None:
+    self.text:str = text.strip()
+    self.label:str = None
+    self.mnemonic:str = None
+    self.operands:list[str] = []
+
+    if self.text.endswith(":"):
+      self.label = self.text[:-1]
+    elif self.text:
+      parts:list[str] = self.text.split(" ", 1)
+      self.mnemonic = parts[0]
+      if len(parts) > 1:
+        self.operands = parts[1].split(", ")
+
+  def __repr__(self) -> str:
+    return self.text
+
+  def is_jump(self) -> bool:
+    return self.mnemonic is not None and self.mnemonic[0] == "j"
+
+  def is_control(self) -> bool:
+    return self.label is not None or self.is_jump() or self.mnemonic == "syscall" or self.mnemonic == "ret"
+
+  def reads_flags(self) -> bool:
+    if self.mnemonic is None:
+      return False
+    return (self.is_jump() and self.mnemonic != "jmp") or self.mnemonic.startswith("set") or self.mnemonic.startswith("cmov") or self.mnemonic in ("adc", "sbb")
+
+  def writes_flags(self) -> bool:
+    return self.mnemonic in FLAGWRITERS
+
+  def reads(self) -> set[str]|None:
+    mnemonic:str = self.mnemonic
+    operands:list[str] = self.operands
+    if mnemonic is None:
+      return set()
+    if mnemonic == "syscall":
+      return SYSCALLREADS
+    if mnemonic in ("mul", "div", "idiv"):
+      return {"rax", "rdx"} | registers_in(operands)
+    if mnemonic == "xor" and len(operands) == 2 and operands[0] == operands[1]:
+      return set()
+    if mnemonic in ("mov", "movzx", "movsx", "lea", "pop") or mnemonic.startswith("set") or (mnemonic == "imul" and len(operands) == 3):
+      result:set[str] = registers_in(operands[1:])
+      if operands and is_memory(operands[0]):
+        result |= registers_in(operands[:1])
+      elif operands and is_register(operands[0]) and REGISTERS[operands[0]][1] < 4:
+        result.add(REGISTERS[operands[0]][0])
+      return result
+    if mnemonic in ("add", "sub", "and", "or", "xor", "imul", "cmp", "test", "neg", "not", "push", "xchg", "shl", "shr", "sar", "inc", "dec"):
+      return registers_in(operands)
+    return None
+
+  def writes(self) -> set[str]|None:
+    mnemonic:str = self.mnemonic
+    operands:list[str] = self.operands
+    if mnemonic is None or mnemonic in ("cmp", "test", "push") or self.is_jump():
+      return set()
+    if mnemonic == "syscall":
+      return SYSCALLWRITES
+    if mnemonic in ("mul", "div", "idiv"):
+      return {"rax", "rdx"}
+    if mnemonic == "xchg":
+      return registers_in(operands)
+    if operands and is_register(operands[0]):
+      return {REGISTERS[operands[0]][0]}
+    if operands and is_memory(operands[0]):
+      return set()
+    return None
+
+def registers_in(operands:list[str]) -> set[str]:
+  result:set[str] = set()
+  for operand in operands:
+    if is_register(operand):
+      result.add(REGISTERS[operand][0])
+    elif is_memory(operand):
+      for part in operand[operand.index("[") + 1:-1].replace("+", " ").replace("*", " ").replace("-", " ").split():
+        if is_register(part):
+          result.add(REGISTERS[part][0])
+  return result
+
+def memory_traffic(lines) -> dict[str,tuple[int,int]]:
+  counts:dict[str,list[int]] = {}
+  for line in lines:
+    if "[" not in line:
+      continue
+    instruction:Instruction = Instruction(line)
+    for position, operand in enumerate(instruction.operands):
+      if not is_memory(operand):
+        continue
+      name:str = operand[operand.index("[") + 1:-1]
+      if not name.isidentifier() or name in REGISTERS:
+        continue
+      counts.setdefault(name, [0, 0])[position == 0 and instruction.mnemonic == "mov"] += 1
+  return {name:(loads, stores) for name, (loads, stores) in counts.items()}
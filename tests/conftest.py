@@ -0,0 +1,84 @@
+import os
+import random
+import subprocess
+import sys
+import pytest
+
+COMPILERDIR:str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "compiler")
+sys.path.insert(0, os.path.abspath(COMPILERDIR))
+
+import main as compiler
+
+TYPES:tuple[str, ...] = ("u64", "u32", "u16", "u8")
+OPERATORS:tuple[str, ...] = ("+", "-", "*", "/", "%", "&", "|", "^", ">", "<", "==", "!=", ">=", "<=")
+
+def random_program(seed:int, statements:int = 12) -> str:
+  generator:random.Random = random.Random(seed)
+  names:list[str] = [f"v{index}" for index in range(4)]
+  lines:list[str] = [f"res {generator.choice(TYPES)}, {name};" for name in names]
+
+  def expression(depth:int) -> str:
+    if depth == 0 or generator.random() < 0.25:
+      return generator.choice(names) if generator.random() < 0.6 else str(generator.randrange(0, 300))
+    if generator.random() < 0.1:
+      return "-" + expression(depth - 1)
+    return f"({expression(depth - 1)}{generator.choice(OPERATORS)}{expression(depth - 1)})"
+
+  for _ in range(statements):
+    lines.append(f"set {generator.choice(names)}, {expression(3)};")
+  lines.append(f"exit {expression(3)};")
+  return "\n".join(lines) + "\n"
+
+def random_loop_program(seed:int) -> str:
+  generator:random.Random = random.Random(seed)
+  names:list[str] = [f"v{index}" for index in range(4)]
+  lines:list[str] = [f"res {generator.choice(TYPES[:2])}, {name};" for name in names] + ["res u64, i;", "res u64, j;"]
+
+  def expression() -> str:
+    operand = lambda: generator.choice(names + ["i", "j"]) if generator.random() < 0.7 else str(generator.randrange(0, 300))
+    if generator.random() < 0.25:
+      return operand()
+    operator:str = generator.choice(OPERATORS)
+    if operator in ("/", "%"):
+      return f"({operand()}{operator}{generator.randrange(1, 20)})"
+    return f"({operand()}{operator}{operand()})"
+
+  def body() -> list[str]:
+    return [f"set {generator.choice(names)}, {expression()};" for _ in range(generator.randrange(0, 4))]
+
+  lines.append(f"set i, {generator.randrange(1, 30)};")
+  lines.append("label outer;")
+  lines += body()
+  lines.append(f"set j, {generator.randrange(0, 3)};")
+  lines.append("label inner;")
+  lines += body()
+  lines.append("set j, j + 1;")
+  lines.append(f"jump inner, j < {generator.randrange(3, 12)};")
+  lines += body()
+  lines.append("set i, i - 1;")
+  lines.append("jump outer, i > 0;")
+  lines.append(f"exit {expression()};")
+  return "\n".join(lines) + "\n"
+
+def parse(source:str) -> list:
+  return compiler.Parser(compiler.Lexer(source).tokenize()).parse()
+
+@pytest.fixture
+def execute(tmp_path):
+  def execute(assembly:str) -> int:
+    outputfile:str = str(tmp_path / "program")
+    compiler.write_executable(outputfile, compiler.Assembler(assembly.splitlines()).assemble())
+    return subprocess.run([outputfile], timeout=10).returncode
+  return execute
+
+@pytest.fixture
+def run(tmp_path):
+  def run(source:str, *flags:str) -> int:
+    inputfile:str = str(tmp_path / "input.src")
+    outputfile:str = str(tmp_path / "output")
+    with open(inputfile, "w") as file:
+      file.write(source)
+    argv:list[str] = ["main.py", inputfile, "-o", outputfile, "--elf", *flags]
+    assert compiler.main(len(argv), argv) == 0
+    return subprocess.run([outputfile], timeout=10).returncode
+  return run
@@ -0,0 +1,27 @@
+import os
+import pytest
+from conftest import compiler
+
+def write(path, text:str) -> str:
+  with open(path, "w") as file:
+    file.write(text)
+  return str(path)
+
+def test_batch_rejects_output_flag(tmp_path, capsys):
+  first:str = write(tmp_path / "a.src", "exit 1;")
+  second:str = write(tmp_path / "b.src", "exit 2;")
+  argv:list[str] = ["main.py", "--batch", first, "-o", str(tmp_path / "x.asm"), second]
+  with pytest.raises(SystemExit) as error:
+    compiler.main(len(argv), argv)
+  assert error.value.code == 1
+  assert "-o can not be used with --batch" in capsys.readouterr().out
+  assert not os.path.exists(tmp_path / "x.asm")
+
+def test_batch_manifest_names_outputs(tmp_path):
+  first:str = write(tmp_path / "a.src", "exit 1;")
+  second:str = write(tmp_path / "b.src", "exit 2;")
+  manifest:str = write(tmp_path / "list", f"{first} {tmp_path / 'x.asm'}\n{second}\n")
+  argv:list[str] = ["main.py", "--batch", "--manifest", manifest, "-j", "1"]
+  assert compiler.main(len(argv), argv) == 0
+  assert os.path.exists(tmp_path / "x.asm")
+  assert os.path.exists(tmp_path / "b.asm")
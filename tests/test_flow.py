@@ -0,0 +1,38 @@
+import pytest
+import signal
+from conftest import random_loop_program, random_program
+
+@pytest.mark.parametrize("source", [
+  "res u64, x; set x, 1/0; exit 3;",
+  "res u64, x; res u64, y; set x, 0; set y, 5/x; exit 3;",
+  "res u8, x; res u8, y; set y, 7 % x; exit 3;",
+  "res u64, x; res u16, y; set x, 5 % y; set x, 2; exit x;"
+])
+@pytest.mark.parametrize("level", ["-O0", "-O1", "-O2"])
+def test_dead_division_still_traps(run, source, level):
+  assert run(source, level) == -signal.SIGFPE
+
+def test_dead_division_by_constant_is_removed(run):
+  assert run("res u64, x; res u64, y; set y, x / 4; set y, x % 3; exit 3;", "-O1") == 3
+
+@pytest.mark.parametrize("seed", range(60))
+def test_levels_agree(run, seed):
+  source:str = random_program(seed)
+  expected:int = run(source, "-O0")
+  assert run(source, "-O1") == expected
+  assert run(source, "-O2") == expected
+
+@pytest.mark.parametrize("seed", range(300))
+def test_loop_levels_agree(run, seed):
+  source:str = random_loop_program(seed)
+  expected:int = run(source, "-O0")
+  assert run(source, "-O2", "--eval-steps", "0") == expected
+  assert run(source, "-O2", "--eval-steps", "0", "--unroll", "1") == expected
+
+@pytest.mark.parametrize("seed", range(150))
+def test_register_variables_levels_agree(run, seed):
+  source:str = random_loop_program(seed) if seed % 2 else random_program(seed)
+  expected:int = run(source, "-O0")
+  assert run(source, "-O0", "--register-variables") == expected
+  assert run(source, "-O1", "--register-variables") == expected
+  assert run(source, "-O2", "--eval-steps", "0", "--register-variables") == expected
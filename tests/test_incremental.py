@@ -0,0 +1,6 @@
+def test_final_statement_without_semicolon(run, tmp_path):
+  source:str = "res u8, a; set a, 3; exit a+2"
+  cache:str = str(tmp_path / "cache")
+  assert run(source, "-O0") == 5
+  assert run(source, "-O0", "--cache", cache) == 5
+  assert run(source, "-O0", "--cache", cache) == 5
@@ -0,0 +1,65 @@
+import pytest
+from conftest import parse, random_program
+from backend import Backend
+from lowering import Lowering
+from passes import PassManager
+from peephole import Peephole
+
+PROGRAMS:list[str] = [
+  "res u64, a; set a, 5; exit a + 1;",
+  "res u8, a; res u16, b; set a, 200; set b, a * 300; exit b > 60000;",
+  "res u64, a; res u64, b; set a, 3; set b, (a == 3) + (a != 3) + (a < 4); exit b;",
+  "res u64, a; label top; set a, a + 1; jump top, a < 10; exit a;",
+  "res u32, a; res u64, p; set a, 7; set p, &a; exit a ^ 2;"
+]
+
+def backend_output(nodes:list, level:int, peephole:Peephole|None) -> str:
+  program = Lowering(nodes).lower()
+  PassManager(level).run(program)
+  return Backend(program, peephole).translate()
+
+def check(execute, source:str) -> None:
+  nodes:list = parse(source)
+  for level in (1, 2):
+    assert execute(backend_output(nodes, level, Peephole())) == execute(backend_output(nodes, level, None))
+
+@pytest.mark.parametrize("source", PROGRAMS)
+def test_peephole_preserves_exit_code(execute, source):
+  check(execute, source)
+
+@pytest.mark.parametrize("seed", range(60))
+def test_peephole_preserves_exit_code_random(execute, seed):
+  check(execute, random_program(seed))
+
+def test_peephole_fires():
+  peephole:Peephole = Peephole()
+  backend_output(parse(PROGRAMS[2]), 1, peephole)
+  backend_output(parse(PROGRAMS[1]), 1, peephole)
+  assert sum(peephole.hits.values()) > 0
+
+@pytest.mark.parametrize("register", ["rax", "eax"])
+def test_compare_set(register):
+  lines:list[str] = ["jl cmptrue0", f"xor {register}, {register}", "jmp cmpend0", "cmptrue0:", f"mov {register}, 1", "cmpend0:", "mov rdi, rax"]
+  peephole:Peephole = Peephole()
+  assert "".join(peephole.optimize(lines)) == "setl al\nmovzx eax, al\nmov rdi, rax\n"
+  assert peephole.hits["compare-set"] == 1
+
+WIDTHPROGRAMS:list[str] = [
+  "res u32, a; set a, 4000000000; set a, a + 4294967295; exit a > 3000000000;",
+  "res u64, a; res u32, b; set a, 5000000000; set b, a * 3 - 7; exit b / 1000000;",
+  "res u16, a; res u64, b; set a, 65535; set b, a * a * a; exit b > 281462092005375;",
+  "res u32, a; res u32, b; set a, 7; set b, 4294967295; exit (b > a) + (b / a == 613566756);",
+  "res u8, a; set a, 250; exit (a ^ 4294967295) > 4294967000;",
+  "res u64, a; set a, 4294967296; exit (a - 1 > 4294967294) + (a & 4294967295);"
+]
+
+@pytest.mark.parametrize("source", WIDTHPROGRAMS)
+def test_width_levels_agree(run, source):
+  expected:int = run(source, "-O0")
+  assert run(source, "-O1") == expected
+  assert run(source, "-O2", "--eval-steps", "0") == expected
+
+def test_narrow_loop_selection():
+  output:str = backend_output(parse("res u8, var; set var, 0; label start; set var, var + 1; jump start, 10 > var; exit var;"), 1, Peephole())
+  assert "cmp byte [var], 10\njb label_start\n" in output
+  assert "add ebx, 1\n" in output and "rbx" not in output
@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+import time
+import pytest
+from conftest import COMPILERDIR, compiler
+from protocol import listening
+
+CLIENT:str = os.path.join(COMPILERDIR, "client.py")
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+  path:str = str(tmp_path_factory.mktemp("server") / "compiler.sock")
+  process:subprocess.Popen = subprocess.Popen([sys.executable, os.path.join(COMPILERDIR, "main.py"), "--serve", "--socket", path, "-j", "1"], stdout=subprocess.DEVNULL)
+  deadline:float = time.monotonic() + 30
+  while not listening(path):
+    assert process.poll() is None and time.monotonic() < deadline
+    time.sleep(0.05)
+  yield path
+  process.terminate()
+  process.wait(timeout=10)
+
+def client(*args:str, source:str|None = None) -> subprocess.CompletedProcess:
+  return subprocess.run([sys.executable, CLIENT, *args], input=source, capture_output=True, text=True, timeout=30, env=dict(os.environ, PCOMPILER_SOCKET=os.devnull))
+
+def test_client_socket_flag(server):
+  result:subprocess.CompletedProcess = client("--socket", server, "-", source="exit 3;")
+  assert result.returncode == 0
+  assert "mov rdi, 3" in result.stdout
+
+def test_client_without_server_names_socket(tmp_path):
+  path:str = str(tmp_path / "missing.sock")
+  result:subprocess.CompletedProcess = client("-", "--socket", path, source="exit 3;")
+  assert result.returncode == 1
+  assert f"no compiler server is listening on {path}" in result.stdout
+
+def test_parse_error_traceback(server):
+  result:subprocess.CompletedProcess = client("--socket", server, "-", source="res u8, a;\nset a, ;\nexit a;\n")
+  assert result.returncode == 1
+  assert "Traceback (most recent call last)" in result.stderr
+  assert "in parse_factor" in result.stderr
+  assert result.stderr.rstrip().endswith("ValueError")
+
+def test_serve_job_traceback():
+  response:dict = compiler.serve_job([], "set a, ;")
+  assert response["status"] == 1
+  assert response["error"] is None
+  assert "parser.py" in response["traceback"]
@@ -0,0 +1,56 @@
+import json
+import pytest
+from conftest import compiler
+
+SOURCE:str = "res u8, a; const u8, c, 4; label l; set a, 3 + c; jump l, a > 200; exit a+2"
+
+def stats(tmp_path, capsys, *flags:str) -> dict:
+  inputfile:str = str(tmp_path / "input.src")
+  with open(inputfile, "w") as file:
+    file.write(SOURCE)
+  argv:list[str] = ["main.py", inputfile, "-o", str(tmp_path / "output.asm"), "--stats=json", *flags]
+  assert compiler.main(len(argv), argv) == 0
+  return json.loads(capsys.readouterr().out)
+
+@pytest.mark.parametrize("flags", [("-O1",), ("-O2",), ("-O0", "--compact-ast"), ("-O0", "--cache", "cache")])
+def test_counts_match_across_pipelines(tmp_path, capsys, flags):
+  expected:dict = stats(tmp_path, capsys, "-O0")
+  assert expected["tokens"] == 33
+  assert expected["symbols"] == 3
+  flags = tuple(str(tmp_path / flag) if flag == "cache" else flag for flag in flags)
+  result:dict = stats(tmp_path, capsys, *flags)
+  assert (result["tokens"], result["nodes"], result["symbols"]) == (expected["tokens"], expected["nodes"], expected["symbols"])
+
+def test_stream_counts(tmp_path, capsys):
+  result:dict = stats(tmp_path, capsys, "-O0", "--stream")
+  assert (result["tokens"], result["symbols"]) == (33, 3)
+
+@pytest.mark.parametrize("level", ["-O0", "-O1", "-O2"])
+def test_section_bytes_are_encoded_sizes(tmp_path, capsys, level):
+  result:dict = stats(tmp_path, capsys, level)
+  with open(tmp_path / "output.asm") as file:
+    image = compiler.Assembler(file.read().splitlines()).assemble()
+  assert result["sections"][".text"]["bytes"] == len(image.text)
+  assert result["sections"][".data"]["bytes"] == len(image.data)
+  assert result["sections"][".bss"]["bytes"] == image.bss
+
+def dce_stats(tmp_path, capsys, *flags:str) -> dict[str,tuple[int,int]]:
+  inputfile:str = str(tmp_path / "dce.src")
+  with open(inputfile, "w") as file:
+    file.write("res u64, a; res u64, b; res u64, c; set a, 5; set b, a * 3; set c, b + 1; set b, 2; label top; set a, a + 1; jump top, a < 40; exit a + b;")
+  argv:list[str] = ["main.py", inputfile, "--dce-stats", "--eval-steps", "0", *flags]
+  assert compiler.main(len(argv), argv) == 0
+  lines:list[str] = capsys.readouterr().out.splitlines()
+  assert lines[0] == "statements removed: 3"
+  return {section.rstrip(":"):(int(removed), int(size)) for section, removed, _, size, _, _ in (line.split() for line in lines[1:])}
+
+@pytest.mark.parametrize("level", ["-O1", "-O2"])
+def test_dce_bytes_are_encoded_sizes(tmp_path, capsys, level):
+  outputfile:str = str(tmp_path / "dce.asm")
+  removed:dict[str,tuple[int,int]] = dce_stats(tmp_path, capsys, level, "-o", outputfile)
+  with open(outputfile) as file:
+    image = compiler.Assembler(file.read().splitlines()).assemble()
+  assert removed[".text"][1] - removed[".text"][0] == len(image.text)
+  assert removed[".bss"][1] - removed[".bss"][0] == image.bss
+  assert removed[".text"][0] > 0
+  assert dce_stats(tmp_path, capsys, level, "-o", str(tmp_path / "dce"), "--elf") == removed
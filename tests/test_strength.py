@@ -0,0 +1,96 @@
+import pytest
+import random
+from strength import MASK64, division_magic, is_power_of_two, multiply_plan
+
+WIDTHS:tuple[int, ...] = (8, 16, 32, 64)
+
+def multiply(plan:list[tuple[str,int]], value:int) -> int:
+  for operation, operand in plan:
+    if operation == "zero":
+      value = 0
+    elif operation == "lea":
+      value = value * operand
+    elif operation == "shl":
+      value = value << operand
+    elif operation == "neg":
+      value = -value
+    value &= MASK64
+  return value
+
+def divide(magic:tuple[int,int,int,bool], value:int) -> int:
+  preshift, multiplier, shift, add = magic
+  if add:
+    high:int = value * multiplier >> 64
+    return (((value - high) >> 1) + high) >> (shift - 1)
+  return ((value >> preshift) * multiplier) >> (64 + shift)
+
+def dividends(divisor:int, bits:int) -> set[int]:
+  top:int = (1 << bits) - 1
+  values:set[int] = {0, 1, top, top - 1, top // divisor * divisor, top // divisor * divisor - 1}
+  for base in (divisor, 2 * divisor, (1 << (bits - 1)) // divisor * divisor, 1 << (bits - 1)):
+    values.update(base + delta for delta in (-1, 0, 1))
+  return {value for value in values if 0 <= value <= top}
+
+def divisors(bits:int) -> set[int]:
+  top:int = (1 << bits) - 1
+  values:set[int] = set(range(2, 1024))
+  for exponent in range(2, bits):
+    values.update((1 << exponent) + delta for delta in (-3, -1, 1, 3))
+  values.update(top - delta for delta in range(8))
+  generator:random.Random = random.Random(bits)
+  values.update(generator.randrange(2, top + 1) for _ in range(512))
+  return {value for value in values if 2 <= value <= top and not is_power_of_two(value)}
+
+def check_division(divisor:int, bits:int, values) -> None:
+  magic:tuple[int,int,int,bool] = division_magic(divisor, bits)
+  for value in values:
+    quotient:int = divide(magic, value)
+    assert quotient == value // divisor, (divisor, bits, value)
+    assert value - quotient * divisor == value % divisor
+
+def test_division_magic_u8_exhaustive():
+  for divisor in range(2, 256):
+    if not is_power_of_two(divisor):
+      check_division(divisor, 8, range(256))
+
+@pytest.mark.parametrize("bits", WIDTHS[1:])
+def test_division_magic_boundaries(bits):
+  for divisor in divisors(bits):
+    check_division(divisor, bits, dividends(divisor, bits))
+
+@pytest.mark.parametrize("divisor", [0, 1, 2, 64, 1 << 63, 1 << 64])
+def test_division_magic_rejects(divisor):
+  with pytest.raises(ValueError):
+    division_magic(divisor)
+
+def test_multiply_plan_u8_exhaustive():
+  for constant in list(range(256)) + [MASK64 - value for value in range(256)]:
+    plan:list[tuple[str,int]]|None = multiply_plan(constant)
+    if plan is None:
+      continue
+    for value in range(256):
+      assert multiply(plan, value) & 0xff == value * constant & 0xff, (constant, value)
+
+@pytest.mark.parametrize("bits", WIDTHS[1:])
+def test_multiply_plan_boundaries(bits):
+  top:int = (1 << bits) - 1
+  values:list[int] = [0, 1, 2, 3, top, top - 1, top >> 1, (top >> 1) + 1]
+  constants:set[int] = set(range(1024)) | {MASK64 - value for value in range(1024)}
+  constants.update(3 << shift for shift in range(62))
+  constants.update(45 << shift for shift in range(57))
+  for constant in constants:
+    plan:list[tuple[str,int]]|None = multiply_plan(constant)
+    if plan is None:
+      continue
+    for value in values:
+      assert multiply(plan, value) & top == value * constant & top, (constant, value)
+
+@pytest.mark.parametrize("source", [
+  "res u64, a; label top; set a, a + 1000; jump top, a < 1000; exit a * 7 - a * 6 + a / 10 - a % 7 - 90;",
+  "res u8, a; res u16, b; set a, 250; set b, 65000; exit a / 3 + b / 1000 + b % 9;",
+  "res u32, a; set a, 4000000000; exit a / 400000000 + a % 16 * 2;"
+])
+def test_backend_constant_operands(run, source):
+  expected:int = run(source, "-O0")
+  assert run(source, "-O1") == expected
+  assert run(source, "-O2", "--eval-steps", "0") == expected
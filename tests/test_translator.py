@@ -0,0 +1,35 @@
+import pytest
+from conftest import parse, random_program
+from backend import Backend
+from lowering import Lowering
+from passes import PassManager
+from translator import Translator
+from varalloc import VariableAllocator
+
+def test_compare_with_constant_left_operand(run):
+  source:str = "res u64, a; res u64, b; set b, 9; exit a < (0 < b);"
+  assert run(source, "-O0") == 1
+  assert run(source, "-O0", "--compact-ast") == 1
+
+@pytest.mark.parametrize("seed", range(240))
+def test_compact_ast_matches_object_ast(run, seed):
+  source:str = random_program(seed)
+  expected:int = run(source, "-O0")
+  assert run(source, "-O0", "--compact-ast") == expected
+  assert run(source, "-O0", "--compact-ast", "--register-variables") == expected
+
+@pytest.mark.parametrize("source, zeroed", [
+  ("res u8, var; set var, 0; label start; set var, var + 1; jump start, 10 > var; exit var;", False),
+  ("res u8, var; label start; set var, var + 1; jump start, 10 > var; exit var;", True)
+])
+def test_register_variables_zero_only_uninitialized(source, zeroed):
+  nodes:list = parse(source)
+  translator:Translator = Translator(nodes, registerVariables=True)
+  assert translator.translate().count("xor r12d, r12d") == zeroed
+  allocator:VariableAllocator = VariableAllocator(nodes)
+  allocator.allocate()
+  program = Lowering(nodes).lower()
+  PassManager(1).run(program)
+  output:str = Backend(program, None, allocator).translate()
+  assert output.count("xor r12d, r12d") == zeroed
+  assert "byte [var]" not in output.split("_start:")[1]